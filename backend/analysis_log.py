@@ -0,0 +1,248 @@
+"""
+Persistent analysis log for the SonoSight backend
+Appends one row per analyzed eye (prediction, features, stage timings,
+image hash) to SQLite in WAL mode, indexed by session, patient, image
+hash and time so lookups and reports stay fast at millions of rows
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional, Tuple
+
+# Columns filterable in find() and report(), each backed by an index
+FILTERS = ('session_id', 'patient_id', 'image_hash')
+
+# Longest session/patient id accepted from a request
+MAX_ID_LENGTH = 128
+
+_COLUMNS = ('time', 'session_id', 'patient_id', 'image_hash', 'eye', 'pupil_backend',
+            'cached', 'success', 'error', 'acd_mm', 'risk_level', 'risk_score',
+            'confidence', 'total_ms', 'features', 'timings')
+
+
+def parse_log_context(options) -> Tuple[Dict, Optional[str]]:
+    """
+    Read the optional session_id / patient_id of an analysis request
+
+    Returns:
+        (context dict, error message or None)
+    """
+    context = {}
+    for name in ('session_id', 'patient_id'):
+        value = options.get(name)
+        if value is None or value == '':
+            continue
+        value = str(value)
+        if len(value) > MAX_ID_LENGTH:
+            return context, f'{name} is longer than {MAX_ID_LENGTH} characters'
+        context[name] = value
+    return context, None
+
+
+def parse_analysis_query(args) -> Tuple[Dict, Optional[str]]:
+    """
+    Read /analyses query arguments
+
+    Args:
+        args: Query-string mapping (session_id, patient_id, image_hash,
+              from, to, limit, cursor)
+
+    Returns:
+        (keyword arguments for AnalysisLog.find, error message or None)
+    """
+    query = {'filters': {name: args.get(name) for name in FILTERS if args.get(name)}}
+    try:
+        query['start'] = int(args['from']) if args.get('from') else None
+        query['end'] = int(args['to']) if args.get('to') else None
+        query['limit'] = max(1, min(int(args.get('limit') or 100), 1000))
+        query['cursor'] = int(args['cursor']) if args.get('cursor') else None
+    except ValueError:
+        return query, 'from, to, limit and cursor must be integers'
+    return query, None
+
+
+def _eye_results(settings: Dict, result: Dict):
+    """(eye, per-eye result) pairs of a detect_eye result, in logging order"""
+    if 'faces' in result:
+        for face in result['faces']:
+            yield from _eye_results(settings, face)
+    elif result.get('eyes') == 'both':
+        yield 'right', result['right']
+        yield 'left', result['left']
+    else:
+        yield 'right' if settings.get('prefer_right_eye', True) else 'left', result
+
+
+class AnalysisLog:
+    """
+    Append-only SQLite log of analyses
+
+    Frequently aggregated values (ACD, risk, confidence, total time) are
+    real columns; the feature vector and per-stage timings are stored as
+    compact JSON next to them.
+    """
+
+    def __init__(self, path: str):
+        """
+        Args:
+            path: SQLite database file (':memory:' for a throwaway log)
+        """
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS analyses ('
+            'id INTEGER PRIMARY KEY, time INTEGER NOT NULL, session_id TEXT, '
+            'patient_id TEXT, image_hash TEXT NOT NULL, eye TEXT, pupil_backend TEXT, '
+            'cached INTEGER NOT NULL, success INTEGER NOT NULL, error TEXT, '
+            'acd_mm REAL, risk_level TEXT, risk_score INTEGER, confidence REAL, '
+            'total_ms REAL, features TEXT, timings TEXT)')
+        for column in FILTERS + ('time',):
+            self._conn.execute(f'CREATE INDEX IF NOT EXISTS analyses_{column} '
+                               f'ON analyses ({column}, id)')
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self._insert = (f"INSERT INTO analyses ({', '.join(_COLUMNS)}) "
+                        f"VALUES ({', '.join('?' * len(_COLUMNS))})")
+
+    def record(self, image_hash: str, settings: Dict, context: Dict, result: Dict,
+               cached: bool = False) -> Optional[int]:
+        """
+        Append one analysis (one row per eye and face for eyes=both and
+        faces=all analyses)
+
+        Args:
+            image_hash: SHA-256 of the uploaded image bytes
+            settings: detect_eye arguments (eye preference, pupil backend)
+            context: session_id / patient_id from parse_log_context
+            result: detect_eye result
+            cached: True if the result came from the result cache
+
+        Returns:
+            Id of the last row written, or None if the write failed
+            (reported, not raised, so logging never fails an analysis)
+        """
+        now = int(time.time() * 1000)
+        timings = result.get('timings_ms')
+        rows = []
+        # Every row carries the timings of the shared pass
+        for eye, eye_result in _eye_results(settings, result):
+            prediction = eye_result.get('prediction') or {}
+            features = eye_result.get('features')
+            rows.append((
+                now,
+                context.get('session_id'),
+                context.get('patient_id'),
+                image_hash,
+                eye,
+                settings.get('pupil_backend'),
+                int(cached),
+                int(bool(eye_result.get('success'))),
+                None if eye_result.get('success') else eye_result.get('error'),
+                prediction.get('acd_mm'),
+                prediction.get('risk_level'),
+                prediction.get('risk_score'),
+                prediction.get('confidence'),
+                timings.get('total') if timings else None,
+                json.dumps(features, separators=(',', ':')) if features else None,
+                json.dumps(timings, separators=(',', ':')) if timings else None,
+            ))
+        try:
+            with self._lock, self._conn:
+                last = None
+                for row in rows:
+                    last = self._conn.execute(self._insert, row).lastrowid
+                return last
+        except sqlite3.Error as e:
+            print(f"Warning: analysis log write failed: {e}")
+            return None
+
+    @staticmethod
+    def _where(filters: Dict, start: Optional[int], end: Optional[int]):
+        clauses, params = [], []
+        for name in FILTERS:
+            if filters.get(name) is not None:
+                clauses.append(f'{name} = ?')
+                params.append(filters[name])
+        if start is not None:
+            clauses.append('time >= ?')
+            params.append(start)
+        if end is not None:
+            clauses.append('time <= ?')
+            params.append(end)
+        return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+    def find(self, filters: Dict, start: Optional[int] = None, end: Optional[int] = None,
+             limit: int = 100, cursor: Optional[int] = None) -> Dict:
+        """
+        Logged analyses, newest first
+
+        Args:
+            filters: Any of session_id, patient_id, image_hash
+            start / end: Time range in epoch ms (inclusive)
+            limit: Page size
+            cursor: next_cursor of the previous page
+
+        Returns:
+            Dictionary with 'analyses' and 'next_cursor' (None on the last page)
+        """
+        where, params = self._where(filters, start, end)
+        if cursor is not None:
+            where += (' AND ' if where else ' WHERE ') + 'id < ?'
+            params.append(cursor)
+        with self._lock:
+            rows = self._conn.execute(
+                f"SELECT id, {', '.join(_COLUMNS)} FROM analyses{where} "
+                f"ORDER BY id DESC LIMIT ?", params + [limit + 1]).fetchall()
+        analyses = []
+        for row in rows[:limit]:
+            entry = dict(zip(('id',) + _COLUMNS, row))
+            entry['cached'] = bool(entry['cached'])
+            entry['success'] = bool(entry['success'])
+            for name in ('features', 'timings'):
+                entry[name] = json.loads(entry[name]) if entry[name] else None
+            analyses.append(entry)
+        return {
+            'analyses': analyses,
+            'next_cursor': analyses[-1]['id'] if len(rows) > limit else None
+        }
+
+    def report(self, filters: Dict, start: Optional[int] = None,
+               end: Optional[int] = None) -> Dict:
+        """Counts, ACD statistics, risk distribution and timing for matching analyses"""
+        where, params = self._where(filters, start, end)
+        with self._lock:
+            count, succeeded, cached, acd_mean, acd_min, acd_max, total_ms, first, last = \
+                self._conn.execute(
+                    'SELECT COUNT(*), SUM(success), SUM(cached), AVG(acd_mm), MIN(acd_mm), '
+                    f'MAX(acd_mm), AVG(total_ms), MIN(time), MAX(time) FROM analyses{where}',
+                    params).fetchone()
+            risk = self._conn.execute(
+                f'SELECT risk_level, COUNT(*) FROM analyses{where}'
+                f"{' AND' if where else ' WHERE'} risk_level IS NOT NULL "
+                'GROUP BY risk_level', params).fetchall()
+        return {
+            'count': count,
+            'succeeded': succeeded or 0,
+            'cached': cached or 0,
+            'acd_mm': {
+                'mean': round(acd_mean, 3) if acd_mean is not None else None,
+                'min': acd_min,
+                'max': acd_max,
+            },
+            'risk_levels': dict(risk),
+            'avg_total_ms': round(total_ms, 2) if total_ms is not None else None,
+            'first': first,
+            'last': last,
+        }
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM analyses').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
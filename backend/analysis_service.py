@@ -0,0 +1,247 @@
+"""
+Framework-independent analysis core of the SonoSight backend
+Configuration, the eye detector import, request option parsing, upload
+decoding and caching, detection and response formatting, shared by the
+Flask (server.py) and ASGI (server_asgi.py) servers
+"""
+
+import importlib.util
+import os
+import sys
+import time
+
+from analysis_log import AnalysisLog
+from change_feed import ChangeFeed
+from image_upload import decode_image, parse_bool
+from quality_stats import QualityStats
+from result_cache import ResultCache
+
+# Add parent directory to path to import eye_detector
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+EyeDetector = None
+EyeTracker = None
+decode_reduced = None
+IMPORT_ERROR = None
+try:
+    # eye_detector imports cv2/mediapipe lazily, so check they exist up front
+    for module_name in ('cv2', 'numpy', 'mediapipe'):
+        if importlib.util.find_spec(module_name) is None:
+            raise ImportError(f"No module named '{module_name}'")
+    from lib.eye_detector import EyeDetector, EyeTracker, decode_reduced
+    print("✓ Eye detector imported successfully")
+except ImportError as e:
+    IMPORT_ERROR = f'Eye detector unavailable: {e}'
+    print(f"Error importing eye_detector: {e}")
+
+# Address the server binds when started directly
+HOST = os.environ.get('SONOSIGHT_HOST', '0.0.0.0')
+PORT = int(os.environ.get('SONOSIGHT_PORT', 5000))
+# Number of pooled detectors (one Face Mesh graph each)
+POOL_SIZE = int(os.environ.get('SONOSIGHT_WORKERS', os.cpu_count() or 2))
+# Analysis results kept in the content-hash cache (0 disables it)
+CACHE_SIZE = int(os.environ.get('SONOSIGHT_CACHE_SIZE', 256))
+# Seconds a cached result stays valid
+CACHE_TTL = float(os.environ.get('SONOSIGHT_CACHE_TTL', 3600))
+# Directory for the persistent cache tier (unset = memory only)
+CACHE_DIR = os.environ.get('SONOSIGHT_CACHE_DIR') or None
+# Longest image side used for the Face Mesh landmark pass (0 = full resolution)
+WORKING_RESOLUTION = int(os.environ.get('SONOSIGHT_WORKING_RESOLUTION', 640)) or None
+# Decode large JPEG uploads at 1/2, 1/4 or 1/8 scale for the landmark pass and
+# decode finer scales only around the irises (0 = always decode at full size)
+REDUCED_DECODE = parse_bool(os.environ.get('SONOSIGHT_REDUCED_DECODE'), True)
+# Seconds an analysis request waits for the model to finish warming up
+READY_TIMEOUT = float(os.environ.get('SONOSIGHT_READY_TIMEOUT', 30))
+# Record per-stage timings (timings_ms in results; server.py also feeds /metrics);
+# off by default so responses keep their original shape
+RECORD_TIMINGS = parse_bool(os.environ.get('SONOSIGHT_TIMINGS'), False)
+# Pupil detection backend used when a request does not choose one
+PUPIL_BACKEND = os.environ.get('SONOSIGHT_PUPIL_BACKEND', 'threshold')
+# Faces located per image; above 1 requests may ask for faces=all
+MAX_FACES = max(1, int(os.environ.get('SONOSIGHT_MAX_FACES', 1)))
+# Reject dark, overexposed, flat or blurry frames before the landmark pass
+# (opt-in until the thresholds are validated on clinical captures)
+QUALITY_GATE = parse_bool(os.environ.get('SONOSIGHT_QUALITY_GATE'), False)
+# Change feed shared with the sensor ingestion service (same file = one sequence)
+CHANGES_DB = os.environ.get('SONOSIGHT_CHANGES_DB', 'changes.db')
+CHANGES_RETENTION = int(os.environ.get('SONOSIGHT_CHANGES_RETENTION', 1000000))
+# Longest GET /changes long-poll in seconds
+CHANGES_MAX_WAIT = float(os.environ.get('SONOSIGHT_CHANGES_MAX_WAIT', 30))
+# SQLite file every analysis is logged to (empty = no analysis log)
+ANALYSIS_LOG = os.environ.get('SONOSIGHT_ANALYSIS_LOG', 'analyses.db')
+
+
+def format_result(result):
+    """Build the API response body and status code for a detection result"""
+    if 'faces' in result:
+        body = {
+            'success': result['success'],
+            'face_count': result['face_count'],
+            'faces': [dict(format_result(face)[0], face=face['face'], bbox=face['bbox'])
+                      for face in result['faces']]
+        }
+        if not result['success']:
+            body['error'] = result.get('error', 'Detection failed')
+        status = 200 if result['success'] else 500
+    elif result.get('eyes') == 'both':
+        body = {
+            'success': result['success'],
+            'eyes': 'both',
+            'right': format_result(result['right'])[0],
+            'left': format_result(result['left'])[0],
+            'asymmetry': result.get('asymmetry')
+        }
+        if not result['success']:
+            body['error'] = result.get('error', 'Detection failed')
+        status = 200 if result['success'] else 500
+    elif result.get('success'):
+        body = {
+            'success': True,
+            'iris': result.get('iris', {}),
+            'pupil': result.get('pupil', {}),
+            'features': result.get('features', {}),
+            'prediction': result.get('prediction', {})
+        }
+        status = 200
+    else:
+        body = {
+            'success': False,
+            'error': result.get('error', 'Detection failed')
+        }
+        status = 500
+        if 'quality' in result:
+            # Unusable frame: the client should retake it, not retry
+            body['quality'] = result['quality']
+            status = 422
+    if 'timings_ms' in result:
+        body['timings_ms'] = result['timings_ms']
+    return body, status
+
+
+def parse_analysis_options(options):
+    """
+    Read per-request analysis settings from JSON, form or query options
+
+    Returns:
+        (settings dict of detect_eye arguments, error message or None)
+    """
+    pupil_backends = EyeDetector.PUPIL_BACKENDS if EyeDetector else (PUPIL_BACKEND,)
+    settings = {
+        'prefer_right_eye': parse_bool(options.get('prefer_right_eye'), True),
+        'pupil_backend': options.get('pupil_backend') or PUPIL_BACKEND
+    }
+    if settings['pupil_backend'] not in pupil_backends:
+        return settings, (f"Unknown pupil_backend '{settings['pupil_backend']}' "
+                          f"(choose from {', '.join(pupil_backends)})")
+    eyes = options.get('eyes')
+    if eyes in ('right', 'left'):
+        settings['prefer_right_eye'] = eyes == 'right'
+    elif eyes == 'both':
+        settings['eyes'] = 'both'
+    elif eyes:
+        return settings, f"Unknown eyes '{eyes}' (choose from right, left, both)"
+    faces = options.get('faces')
+    if faces == 'all':
+        if MAX_FACES == 1:
+            return settings, 'faces=all needs SONOSIGHT_MAX_FACES above 1'
+        settings['faces'] = 'all'
+    elif faces not in (None, '', 'one'):
+        return settings, f"Unknown faces '{faces}' (choose from one, all)"
+    return settings, None
+
+
+class AnalysisService:
+    """
+    Result cache, quality statistics, change feed and analysis log around
+    a detector pool: everything an analysis request does after the server
+    has read the upload and its options
+    """
+
+    def __init__(self, detector_pool, reduced_decode: bool = REDUCED_DECODE,
+                 stage_hook=None):
+        """
+        Args:
+            detector_pool: DetectorPool or InferenceProcessPool to detect on
+            reduced_decode: Decode large JPEGs at reduced scale (needs
+                decode_reduced; worker processes take plain arrays)
+            stage_hook: Called with (stage, seconds) for the decode stage
+        """
+        self.detector_pool = detector_pool
+        self.reduced_decode = reduced_decode and decode_reduced is not None
+        self.stage_hook = stage_hook
+        # Results of recently analyzed images, keyed by content hash
+        self.result_cache = ResultCache(max_entries=CACHE_SIZE, ttl=CACHE_TTL,
+                                        disk_dir=CACHE_DIR)
+        self.quality_stats = QualityStats(enabled=QUALITY_GATE)
+        # Sequence-numbered log of new analysis results (and sensor readings)
+        self.change_feed = ChangeFeed(CHANGES_DB, retention=CHANGES_RETENTION)
+        # Persistent record of every analysis, queried by /analyses
+        self.analysis_log = AnalysisLog(ANALYSIS_LOG) if ANALYSIS_LOG else None
+
+    def decode_upload(self, image_bytes):
+        """
+        Decode an upload for detection: a reduced-resolution decode that fills
+        in iris regions on demand when enabled, otherwise the full image
+        """
+        if self.reduced_decode:
+            return decode_reduced(image_bytes, WORKING_RESOLUTION)
+        return decode_image(image_bytes)
+
+    def load_upload(self, image_bytes, settings, context=None):
+        """
+        Look up an upload in the result cache, decoding it only on a miss
+
+        Args:
+            image_bytes: Encoded image
+            settings: detect_eye arguments from parse_analysis_options
+            context: session_id / patient_id for the analysis log
+
+        Returns:
+            Dictionary with cache_key, settings and either the cached
+            'result' or the decoded 'image' (None if decoding failed)
+        """
+        variants = ((settings['pupil_backend'],) + (('both',) if settings.get('eyes') else ())
+                    + (('faces',) if settings.get('faces') else ()))
+        cache_key = ResultCache.make_key(image_bytes, settings['prefer_right_eye'], *variants)
+        upload = {
+            'cache_key': cache_key,
+            'settings': settings,
+            'context': context or {},
+            'result': self.result_cache.get(cache_key),
+            'image': None
+        }
+        if upload['result'] is None:
+            start = time.perf_counter()
+            upload['image'] = self.decode_upload(image_bytes)
+            upload['decode_s'] = time.perf_counter() - start
+            if self.stage_hook:
+                self.stage_hook('decode', upload['decode_s'])
+        return upload
+
+    def log_analysis(self, upload, result, cached):
+        """Append an analysis to the persistent log (if enabled)"""
+        if self.analysis_log is not None:
+            self.analysis_log.record(upload['cache_key'].split('-', 1)[0], upload['settings'],
+                                     upload['context'], result, cached=cached)
+
+    def cached_result(self, upload):
+        """The cached result of a loaded upload, logged as a cache hit"""
+        # Timings describe the original analysis, not this request
+        result = {k: v for k, v in upload['result'].items() if k != 'timings_ms'}
+        self.log_analysis(upload, result, cached=True)
+        return result
+
+    def run_detection(self, upload):
+        """Analyze a loaded upload on a pooled detector (or reuse its cached result)"""
+        if upload['result'] is not None:
+            return self.cached_result(upload)
+        result = self.detector_pool.detect(upload['image'], **upload['settings'])
+        self.quality_stats.record(result)
+        if 'timings_ms' in result:
+            result['timings_ms']['decode'] = round(upload['decode_s'] * 1000, 3)
+        if result.get('success'):
+            self.result_cache.put(upload['cache_key'], result)
+            body = format_result({k: v for k, v in result.items() if k != 'timings_ms'})[0]
+            self.change_feed.append('analysis', [('insert', upload['cache_key'], body)])
+        self.log_analysis(upload, result, cached=False)
+        return result
@@ -0,0 +1,181 @@
+"""
+Change feed for SonoSight sensor readings and analysis results
+Every stored or updated record gets a sequence number from one SQLite log
+(shared by the API server and the ingestion service), so clients can sync
+with GET /changes?since=<seq> instead of re-downloading history
+"""
+
+import json
+import sqlite3
+import threading
+import time
+from typing import Dict, Iterable, Optional, Tuple
+
+# Record kinds written to the feed
+KINDS = ('reading', 'analysis')
+
+
+class ChangeFeed:
+    """
+    Append-only log of (seq, kind, op, key, record) entries
+
+    Sequence numbers increase monotonically across processes and restarts.
+    Only the newest `retention` entries are kept; a client whose cursor
+    is older than that is told to reset (resync from the full history).
+    """
+
+    def __init__(self, path: str = ':memory:', retention: int = 1_000_000,
+                 poll_interval: float = 0.25):
+        """
+        Args:
+            path: SQLite database file (':memory:' for a private feed)
+            retention: Entries kept before the oldest are pruned
+            poll_interval: How often waiters check for entries written
+                           by another process
+        """
+        self.path = path
+        self.retention = retention
+        self.poll_interval = poll_interval
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS changes ('
+            'seq INTEGER PRIMARY KEY AUTOINCREMENT, kind TEXT NOT NULL, '
+            'op TEXT NOT NULL, key TEXT NOT NULL, time INTEGER NOT NULL, '
+            'record TEXT NOT NULL)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS changes_kind ON changes (kind, seq)')
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self._cond = threading.Condition()
+        self._appends = 0
+
+    def append(self, kind: str, entries: Iterable[Tuple[str, str, Dict]]) -> Optional[int]:
+        """
+        Add changes in one transaction
+
+        Args:
+            kind: 'reading' or 'analysis'
+            entries: (op, key, record) tuples, op being 'insert' or 'update'
+
+        Returns:
+            Sequence number of the last entry, or None if nothing was
+            written (a failed write is reported, not raised: the record
+            itself is already stored)
+        """
+        now = int(time.time() * 1000)
+        rows = [(kind, op, key, now, json.dumps(record)) for op, key, record in entries]
+        if not rows:
+            return None
+        try:
+            with self._lock, self._conn:
+                self._conn.executemany(
+                    'INSERT INTO changes (kind, op, key, time, record) VALUES (?, ?, ?, ?, ?)',
+                    rows)
+                last = self._conn.execute('SELECT MAX(seq) FROM changes').fetchone()[0]
+                self._appends += len(rows)
+                if self._appends >= max(1000, self.retention // 10):
+                    self._appends = 0
+                    self._conn.execute('DELETE FROM changes WHERE seq <= ?',
+                                       (last - self.retention,))
+        except sqlite3.Error as e:
+            print(f"Warning: change feed write failed: {e}")
+            return None
+        with self._cond:
+            self._cond.notify_all()
+        return last
+
+    def latest_seq(self) -> int:
+        with self._lock:
+            return self._conn.execute('SELECT COALESCE(MAX(seq), 0) FROM changes').fetchone()[0]
+
+    def wait(self, since: int, timeout: float) -> bool:
+        """Block until an entry newer than since exists or timeout passes"""
+        deadline = time.monotonic() + timeout
+        while self.latest_seq() <= since:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            # Appends in this process wake us at once; other processes are polled
+            with self._cond:
+                self._cond.wait(min(self.poll_interval, remaining))
+        return True
+
+    def since(self, since: int, limit: int = 500, kind: Optional[str] = None) -> Dict:
+        """
+        Entries after sequence number since, oldest first
+
+        Returns:
+            Dictionary with 'changes', 'last_seq' (cursor for the next call),
+            'latest_seq', 'has_more' and 'reset' (the cursor is older than
+            the retained log or newer than the feed, so resync fully)
+        """
+        query = 'SELECT seq, kind, op, key, time, record FROM changes WHERE seq > ?'
+        params = [since]
+        if kind:
+            query += ' AND kind = ?'
+            params.append(kind)
+        query += ' ORDER BY seq LIMIT ?'
+        params.append(limit + 1)
+        with self._lock:
+            rows = self._conn.execute(query, params).fetchall()
+            # Separate queries: SQLite only answers a lone MIN/MAX from the index
+            oldest = self._conn.execute('SELECT MIN(seq) FROM changes').fetchone()[0]
+            latest = self._conn.execute(
+                'SELECT COALESCE(MAX(seq), 0) FROM changes').fetchone()[0]
+        # Entries after the cursor were pruned, or the feed was recreated
+        reset = since > latest or (oldest is not None and since < oldest - 1)
+        if reset:
+            return {'changes': [], 'last_seq': latest, 'latest_seq': latest,
+                    'has_more': False, 'reset': True}
+        changes = [{'seq': seq, 'kind': kind_, 'op': op, 'key': key, 'time': time_,
+                    'record': json.loads(record)}
+                   for seq, kind_, op, key, time_, record in rows[:limit]]
+        return {
+            'changes': changes,
+            'last_seq': changes[-1]['seq'] if changes else since,
+            'latest_seq': latest,
+            'has_more': len(rows) > limit,
+            'reset': False,
+        }
+
+    def poll(self, since: int, limit: int = 500, kind: Optional[str] = None,
+             wait: float = 0.0) -> Dict:
+        """since(), long-polling up to wait seconds while there is nothing new"""
+        page = self.since(since, limit, kind)
+        deadline = time.monotonic() + wait
+        while not page['changes'] and not page['reset']:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not self.wait(page['latest_seq'], remaining):
+                break
+            page = self.since(since, limit, kind)
+        return page
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def parse_changes_query(args, max_wait: float) -> Tuple[Dict, Optional[str]]:
+    """
+    Read GET /changes query arguments
+
+    Args:
+        args: Query-string mapping (since, limit, kind, wait)
+        max_wait: Longest long-poll accepted, in seconds
+
+    Returns:
+        (dict with since, limit, kind and wait, error message or None)
+    """
+    try:
+        params = {
+            'since': int(args.get('since') or 0),
+            'limit': max(1, min(int(args.get('limit') or 500), 5000)),
+            'kind': args.get('kind') or None,
+            'wait': max(0.0, min(float(args.get('wait') or 0), max_wait)),
+        }
+    except ValueError:
+        return {}, 'since and limit must be integers, wait a number of seconds'
+    if params['kind'] is not None and params['kind'] not in KINDS:
+        return params, f"Unknown kind '{params['kind']}' (choose from {', '.join(KINDS)})"
+    return params, None
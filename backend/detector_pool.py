@@ -0,0 +1,107 @@
+"""
+Detector pool for the SonoSight backend
+Keeps a bounded set of EyeDetector instances so that concurrent Flask
+threads never share one MediaPipe Face Mesh graph
+"""
+
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional
+
+
+class DetectorPool:
+    """
+    Bounded pool of EyeDetector instances
+
+    Each detector is checked out by exactly one thread at a time.
+    Batches are spread over a thread pool with one worker per detector;
+    OpenCV and MediaPipe release the GIL during heavy work, so this
+    scales with the number of cores.
+    """
+
+    def __init__(self, detector_factory: Callable, size: int = 2,
+                 lazy: bool = False):
+        """
+        Create the pool
+
+        Args:
+            detector_factory: Callable returning a new EyeDetector
+            size: Number of detectors (and batch workers) to keep
+            lazy: Leave the pool empty until populate() is called;
+                acquire() blocks until a detector has been added
+        """
+        self.size = max(1, int(size))
+        self._factory = detector_factory
+        self._detectors = queue.Queue(maxsize=self.size)
+        self._executor = ThreadPoolExecutor(max_workers=self.size,
+                                            thread_name_prefix='detector')
+        self._lock = threading.Lock()
+        self._busy = 0
+        self._available = 0
+        self.ready = threading.Event()
+        self.warmup_ms: List[float] = []
+        if not lazy:
+            self.populate(warm_up=False)
+
+    def populate(self, warm_up: bool = True):
+        """
+        Build (and optionally warm up) every detector
+
+        Each detector becomes available as soon as it is ready, so early
+        requests are served before the whole pool is built.
+        """
+        for _ in range(self.size):
+            detector = self._factory()
+            warm = getattr(detector, 'warm_up', None)
+            if warm_up and warm is not None:
+                self.warmup_ms.append(round(warm(), 1))
+            with self._lock:
+                self._available += 1
+            self._detectors.put(detector)
+        self.ready.set()
+
+    @contextmanager
+    def acquire(self, timeout: Optional[float] = None):
+        """
+        Check out a detector for the duration of a with-block
+
+        Args:
+            timeout: Seconds to wait for a free detector (None = forever)
+
+        Raises:
+            queue.Empty: If no detector became free within timeout
+        """
+        detector = self._detectors.get(timeout=timeout)
+        with self._lock:
+            self._busy += 1
+        try:
+            yield detector
+        finally:
+            with self._lock:
+                self._busy -= 1
+            self._detectors.put(detector)
+
+    def detect(self, image, prefer_right_eye: bool = True,
+               timeout: Optional[float] = None, **options) -> Dict:
+        """Run detect_eye on a pooled detector (options are passed through)"""
+        with self.acquire(timeout=timeout) as detector:
+            return detector.detect_eye(image, prefer_right_eye=prefer_right_eye, **options)
+
+    def map(self, fn: Callable, items: List) -> List:
+        """Apply fn to every item on the pool's workers, preserving order"""
+        return list(self._executor.map(fn, items))
+
+    def stats(self) -> Dict:
+        """Current pool occupancy"""
+        with self._lock:
+            busy = self._busy
+            available = self._available
+        return {'size': self.size, 'available': available, 'busy': busy,
+                'idle': available - busy, 'ready': self.ready.is_set()}
+
+    def shutdown(self):
+        """Stop batch workers; detectors are released with the pool"""
+        self._executor.shutdown(wait=True)
+
@@ -0,0 +1,157 @@
+"""
+Shared-memory frame ring for the SonoSight backend
+Decoded frames are handed to inference processes through fixed-size
+slots of one multiprocessing.shared_memory block instead of being pickled
+"""
+
+import queue
+import threading
+from multiprocessing import resource_tracker, shared_memory
+from typing import Dict, Optional, Tuple
+
+# Largest frame a slot holds by default: a 12 MP (4032x3024) BGR photo
+DEFAULT_SLOT_BYTES = 4032 * 3024 * 3
+
+# Slot lifecycle (tracked by the owning process only)
+FREE = 'free'          # available to acquire()
+WRITING = 'writing'    # checked out, frame being copied in
+IN_FLIGHT = 'in_flight'  # handed to a worker, which reads it in place
+
+
+class RingFull(Exception):
+    """No slot became free within the timeout"""
+
+
+class FrameRing:
+    """
+    Fixed number of frame-sized slots in one shared memory block
+
+    The creating process owns the slots: it acquire()s a free slot,
+    write()s a frame into it, passes (slot, shape, dtype) to a worker and
+    release()s the slot once the worker reports it is done. Workers attach
+    by name and only ever view() slots, so frames cross the process
+    boundary without being pickled or copied.
+    """
+
+    def __init__(self, slots: int = 4, slot_bytes: int = DEFAULT_SLOT_BYTES,
+                 name: Optional[str] = None, untrack: bool = True):
+        """
+        Create a ring, or attach to an existing one when name is given
+
+        Args:
+            slots: Number of frames that can be in flight at once
+            slot_bytes: Capacity of each slot
+            name: Shared memory name of a ring created by another process
+            untrack: When attaching, unregister the block from this
+                process's resource tracker (False for forked children,
+                which share the creator's tracker)
+        """
+        self.slots = max(1, int(slots))
+        self.slot_bytes = int(slot_bytes)
+        self.owner = name is None
+        if self.owner:
+            self._shm = shared_memory.SharedMemory(
+                create=True, size=self.slots * self.slot_bytes)
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+            if untrack:
+                # The creator unlinks the block; stop this process's resource
+                # tracker from unlinking it (and warning) when the worker exits
+                resource_tracker.unregister(self._shm._name, 'shared_memory')
+        self.name = self._shm.name
+
+        self._free = queue.Queue()
+        for slot in range(self.slots):
+            self._free.put(slot)
+        self._states = [FREE] * self.slots
+        self._lock = threading.Lock()
+        self._counters = {'acquired': 0, 'released': 0, 'timeouts': 0}
+
+    @property
+    def spec(self) -> Tuple[int, int, str]:
+        """(slots, slot_bytes, name) for attaching from another process"""
+        return self.slots, self.slot_bytes, self.name
+
+    @classmethod
+    def attach(cls, slots: int, slot_bytes: int, name: str,
+               untrack: bool = True) -> 'FrameRing':
+        """Attach to a ring created by another process (see spec)"""
+        return cls(slots, slot_bytes, name=name, untrack=untrack)
+
+    def fits(self, image) -> bool:
+        """Whether a frame is small enough for one slot"""
+        return image.nbytes <= self.slot_bytes
+
+    def acquire(self, timeout: Optional[float] = None) -> int:
+        """
+        Check out a free slot for writing
+
+        Raises:
+            RingFull: If no slot became free within timeout
+        """
+        try:
+            slot = self._free.get(timeout=timeout)
+        except queue.Empty:
+            with self._lock:
+                self._counters['timeouts'] += 1
+            raise RingFull(f'No free frame slot within {timeout} s') from None
+        with self._lock:
+            self._states[slot] = WRITING
+            self._counters['acquired'] += 1
+        return slot
+
+    def write(self, slot: int, image) -> Tuple[Tuple[int, ...], str]:
+        """
+        Copy a frame into an acquired slot and mark it in flight
+
+        Returns:
+            (shape, dtype name) needed to view() the frame
+        """
+        import numpy as np
+
+        if not self.fits(image):
+            raise ValueError(f'Frame of {image.nbytes} bytes exceeds slot size '
+                             f'{self.slot_bytes}')
+        np.copyto(self.view(slot, image.shape, image.dtype.str), image)
+        with self._lock:
+            self._states[slot] = IN_FLIGHT
+        return image.shape, image.dtype.str
+
+    def view(self, slot: int, shape: Tuple[int, ...], dtype: str = '|u1'):
+        """ndarray over a slot's memory (no copy; valid until released)"""
+        import numpy as np
+
+        return np.ndarray(shape, dtype=dtype, buffer=self._shm.buf,
+                          offset=slot * self.slot_bytes)
+
+    def release(self, slot: int):
+        """Return a slot to the free list once its reader is done"""
+        with self._lock:
+            if self._states[slot] == FREE:
+                return
+            self._states[slot] = FREE
+            self._counters['released'] += 1
+        self._free.put(slot)
+
+    def stats(self) -> Dict:
+        """Slot occupancy and lifecycle counters"""
+        with self._lock:
+            states = list(self._states)
+            counters = dict(self._counters)
+        return {
+            'slots': self.slots,
+            'slot_mb': round(self.slot_bytes / 2 ** 20, 1),
+            'free': states.count(FREE),
+            'writing': states.count(WRITING),
+            'in_flight': states.count(IN_FLIGHT),
+            **counters
+        }
+
+    def close(self):
+        """Detach from the block; the owner also frees it"""
+        self._shm.close()
+        if self.owner:
+            try:
+                self._shm.unlink()
+            except FileNotFoundError:
+                pass
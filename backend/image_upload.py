@@ -0,0 +1,114 @@
+"""
+Image upload parsing for the SonoSight backend
+Accepts the original base64-in-JSON contract as well as multipart/form-data
+and raw binary (application/octet-stream, image/jpeg, image/png) bodies
+"""
+
+import base64
+import binascii
+from typing import Optional, Tuple
+
+# Content types whose body is the encoded image itself
+RAW_IMAGE_TYPES = ('application/octet-stream', 'image/jpeg', 'image/png')
+
+
+def parse_bool(value, default: bool = True) -> bool:
+    """Interpret a JSON, form or query-string value as a boolean"""
+    if value is None:
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() not in ('0', 'false', 'no', 'off', '')
+
+
+def decode_image(image_bytes):
+    """
+    Decode encoded image bytes (JPEG/PNG) to a BGR array, or None
+
+    Accepts bytes, bytearray or memoryview; np.frombuffer wraps the
+    buffer without copying before it is handed to cv2.imdecode.
+    """
+    # Imported here so the server can bind before OpenCV is loaded
+    import cv2
+    import numpy as np
+
+    if image_bytes is None or len(image_bytes) == 0:
+        return None
+    nparr = np.frombuffer(image_bytes, np.uint8)
+    return cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+
+
+def decode_base64(value) -> Optional[bytes]:
+    """
+    Decode a base64 image string, or None if it is not valid base64
+
+    Whitespace and line breaks (line-wrapped output of mobile encoders)
+    are ignored, as they always were; malformed input such as a wrong
+    length or padding is rejected.
+    """
+    try:
+        return base64.b64decode(value)
+    except (binascii.Error, TypeError, ValueError):
+        return None
+
+
+def _file_buffer(upload):
+    """Borrow the bytes of an uploaded file, avoiding a copy when in memory"""
+    stream = upload.stream
+    getbuffer = getattr(stream, 'getbuffer', None)
+    if getbuffer is not None:
+        return getbuffer()
+    return upload.read()
+
+
+def read_image_bytes(req) -> Tuple[Optional[object], dict, Optional[str]]:
+    """
+    Extract the encoded image and request options from a Flask request
+
+    Args:
+        req: flask.request
+
+    Returns:
+        (image_bytes or None, options dict, error) - options holds the JSON
+        body, form fields or query-string values, whichever the client
+        used; error is None on success, otherwise a client (400) error
+    """
+    mimetype = req.mimetype or ''
+
+    if mimetype == 'multipart/form-data':
+        options = req.form.to_dict()
+        options.update({k: v for k, v in req.args.items() if k not in options})
+        upload = req.files.get('image')
+        image_bytes = _file_buffer(upload) if upload is not None else None
+    elif mimetype in RAW_IMAGE_TYPES:
+        # Read the body once without caching a second copy on the request
+        image_bytes, options = req.get_data(cache=False), req.args.to_dict()
+    else:
+        data = req.get_json(silent=True)
+        if not isinstance(data, dict) or 'image' not in data:
+            return None, data if isinstance(data, dict) else {}, 'No image data provided'
+        options = data
+        image_bytes = decode_base64(data['image'])
+        if image_bytes is None:
+            return None, options, 'Failed to decode image'
+
+    if image_bytes is None or len(image_bytes) == 0:
+        return None, options, 'No image data provided'
+    return image_bytes, options, None
+
+
+def read_image_upload(req) -> Tuple[Optional[object], dict, Optional[str]]:
+    """
+    Decode the image carried by a Flask request
+
+    Returns:
+        (image, options, error) - error is None on success
+    """
+    image_bytes, options, error = read_image_bytes(req)
+    if error:
+        return None, options, error
+
+    image = decode_image(image_bytes)
+    if image is None:
+        return None, options, 'Failed to decode image'
+    return image, options, None
@@ -0,0 +1,359 @@
+"""
+Inference process pool for the SonoSight backend
+Runs EyeDetector in worker processes, handing decoded frames over through
+a shared-memory FrameRing so analysis is not bound by the server's GIL
+"""
+
+import itertools
+import multiprocessing
+import os
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional
+
+from frame_ring import FrameRing
+
+
+def _worker_main(worker_id: int, ring_spec, detector_kwargs: Dict, warm_up: bool,
+                 tasks, results):
+    """
+    Worker process: build a detector, then analyze frames until told to stop
+
+    Tasks are (task_id, frame, prefer_right_eye, options, sent_at) where
+    frame is ('shm', slot, shape, dtype) for ring slots or ('inline', array)
+    for frames too large for a slot; None stops the worker. The worker
+    reports 'taken' when it picks up a task and 'done' with its result.
+    """
+    sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    # Forked children share the creator's resource tracker
+    ring = FrameRing.attach(*ring_spec, untrack=False)
+    try:
+        from lib.eye_detector import EyeDetector
+        detector = EyeDetector(**detector_kwargs)
+        warmup_ms = detector.warm_up() if warm_up else None
+    except Exception as e:
+        results.put(('ready', worker_id, None, f'{type(e).__name__}: {e}'))
+        ring.close()
+        return
+    results.put(('ready', worker_id, warmup_ms, None))
+
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        task_id, frame, prefer_right_eye, options, sent_at = task
+        dispatch_s = time.perf_counter() - sent_at
+        # Lets the pool fail this task if the process dies while on it
+        results.put(('taken', worker_id, task_id))
+        image = ring.view(*frame[1:]) if frame[0] == 'shm' else frame[1]
+        try:
+            result = detector.detect_eye(image, prefer_right_eye, **options)
+        except Exception as e:
+            result = {'success': False, 'error': f'Detection error: {str(e)}'}
+        # Drop the view before reporting: the slot is reused once released
+        del image
+        results.put(('done', worker_id, task_id, result, dispatch_s))
+
+    ring.close()
+
+
+class InferenceProcessPool:
+    """
+    EyeDetector worker processes fed through a shared-memory frame ring
+
+    Drop-in alternative to DetectorPool (detect, map, populate, stats,
+    shutdown). Each detect() copies the decoded frame into a free ring
+    slot once and sends only the slot reference to a worker, which
+    analyzes a view of the slot in place; the slot is released when the
+    worker's result arrives. Frames larger than a slot are pickled
+    instead and counted as 'inline'.
+
+    A worker that fails to build its detector is not counted; populate()
+    raises its error and ready stays unset. A worker that dies fails the
+    request it was analyzing (and every pending one if none is left).
+
+    Workers are always forked: a spawned child would re-import the
+    server module (and start a pool of its own) and could not share the
+    creator's view of the ring. Where fork is unavailable (Windows),
+    supported() is False and the server keeps DetectorPool.
+    """
+
+    # Seconds between worker liveness checks while no result arrives
+    POLL_INTERVAL = 0.5
+
+    def __init__(self, ring: FrameRing, size: int = 2,
+                 detector_kwargs: Optional[Dict] = None, warm_up: bool = True,
+                 timing_hook: Optional[Callable[[Dict[str, float]], None]] = None):
+        """
+        Set up the pool; the worker processes start on first use
+
+        start() (called by populate() and detect()) forks the workers,
+        which build and warm up their detectors in the background, and
+        populate() waits until every one is ready. Nothing is forked while
+        the server module is being imported.
+
+        Args:
+            ring: Frame ring owned by this process
+            size: Number of worker processes
+            detector_kwargs: EyeDetector constructor arguments
+            warm_up: Run EyeDetector.warm_up() in each worker
+            timing_hook: Called in this process with each result's
+                timings_ms (detector hooks cannot cross processes)
+        """
+        self.size = max(1, int(size))
+        self.ring = ring
+        self.timing_hook = timing_hook
+        self.ready = threading.Event()
+        self.warmup_ms: List[float] = []
+        self.error: Optional[str] = None
+
+        self._detector_kwargs = detector_kwargs or {}
+        self._warm_up = warm_up
+        self._tasks = None
+        self._results = None
+        self._processes = []
+        self._started = False
+
+        self._ids = itertools.count()
+        self._pending: Dict[int, tuple] = {}
+        self._taken: Dict[int, int] = {}   # worker id -> task it is analyzing
+        self._reported = set()   # workers that sent 'ready' (with or without error)
+        self._working = set()    # workers whose detector was built
+        self._dead = set()
+        self._closing = False
+        self._lock = threading.Lock()
+        self._startup_done = threading.Event()
+        self._counters = {'frames': 0, 'inline': 0, 'write_ms': 0.0, 'dispatch_ms': 0.0}
+        self._executor = ThreadPoolExecutor(max_workers=self.size,
+                                            thread_name_prefix='inference')
+        self._collector = threading.Thread(target=self._collect, name='inference-results',
+                                           daemon=True)
+
+    @staticmethod
+    def supported() -> bool:
+        """Whether worker processes can be forked on this platform"""
+        return 'fork' in multiprocessing.get_all_start_methods()
+
+    def start(self):
+        """
+        Fork the worker processes and start collecting results (once)
+
+        Raises:
+            RuntimeError: If the platform cannot fork
+        """
+        with self._lock:
+            if self._started:
+                return
+            if self._closing:
+                raise RuntimeError('Inference pool is shut down')
+            if not self.supported():
+                raise RuntimeError('Inference worker processes need the fork start method')
+            context = multiprocessing.get_context('fork')
+            self._tasks = context.Queue()
+            self._results = context.Queue()
+            self._processes = [
+                context.Process(target=_worker_main, name=f'inference-{i}', daemon=True,
+                                args=(i, self.ring.spec, self._detector_kwargs, self._warm_up,
+                                      self._tasks, self._results))
+                for i in range(self.size)
+            ]
+            for process in self._processes:
+                process.start()
+            self._collector.start()
+            self._started = True
+
+    def populate(self, warm_up: bool = True, timeout: Optional[float] = None):
+        """
+        Wait until every worker has built (and warmed up) its detector
+        (warm_up is decided when the workers start; kept for DetectorPool
+        compatibility)
+
+        Raises:
+            RuntimeError: If a worker failed to build its detector
+        """
+        self.start()
+        if not self._startup_done.wait(timeout):
+            raise TimeoutError('Inference workers did not start in time')
+        if self.error:
+            raise RuntimeError(self.error)
+
+    def _collect(self):
+        """Result thread: resolve futures, release ring slots, reap dead workers"""
+        next_check = time.monotonic() + self.POLL_INTERVAL
+        while True:
+            try:
+                message = self._results.get(timeout=self.POLL_INTERVAL)
+            except queue.Empty:
+                message = ()
+            if message is None:
+                break
+            if time.monotonic() >= next_check:
+                # Checked on a timer too, so other workers' results cannot starve it
+                self._reap()
+                next_check = time.monotonic() + self.POLL_INTERVAL
+            if not message:
+                continue
+            kind = message[0]
+            if kind == 'ready':
+                _, worker_id, warmup_ms, error = message
+                with self._lock:
+                    self._reported.add(worker_id)
+                    if error:
+                        self.error = self.error or f'Inference worker failed: {error}'
+                    else:
+                        self._working.add(worker_id)
+                        if warmup_ms is not None:
+                            self.warmup_ms.append(round(warmup_ms, 1))
+                    self._check_startup()
+                continue
+
+            if kind == 'taken':
+                _, worker_id, task_id = message
+                with self._lock:
+                    self._taken[worker_id] = task_id
+                continue
+
+            _, worker_id, task_id, result, dispatch_s = message
+            with self._lock:
+                if self._taken.get(worker_id) == task_id:
+                    del self._taken[worker_id]
+                entry = self._pending.pop(task_id, None)
+                self._counters['dispatch_ms'] += dispatch_s * 1000
+            if entry is None:
+                continue
+            future, slot, write_s = entry
+            if slot is not None:
+                self.ring.release(slot)
+            if 'timings_ms' in result:
+                result['timings_ms']['handoff'] = round((write_s + dispatch_s) * 1000, 3)
+                if self.timing_hook is not None:
+                    self.timing_hook(result['timings_ms'])
+            future.set_result(result)
+
+    def _check_startup(self):
+        """Set ready once every worker works, or end startup on the first error"""
+        if self.error:
+            self._startup_done.set()
+        elif len(self._reported) == self.size:
+            self.ready.set()
+            self._startup_done.set()
+
+    def _reap(self):
+        """Fail the tasks of worker processes that exited unexpectedly"""
+        failed = {}
+        with self._lock:
+            if self._closing:
+                return
+            for worker_id, process in enumerate(self._processes):
+                if worker_id in self._dead or process.is_alive():
+                    continue
+                self._dead.add(worker_id)
+                self._working.discard(worker_id)
+                reason = f'Inference worker {worker_id} exited (code {process.exitcode})'
+                print(f"Error: {reason}")
+                if worker_id not in self._reported:
+                    self.error = self.error or f'{reason} during startup'
+                task_id = self._taken.pop(worker_id, None)
+                if task_id in self._pending:
+                    failed[task_id] = reason
+            if self._dead and not self._working:
+                # Nobody is left to pick up the queued tasks either
+                self.error = self.error or 'All inference workers exited'
+                self.ready.clear()
+                for task_id in self._pending:
+                    failed.setdefault(task_id, self.error)
+            self._check_startup()
+            entries = [(self._pending.pop(task_id), reason) for task_id, reason in failed.items()]
+        for (future, slot, _), reason in entries:
+            if slot is not None:
+                self.ring.release(slot)
+            future.set_exception(RuntimeError(reason))
+
+    def detect(self, image, prefer_right_eye: bool = True,
+               timeout: Optional[float] = None, **options) -> Dict:
+        """
+        Run detect_eye in a worker process
+
+        Args:
+            timeout: Seconds to wait for a free ring slot (None = forever)
+
+        Raises:
+            RingFull: If no slot became free within timeout
+            RuntimeError: If the worker analyzing the frame exited
+        """
+        self.start()
+        task_id = next(self._ids)
+        future = Future()
+        start = time.perf_counter()
+        if self.ring.fits(image):
+            slot = self.ring.acquire(timeout=timeout)
+            try:
+                frame = ('shm', slot) + self.ring.write(slot, image)
+            except Exception:
+                self.ring.release(slot)
+                raise
+        else:
+            slot, frame = None, ('inline', image)
+        write_s = time.perf_counter() - start
+
+        with self._lock:
+            if self._dead and not self._working:
+                if slot is not None:
+                    self.ring.release(slot)
+                raise RuntimeError(self.error)
+            self._pending[task_id] = (future, slot, write_s)
+            self._counters['frames'] += 1
+            self._counters['inline'] += slot is None
+            self._counters['write_ms'] += write_s * 1000
+        self._tasks.put((task_id, frame, prefer_right_eye, options, time.perf_counter()))
+        return future.result()
+
+    def map(self, fn: Callable, items: List) -> List:
+        """Apply fn to every item on the pool's dispatch threads, preserving order"""
+        return list(self._executor.map(fn, items))
+
+    def stats(self) -> Dict:
+        """Worker occupancy, ring slots and average per-frame handoff cost"""
+        with self._lock:
+            available = len(self._working)
+            busy = len(self._pending)
+            counters = dict(self._counters)
+        frames = counters['frames']
+        return {
+            'size': self.size,
+            'available': available,
+            'busy': busy,
+            'idle': max(0, available - busy),
+            'ready': self.ready.is_set(),
+            'error': self.error,
+            'processes_alive': sum(p.is_alive() for p in self._processes),
+            'ring': self.ring.stats(),
+            'handoff': {
+                'frames': frames,
+                'inline': counters['inline'],
+                'write_ms': round(counters['write_ms'] / frames, 3) if frames else None,
+                'dispatch_ms': round(counters['dispatch_ms'] / frames, 3) if frames else None
+            }
+        }
+
+    def shutdown(self):
+        """Stop the workers and free the frame ring"""
+        with self._lock:
+            self._closing = True
+            started = self._started
+        if not started:
+            self._executor.shutdown(wait=True)
+            self.ring.close()
+            return
+        for _ in self._processes:
+            self._tasks.put(None)
+        for process in self._processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+        self._results.put(None)
+        self._executor.shutdown(wait=True)
+        self.ring.close()
@@ -0,0 +1,173 @@
+"""
+Ingest buffer for the SonoSight sensor ingestion service
+Accepts readings from request threads and flushes them to a sink in
+batches from one background thread, retrying failed batches
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Dict, List, Optional
+
+from sensor_sinks import SinkError
+
+
+class BufferFull(Exception):
+    """The buffer is at capacity (the sink is down or too slow)"""
+
+
+class IngestBuffer:
+    """
+    Bounded in-memory buffer with a background bulk flusher
+
+    A flush is triggered when batch_size readings are waiting or
+    flush_interval seconds have passed since the last one. Batches that
+    fail with SinkError go back to the front of the buffer and are retried
+    with exponential backoff; while the buffer is full, add() raises
+    BufferFull so callers can push back on devices instead of losing
+    readings. A batch the sink refuses for good (BatchRejected) or that
+    fails with any other exception is dropped (counted as 'dropped') so
+    the flusher thread keeps running.
+    """
+
+    def __init__(self, sink, batch_size: int = 500, flush_interval: float = 1.0,
+                 max_buffer: int = 100000, max_backoff: float = 30.0):
+        """
+        Create the buffer and start its flusher thread
+
+        Args:
+            sink: Object with write(readings) and close()
+            batch_size: Readings per sink write
+            flush_interval: Longest time a reading waits before being flushed
+            max_buffer: Readings held before add() raises BufferFull
+            max_backoff: Upper bound on the retry delay after sink errors
+        """
+        self.sink = sink
+        self.batch_size = max(1, int(batch_size))
+        self.flush_interval = flush_interval
+        self.max_buffer = max_buffer
+        self.max_backoff = max_backoff
+        self._readings = deque()
+        self._cond = threading.Condition()
+        self._closing = False
+        self._started = time.time()
+        self._counters = {'received': 0, 'refused': 0, 'flushed': 0, 'dropped': 0,
+                          'flushes': 0, 'failures': 0, 'flush_ms_total': 0.0, 'flush_ms_max': 0.0}
+        self._last_error: Optional[str] = None
+        self._thread = threading.Thread(target=self._run, name='ingest-flusher', daemon=True)
+        self._thread.start()
+
+    def add(self, readings: List[Dict]) -> int:
+        """
+        Queue validated readings for the next flush
+
+        Raises:
+            BufferFull: If accepting them would exceed max_buffer
+        """
+        with self._cond:
+            if len(self._readings) + len(readings) > self.max_buffer:
+                self._counters['refused'] += len(readings)
+                raise BufferFull(f'Ingest buffer full ({self.max_buffer} readings)')
+            self._readings.extend(readings)
+            self._counters['received'] += len(readings)
+            if len(self._readings) >= self.batch_size:
+                self._cond.notify()
+        return len(readings)
+
+    def _take_batch(self) -> List[Dict]:
+        """Pop up to batch_size readings (caller holds the lock)"""
+        count = min(self.batch_size, len(self._readings))
+        return [self._readings.popleft() for _ in range(count)]
+
+    def _write(self, batch: List[Dict]) -> bool:
+        """Write one batch; on failure put it back at the front"""
+        start = time.perf_counter()
+        try:
+            self.sink.write(batch)
+        except SinkError as e:
+            with self._cond:
+                self._readings.extendleft(reversed(batch))
+                self._counters['failures'] += 1
+                self._last_error = str(e)
+            print(f"Warning: {e}")
+            return False
+        except Exception as e:
+            # BatchRejected or another error that is not a sink outage: the
+            # sink cannot take this batch, and retrying it would block every
+            # later reading, so drop it and keep flushing
+            with self._cond:
+                self._counters['dropped'] += len(batch)
+                self._last_error = f'{type(e).__name__}: {e}'
+            print(f"Error: dropped a batch of {len(batch)} readings: {type(e).__name__}: {e}")
+            return True
+        elapsed_ms = (time.perf_counter() - start) * 1000
+        with self._cond:
+            self._counters['flushed'] += len(batch)
+            self._counters['flushes'] += 1
+            self._counters['flush_ms_total'] += elapsed_ms
+            self._counters['flush_ms_max'] = max(self._counters['flush_ms_max'], elapsed_ms)
+        return True
+
+    def _run(self):
+        """Flusher thread: write full batches, or whatever is due on the interval"""
+        backoff = 0.0
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            with self._cond:
+                while (not self._closing and len(self._readings) < self.batch_size
+                       and time.monotonic() < deadline):
+                    self._cond.wait(max(0.0, deadline - time.monotonic()))
+                if self._closing:
+                    return
+                batch = self._take_batch()
+            deadline = time.monotonic() + self.flush_interval
+            if not batch:
+                continue
+            if self._write(batch):
+                backoff = 0.0
+            else:
+                backoff = min(self.max_backoff, max(0.5, backoff * 2))
+                with self._cond:
+                    self._cond.wait_for(lambda: self._closing, timeout=backoff)
+
+    def flush(self) -> int:
+        """Write everything buffered now (stops at the first sink error)"""
+        flushed = 0
+        while True:
+            with self._cond:
+                batch = self._take_batch()
+            if not batch or not self._write(batch):
+                return flushed
+            flushed += len(batch)
+
+    def stats(self) -> Dict:
+        """Ingest throughput, flush latency and buffer occupancy"""
+        with self._cond:
+            counters = dict(self._counters)
+            buffered = len(self._readings)
+        uptime = time.time() - self._started
+        flushes = counters.pop('flushes')
+        flush_ms_total = counters.pop('flush_ms_total')
+        return {
+            'buffered': buffered,
+            'max_buffer': self.max_buffer,
+            'batch_size': self.batch_size,
+            'flushes': flushes,
+            'avg_batch': round(counters['flushed'] / flushes, 1) if flushes else 0.0,
+            'avg_flush_ms': round(flush_ms_total / flushes, 2) if flushes else None,
+            'max_flush_ms': round(counters.pop('flush_ms_max'), 2),
+            'uptime_s': round(uptime, 1),
+            'ingest_per_s': round(counters['received'] / uptime, 1) if uptime else 0.0,
+            'flush_per_s': round(counters['flushed'] / uptime, 1) if uptime else 0.0,
+            'last_error': self._last_error,
+            **counters
+        }
+
+    def close(self):
+        """Stop the flusher, write what is left and close the sink"""
+        with self._cond:
+            self._closing = True
+            self._cond.notify_all()
+        self._thread.join()
+        self.flush()
+        self.sink.close()
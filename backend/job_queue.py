@@ -0,0 +1,167 @@
+"""
+In-process job queue for the SonoSight backend
+Lets clients submit an analysis, get a job id immediately and poll for
+the result, so HTTP latency stays flat under bursty load
+"""
+
+import itertools
+import queue
+import threading
+import time
+import uuid
+from typing import Callable, Dict, Optional
+
+
+class QueueFull(Exception):
+    """Raised when the backlog is at capacity"""
+
+
+class JobQueue:
+    """
+    Bounded backlog of analysis jobs served by a fixed set of worker threads
+
+    Jobs move through queued -> running -> done | failed. Finished jobs are
+    kept for result_ttl seconds so clients can poll for them.
+    """
+
+    def __init__(self, workers: int = 2, max_backlog: int = 64,
+                 result_ttl: float = 300.0):
+        """
+        Start the worker threads
+
+        Args:
+            workers: Number of jobs processed concurrently
+            max_backlog: Queued (not yet running) jobs accepted before QueueFull
+            result_ttl: Seconds a finished job stays available for polling
+        """
+        self.workers = max(1, int(workers))
+        self.max_backlog = max(1, int(max_backlog))
+        self.result_ttl = result_ttl
+        self._pending = queue.Queue(maxsize=self.max_backlog)
+        self._jobs: Dict[str, Dict] = {}
+        self._sequence = itertools.count()   # submission order, for queue positions
+        self._lock = threading.Lock()
+        self._counters = {'submitted': 0, 'rejected': 0, 'done': 0, 'failed': 0}
+        self._threads = []
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker, name=f'job-worker-{i}',
+                                      daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, fn: Callable[[], Dict]) -> str:
+        """
+        Queue a job
+
+        Args:
+            fn: Zero-argument callable returning the job's result dict
+
+        Returns:
+            Job id
+
+        Raises:
+            QueueFull: If max_backlog jobs are already waiting
+        """
+        self._purge_expired()
+        job_id = uuid.uuid4().hex
+        job = {
+            'id': job_id,
+            'seq': next(self._sequence),
+            'status': 'queued',
+            'submitted_at': time.time(),
+            'started_at': None,
+            'finished_at': None,
+            'result': None,
+            'error': None
+        }
+        with self._lock:
+            self._jobs[job_id] = job
+        try:
+            self._pending.put_nowait((job_id, fn))
+        except queue.Full:
+            with self._lock:
+                del self._jobs[job_id]
+                self._counters['rejected'] += 1
+            raise QueueFull(f'Job backlog full ({self.max_backlog} jobs)')
+        with self._lock:
+            self._counters['submitted'] += 1
+        return job_id
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        """
+        Public view of a job with timings, or None if unknown/expired
+
+        Queued and running jobs report their position: 1 for the next job
+        to start (jobs run in submission order), 0 once running.
+        """
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            job = dict(job)
+            if job['status'] == 'queued':
+                position = 1 + sum(1 for other in self._jobs.values()
+                                   if other['status'] == 'queued' and other['seq'] < job['seq'])
+            else:
+                position = 0
+
+        view = {'job_id': job['id'], 'status': job['status']}
+        now = time.time()
+        started = job['started_at']
+        finished = job['finished_at']
+        view['timing'] = {
+            'queue_ms': round(((started or now) - job['submitted_at']) * 1000, 1),
+            'run_ms': round(((finished or now) - started) * 1000, 1) if started else None,
+            'total_ms': round(((finished or now) - job['submitted_at']) * 1000, 1)
+        }
+        if job['status'] == 'done':
+            view['result'] = job['result']
+        elif job['status'] == 'failed':
+            view['error'] = job['error']
+        else:
+            view['position'] = position
+        return view
+
+    def stats(self) -> Dict:
+        """Backlog occupancy and lifetime counters"""
+        with self._lock:
+            running = sum(1 for job in self._jobs.values() if job['status'] == 'running')
+            counters = dict(self._counters)
+        return {
+            'workers': self.workers,
+            'queued': self._pending.qsize(),
+            'running': running,
+            'max_backlog': self.max_backlog,
+            **counters
+        }
+
+    def _worker(self):
+        """Worker loop: run queued jobs forever"""
+        while True:
+            job_id, fn = self._pending.get()
+            with self._lock:
+                job = self._jobs.get(job_id)
+                if job is None:
+                    continue
+                job['status'] = 'running'
+                job['started_at'] = time.time()
+            try:
+                result = fn()
+                status, error = 'done', None
+            except Exception as e:
+                result, status, error = None, 'failed', f'Server error: {str(e)}'
+            with self._lock:
+                job['result'] = result
+                job['error'] = error
+                job['status'] = status
+                job['finished_at'] = time.time()
+                self._counters[status] += 1
+
+    def _purge_expired(self):
+        """Drop finished jobs older than result_ttl"""
+        cutoff = time.time() - self.result_ttl
+        with self._lock:
+            expired = [job_id for job_id, job in self._jobs.items()
+                       if job['finished_at'] is not None and job['finished_at'] < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
@@ -0,0 +1,133 @@
+"""
+Prometheus metrics for the SonoSight backend
+Minimal text-format exposition (no client library dependency): labelled
+histograms for latencies plus callback-based gauges and counters
+"""
+
+import bisect
+import threading
+from typing import Callable, Dict, List, Tuple, Union
+
+# Latency buckets in seconds, from sub-millisecond stages to slow requests
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _format_labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    pairs = ','.join(
+        '{}="{}"'.format(k, str(v).replace('\\', '\\\\').replace('"', '\\"'))
+        for k, v in labels.items())
+    return '{' + pairs + '}'
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value))
+
+
+class Histogram:
+    """Cumulative-bucket histogram with one label dimension"""
+
+    def __init__(self, name: str, help_text: str, label: str,
+                 buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label = label
+        self.buckets = tuple(sorted(buckets))
+        self._series: Dict[str, List] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_value: str, seconds: float):
+        """Record one observation for the given label value"""
+        index = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                # [per-bucket counts (+Inf last), sum, count]
+                series = self._series[label_value] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += seconds
+            series[2] += 1
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help_text}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            snapshot = {k: (list(v[0]), v[1], v[2]) for k, v in self._series.items()}
+        for label_value in sorted(snapshot):
+            counts, total, count = snapshot[label_value]
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                labels = _format_labels({self.label: label_value, 'le': _format_value(bound)})
+                lines.append(f'{self.name}_bucket{labels} {cumulative}')
+            labels = _format_labels({self.label: label_value})
+            lines.append(f'{self.name}_sum{labels} {_format_value(total)}')
+            lines.append(f'{self.name}_count{labels} {count}')
+        return lines
+
+
+class CallbackMetric:
+    """Gauge or counter whose values are read from a callback at scrape time"""
+
+    def __init__(self, name: str, help_text: str, metric_type: str,
+                 callback: Callable[[], Union[float, Dict[Tuple, float]]],
+                 label_names: Tuple[str, ...] = ()):
+        """
+        Args:
+            callback: Returns a number, or a dict mapping label-value tuples
+                (matching label_names) to numbers; None values are skipped
+        """
+        self.name = name
+        self.help_text = help_text
+        self.metric_type = metric_type
+        self.callback = callback
+        self.label_names = label_names
+
+    def render(self) -> List[str]:
+        lines = [f'# HELP {self.name} {self.help_text}',
+                 f'# TYPE {self.name} {self.metric_type}']
+        values = self.callback()
+        if not isinstance(values, dict):
+            values = {(): values}
+        for label_values, value in values.items():
+            if value is None:
+                continue
+            labels = _format_labels(dict(zip(self.label_names, label_values)))
+            lines.append(f'{self.name}{labels} {_format_value(value)}')
+        return lines
+
+
+class MetricsRegistry:
+    """Collection of metrics rendered together for /metrics"""
+
+    def __init__(self):
+        self._metrics = []
+
+    def histogram(self, name: str, help_text: str, label: str,
+                  buckets: Tuple[float, ...] = DEFAULT_BUCKETS) -> Histogram:
+        metric = Histogram(name, help_text, label, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def gauge(self, name: str, help_text: str, callback: Callable,
+              label_names: Tuple[str, ...] = ()) -> CallbackMetric:
+        metric = CallbackMetric(name, help_text, 'gauge', callback, label_names)
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name: str, help_text: str, callback: Callable,
+                label_names: Tuple[str, ...] = ()) -> CallbackMetric:
+        metric = CallbackMetric(name, help_text, 'counter', callback, label_names)
+        self._metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
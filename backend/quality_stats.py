@@ -0,0 +1,52 @@
+"""
+Quality gate statistics for the SonoSight backend
+Counts how many fresh analyses the detector's pre-inference quality gate
+let through and why it rejected the rest, across pooled detectors and
+worker processes (results carry the outcome back to the server)
+"""
+
+import threading
+from typing import Dict
+
+# Rejection reasons reported by EyeDetector.check_quality, in check order
+REASONS = ('too_dark', 'too_bright', 'overexposed', 'low_contrast', 'blurry')
+
+
+class QualityStats:
+    """Thread-safe tally of quality gate outcomes"""
+
+    def __init__(self, enabled: bool = True):
+        """
+        Args:
+            enabled: Whether the detectors run the gate (counts stay 0 if not)
+        """
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._counters = {'checked': 0, 'passed': 0, 'rejected': 0}
+        self._reasons = dict.fromkeys(REASONS, 0)
+
+    def record(self, result: Dict):
+        """Count one gated detection result"""
+        if not self.enabled:
+            return
+        quality = result.get('quality')
+        with self._lock:
+            self._counters['checked'] += 1
+            if quality is None:
+                self._counters['passed'] += 1
+            else:
+                self._counters['rejected'] += 1
+                self._reasons[quality['reason']] = self._reasons.get(quality['reason'], 0) + 1
+
+    def stats(self) -> Dict:
+        """Counters, rejection rate and rejections per reason"""
+        with self._lock:
+            counters = dict(self._counters)
+            reasons = dict(self._reasons)
+        return {
+            'enabled': self.enabled,
+            'reject_rate': (round(counters['rejected'] / counters['checked'], 3)
+                            if counters['checked'] else 0.0),
+            **counters,
+            'reasons': reasons
+        }
@@ -0,0 +1,178 @@
+"""
+Content-hash result cache for the SonoSight backend
+Repeated uploads of the same photo (retries, reopening the risk page)
+are answered without re-running Face Mesh and pupil segmentation
+"""
+
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+class ResultCache:
+    """
+    LRU cache of analysis results with TTL and an optional on-disk tier
+
+    Keys are SHA-256 digests of the uploaded image bytes plus the eye
+    preference. The memory tier holds max_entries results; when disk_dir
+    is set every result is also written there as JSON so it survives
+    restarts, bounded by max_disk_entries.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: float = 3600.0,
+                 disk_dir: Optional[str] = None, max_disk_entries: int = 10000):
+        """
+        Create the cache
+
+        Args:
+            max_entries: Results kept in memory (0 disables the cache)
+            ttl: Seconds a result stays valid in either tier
+            disk_dir: Directory for the persistent tier (None = memory only)
+            max_disk_entries: Files kept in disk_dir before the oldest are pruned
+        """
+        self.max_entries = max(0, int(max_entries))
+        self.ttl = ttl
+        self.disk_dir = disk_dir
+        self.max_disk_entries = max_disk_entries
+        self._entries: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self._puts = 0
+        self._counters = {'hits': 0, 'misses': 0, 'disk_hits': 0,
+                          'evictions': 0, 'expired': 0}
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+
+    @staticmethod
+    def make_key(image_bytes, prefer_right_eye: bool, *variants: str) -> str:
+        """
+        Cache key for encoded image bytes and eye preference
+
+        Args:
+            variants: Further analysis settings that change the result
+                (e.g. the pupil backend), appended in order
+        """
+        digest = hashlib.sha256(image_bytes).hexdigest()
+        return '-'.join((digest, 'R' if prefer_right_eye else 'L') + variants)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0
+
+    def get(self, key: str) -> Optional[Dict]:
+        """Cached result for key, or None on a miss"""
+        if not self.enabled:
+            return None
+
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, result = entry
+                if now - stored_at <= self.ttl:
+                    self._entries.move_to_end(key)
+                    self._counters['hits'] += 1
+                    return result
+                del self._entries[key]
+                self._counters['expired'] += 1
+
+        result = self._disk_get(key, now)
+        with self._lock:
+            if result is None:
+                self._counters['misses'] += 1
+                return None
+            self._counters['hits'] += 1
+            self._counters['disk_hits'] += 1
+            self._insert(key, result, now)
+        return result
+
+    def put(self, key: str, result: Dict):
+        """Store a result in memory and, if configured, on disk"""
+        if not self.enabled:
+            return
+        now = time.time()
+        with self._lock:
+            self._insert(key, result, now)
+            self._puts += 1
+            prune = self._puts % 64 == 0
+        self._disk_put(key, result)
+        if prune:
+            self._prune_disk(now)
+
+    def stats(self) -> Dict:
+        """Hit/miss counters and tier sizes"""
+        with self._lock:
+            counters = dict(self._counters)
+            size = len(self._entries)
+        lookups = counters['hits'] + counters['misses']
+        return {
+            'enabled': self.enabled,
+            'size': size,
+            'max_entries': self.max_entries,
+            'ttl_s': self.ttl,
+            'disk': bool(self.disk_dir),
+            'hit_rate': round(counters['hits'] / lookups, 3) if lookups else 0.0,
+            **counters
+        }
+
+    def _insert(self, key: str, result: Dict, stored_at: float):
+        """Insert under the lock, evicting least recently used entries"""
+        self._entries[key] = (stored_at, result)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._counters['evictions'] += 1
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, f'{key}.json')
+
+    def _disk_get(self, key: str, now: float) -> Optional[Dict]:
+        """Read a fresh result from the disk tier"""
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            if now - os.path.getmtime(path) > self.ttl:
+                os.remove(path)
+                return None
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _disk_put(self, key: str, result: Dict):
+        """Write a result to the disk tier atomically"""
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        tmp_path = f'{path}.{threading.get_ident()}.tmp'
+        try:
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(result, f)
+            os.replace(tmp_path, path)
+        except (OSError, TypeError, ValueError) as e:
+            print(f"Warning: Result cache write failed: {e}")
+
+    def _prune_disk(self, now: float):
+        """Remove expired files and the oldest beyond max_disk_entries"""
+        if not self.disk_dir:
+            return
+        try:
+            files = []
+            for name in os.listdir(self.disk_dir):
+                if not name.endswith('.json'):
+                    continue
+                path = os.path.join(self.disk_dir, name)
+                mtime = os.path.getmtime(path)
+                if now - mtime > self.ttl:
+                    os.remove(path)
+                else:
+                    files.append((mtime, path))
+            files.sort()
+            for _, path in files[:max(0, len(files) - self.max_disk_entries)]:
+                os.remove(path)
+        except OSError as e:
+            print(f"Warning: Result cache prune failed: {e}")
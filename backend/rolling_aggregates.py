@@ -0,0 +1,191 @@
+"""
+Rolling IOP aggregates for the SonoSight sensor ingestion service
+Keeps mean, min/max, EWMA and trend slope per device over fixed windows,
+updated in constant time per reading so summaries never rescan history
+"""
+
+import math
+import threading
+import time
+from typing import Dict, List, Optional
+
+# Window name -> length in milliseconds
+WINDOWS = {
+    '1h': 3600 * 1000,
+    '24h': 24 * 3600 * 1000,
+    '30d': 30 * 24 * 3600 * 1000,
+}
+
+# Buckets per window; a window is resolved to 1/BUCKETS of its length
+BUCKETS = 60
+
+MS_PER_HOUR = 3600 * 1000
+
+
+class _Bucket:
+    """Sums over the readings in one time bucket"""
+
+    __slots__ = ('index', 'count', 'sum_v', 'sum_t', 'sum_tt', 'sum_tv', 'min', 'max')
+
+    def __init__(self, index: int):
+        self.index = index
+        self.count = 0
+        self.sum_v = self.sum_t = self.sum_tt = self.sum_tv = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+
+class RollingWindow:
+    """
+    Ring of BUCKETS buckets covering one window length
+
+    A reading updates a single bucket; a bucket that has fallen out of
+    the window is reset when its slot is reused, so nothing is ever
+    rescanned. The EWMA uses the window length as its time constant.
+    """
+
+    def __init__(self, length_ms: int, origin_ms: int):
+        self.length_ms = length_ms
+        self.width_ms = length_ms // BUCKETS
+        # Times are kept in hours since origin so the regression sums stay precise
+        self.origin_ms = origin_ms
+        self.buckets: List[Optional[_Bucket]] = [None] * BUCKETS
+        self.ewma: Optional[float] = None
+        self.ewma_time: Optional[int] = None
+
+    def add(self, timestamp: int, value: float):
+        index = timestamp // self.width_ms
+        slot = index % BUCKETS
+        bucket = self.buckets[slot]
+        if bucket is None or bucket.index < index:
+            bucket = self.buckets[slot] = _Bucket(index)
+        elif bucket.index > index:
+            return  # older than the window already covered by this slot
+        t = (timestamp - self.origin_ms) / MS_PER_HOUR
+        bucket.count += 1
+        bucket.sum_v += value
+        bucket.sum_t += t
+        bucket.sum_tt += t * t
+        bucket.sum_tv += t * value
+        bucket.min = min(bucket.min, value)
+        bucket.max = max(bucket.max, value)
+
+        if self.ewma is None:
+            self.ewma, self.ewma_time = value, timestamp
+        elif timestamp > self.ewma_time:
+            alpha = 1.0 - math.exp(-(timestamp - self.ewma_time) / self.length_ms)
+            self.ewma += alpha * (value - self.ewma)
+            self.ewma_time = timestamp
+
+    def summary(self, now_ms: int) -> Dict:
+        """Aggregate the buckets that are inside the window ending at now_ms"""
+        newest = now_ms // self.width_ms
+        count = 0
+        sum_v = sum_t = sum_tt = sum_tv = 0.0
+        low, high = math.inf, -math.inf
+        for bucket in self.buckets:
+            if bucket is None or not newest - BUCKETS < bucket.index <= newest:
+                continue
+            count += bucket.count
+            sum_v += bucket.sum_v
+            sum_t += bucket.sum_t
+            sum_tt += bucket.sum_tt
+            sum_tv += bucket.sum_tv
+            low, high = min(low, bucket.min), max(high, bucket.max)
+        if not count:
+            return {'count': 0, 'mean': None, 'min': None, 'max': None,
+                    'ewma': None, 'slope_per_hour': None}
+        denominator = count * sum_tt - sum_t * sum_t
+        slope = (count * sum_tv - sum_t * sum_v) / denominator if denominator > 1e-12 else None
+        return {
+            'count': count,
+            'mean': round(sum_v / count, 3),
+            'min': round(low, 3),
+            'max': round(high, 3),
+            'ewma': round(self.ewma, 3),
+            'slope_per_hour': round(slope, 5) if slope is not None else None,
+        }
+
+
+class RollingAggregates:
+    """
+    Per-device rolling windows over one reading field
+
+    update() is registered as a TimeSeriesStore listener, so each stored
+    reading is counted once even when the ingest buffer retries a batch.
+    Corrections to an already-stored reading are not re-applied.
+    """
+
+    def __init__(self, field: str = 'current_iop', windows: Dict[str, int] = WINDOWS):
+        self.field = field
+        self.windows = windows
+        self._lock = threading.Lock()
+        self._devices: Dict[str, Dict] = {}
+
+    def _add(self, device_id: str, timestamp: int, value: float):
+        """Apply one reading (caller holds the lock)"""
+        state = self._devices.get(device_id)
+        if state is None:
+            state = self._devices[device_id] = {
+                'windows': {name: RollingWindow(length, timestamp)
+                            for name, length in self.windows.items()},
+                'latest': None,
+            }
+        for window in state['windows'].values():
+            window.add(timestamp, value)
+        if state['latest'] is None or timestamp >= state['latest']['timestamp']:
+            state['latest'] = {'timestamp': timestamp, self.field: value}
+
+    def update(self, new: List[Dict], updated: Optional[List[Dict]] = None):
+        """Add newly stored readings; readings without the field are skipped"""
+        with self._lock:
+            for reading in new:
+                value = reading.get(self.field)
+                if value is not None:
+                    self._add(reading['device_id'], reading['timestamp'], value)
+
+    def rebuild(self, store):
+        """Replay the longest window of every stored device (used at startup)"""
+        longest = max(self.windows.values())
+        for device in store.devices():
+            if not device['count']:
+                continue
+            timestamps, values = store.column(device['device_id'], self.field,
+                                              start=device['last'] - longest)
+            with self._lock:
+                for timestamp, value in zip(timestamps.tolist(), values.tolist()):
+                    if value == value:  # skip NaN (missing)
+                        self._add(device['device_id'], timestamp, value)
+
+    def devices(self) -> List[str]:
+        with self._lock:
+            return sorted(self._devices)
+
+    def summary(self, device_id: str, now_ms: Optional[int] = None) -> Optional[Dict]:
+        """
+        Rolling statistics for one device
+
+        Args:
+            device_id: Device to summarise
+            now_ms: End of the windows (default: now, or the latest reading
+                    if that is later, e.g. for a device clock running ahead)
+
+        Returns:
+            Dictionary with 'latest' and per-window statistics, or None
+        """
+        with self._lock:
+            state = self._devices.get(device_id)
+            if state is None:
+                return None
+            latest = dict(state['latest'])
+            if now_ms is None:
+                now_ms = max(int(time.time() * 1000), latest['timestamp'])
+            windows = {name: window.summary(now_ms)
+                       for name, window in state['windows'].items()}
+        return {
+            'device_id': device_id,
+            'field': self.field,
+            'as_of': now_ms,
+            'latest': latest,
+            'windows': windows,
+        }
@@ -0,0 +1,288 @@
+"""
+Sensor Ingestion Service for SonoSight IOP devices
+Accepts batched readings from ESP8266 sensors, buffers them and writes
+them to the configured sink in bulk
+"""
+
+from flask import Flask, request, jsonify
+from flask_cors import CORS
+import atexit
+import math
+import os
+import time
+from typing import Dict, Optional, Tuple
+
+from change_feed import ChangeFeed, parse_changes_query
+from ingest_buffer import BufferFull, IngestBuffer
+from rolling_aggregates import RollingAggregates
+from sensor_sinks import READING_FIELDS, FanOutSink, create_sink
+from timeseries_store import TimeSeriesStore
+
+# Numeric reading fields (device_id and timestamp are handled separately)
+NUMERIC_FIELDS = tuple(f for f in READING_FIELDS if f not in ('device_id', 'timestamp'))
+
+# Sink the buffered readings are written to: sqlite, file or firebase
+SINK = os.environ.get('SONOSIGHT_INGEST_SINK', 'sqlite')
+# SQLite database / JSONL file path for the local sinks
+SINK_PATH = os.environ.get('SONOSIGHT_INGEST_PATH', 'sensor_readings.db')
+# Firebase Realtime Database URL and secret for the firebase sink
+FIREBASE_URL = os.environ.get('SONOSIGHT_FIREBASE_URL', '')
+FIREBASE_AUTH = os.environ.get('SONOSIGHT_FIREBASE_AUTH') or None
+# Directory of the columnar store behind GET /readings
+STORE_DIR = os.environ.get('SONOSIGHT_READINGS_DIR', 'sensor_store')
+# Readings per page of GET /readings (default and upper bound)
+PAGE_SIZE = int(os.environ.get('SONOSIGHT_READINGS_PAGE', 500))
+MAX_PAGE_SIZE = int(os.environ.get('SONOSIGHT_READINGS_MAX_PAGE', 5000))
+# Change feed shared with the API server (same file = one sequence)
+CHANGES_DB = os.environ.get('SONOSIGHT_CHANGES_DB', 'changes.db')
+CHANGES_RETENTION = int(os.environ.get('SONOSIGHT_CHANGES_RETENTION', 1000000))
+# Longest GET /changes long-poll in seconds
+CHANGES_MAX_WAIT = float(os.environ.get('SONOSIGHT_CHANGES_MAX_WAIT', 30))
+# Readings per bulk write, and the longest a reading waits to be written
+BATCH_SIZE = int(os.environ.get('SONOSIGHT_INGEST_BATCH', 500))
+FLUSH_INTERVAL = float(os.environ.get('SONOSIGHT_INGEST_INTERVAL', 1.0))
+# Readings buffered before devices are told to back off with 503
+MAX_BUFFER = int(os.environ.get('SONOSIGHT_INGEST_MAX_BUFFER', 100000))
+# Largest number of readings accepted in one request
+MAX_READINGS = int(os.environ.get('SONOSIGHT_INGEST_MAX_READINGS', 5000))
+# Address the development server binds when started with python sensor_ingest.py
+HOST = os.environ.get('SONOSIGHT_INGEST_HOST', '0.0.0.0')
+PORT = int(os.environ.get('SONOSIGHT_INGEST_PORT', 5001))
+
+app = Flask(__name__)
+CORS(app)
+
+store = TimeSeriesStore(STORE_DIR)
+# Rolling IOP statistics, rebuilt from the store and then kept current
+aggregates = RollingAggregates('current_iop')
+aggregates.rebuild(store)
+store.add_listener(aggregates.update)
+change_feed = ChangeFeed(CHANGES_DB, retention=CHANGES_RETENTION)
+
+
+def publish_readings(new, updated):
+    """Store listener: give every new or changed reading a sequence number"""
+    change_feed.append('reading', [
+        (op, f"{r['device_id']}/{r['timestamp']}", r)
+        for op, readings in (('insert', new), ('update', updated)) for r in readings])
+
+
+store.add_listener(publish_readings)
+sink = create_sink(SINK, FIREBASE_URL if SINK == 'firebase' else SINK_PATH, FIREBASE_AUTH)
+# The store is written first: it ignores readings it already holds, so a
+# batch retried after a sink failure is not stored twice
+ingest_buffer = IngestBuffer(FanOutSink([store, sink]), batch_size=BATCH_SIZE, flush_interval=FLUSH_INTERVAL,
+                             max_buffer=MAX_BUFFER)
+atexit.register(ingest_buffer.close)
+
+
+def validate_reading(reading, default_device_id: Optional[str] = None) -> Tuple[Optional[Dict], Optional[str]]:
+    """
+    Normalise one sensor reading
+
+    Args:
+        reading: Reading object as sent by the device
+        default_device_id: device_id from the enclosing batch, if any
+
+    Returns:
+        (reading, None) with numeric fields as floats (or None) and the
+        timestamp in epoch milliseconds, or (None, error message)
+    """
+    if not isinstance(reading, dict):
+        return None, 'reading must be an object'
+    device_id = reading.get('device_id', default_device_id)
+    if device_id is None or str(device_id).strip() == '':
+        return None, 'device_id is required'
+
+    clean = {'device_id': str(device_id)}
+    timestamp = reading.get('timestamp')
+    if timestamp is None:
+        clean['timestamp'] = int(time.time() * 1000)
+    else:
+        try:
+            clean['timestamp'] = int(timestamp)
+        except (TypeError, ValueError):
+            return None, f'timestamp must be epoch milliseconds, got {timestamp!r}'
+
+    for field in NUMERIC_FIELDS:
+        value = reading.get(field)
+        if value is None:
+            clean[field] = None
+            continue
+        try:
+            clean[field] = float(value)
+        except (TypeError, ValueError):
+            return None, f'{field} must be a number, got {value!r}'
+        if not math.isfinite(clean[field]):
+            return None, f'{field} must be finite, got {value!r}'
+    return clean, None
+
+
+@app.route('/health', methods=['GET'])
+def health_check():
+    """Health check endpoint"""
+    return jsonify({
+        'status': 'healthy',
+        'sink': SINK,
+        'buffered': ingest_buffer.stats()['buffered']
+    })
+
+
+@app.route('/readings', methods=['POST'])
+def ingest_readings():
+    """
+    Accept sensor readings
+
+    Body is one reading object, a list of readings, or
+    {"device_id": "...", "readings": [...]} where device_id applies to
+    readings that do not carry their own. Invalid readings are reported
+    and skipped; the rest are buffered for the next bulk write.
+    """
+    payload = request.get_json(silent=True)
+    default_device_id = None
+    if isinstance(payload, dict) and 'readings' in payload:
+        default_device_id = payload.get('device_id')
+        payload = payload['readings']
+    readings = payload if isinstance(payload, list) else [payload]
+
+    if payload is None or not readings:
+        return jsonify({'success': False, 'error': 'No readings provided'}), 400
+    if len(readings) > MAX_READINGS:
+        return jsonify({
+            'success': False,
+            'error': f'Too many readings ({len(readings)}), limit is {MAX_READINGS}'
+        }), 413
+
+    accepted, errors = [], []
+    for index, reading in enumerate(readings):
+        clean, error = validate_reading(reading, default_device_id)
+        if error:
+            errors.append({'index': index, 'error': error})
+        else:
+            accepted.append(clean)
+
+    if accepted:
+        try:
+            ingest_buffer.add(accepted)
+        except BufferFull as e:
+            response = jsonify({'success': False, 'error': str(e)})
+            response.headers['Retry-After'] = str(max(1, int(FLUSH_INTERVAL)))
+            return response, 503
+
+    status = 200 if accepted else 400
+    return jsonify({
+        'success': bool(accepted),
+        'accepted': len(accepted),
+        'rejected': len(errors),
+        'errors': errors[:20]
+    }), status
+
+
+def parse_int_arg(name: str, default: Optional[int] = None):
+    """Integer query-string argument; raises ValueError with a readable message"""
+    value = request.args.get(name)
+    if value is None or value == '':
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f'{name} must be an integer, got {value!r}')
+
+
+@app.route('/readings', methods=['GET'])
+def get_readings():
+    """
+    Readings of one device in a time range, paginated
+
+    Query: device (required), from / to (epoch ms, inclusive), limit,
+    cursor (next_cursor of the previous page), order (asc or desc)
+    """
+    device_id = request.args.get('device')
+    if not device_id:
+        return jsonify({'success': False, 'error': 'device is required'}), 400
+    order = request.args.get('order', 'asc')
+    if order not in ('asc', 'desc'):
+        return jsonify({'success': False, 'error': "order must be 'asc' or 'desc'"}), 400
+    try:
+        start = parse_int_arg('from')
+        end = parse_int_arg('to')
+        cursor = parse_int_arg('cursor')
+        limit = parse_int_arg('limit', PAGE_SIZE)
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 400
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    page = store.query(device_id, start, end, limit=limit, cursor=cursor,
+                       newest_first=order == 'desc')
+    return jsonify({
+        'success': True,
+        'device_id': device_id,
+        'count': len(page['readings']),
+        **page
+    })
+
+
+@app.route('/readings/devices', methods=['GET'])
+def list_devices():
+    """Devices in the store with reading counts and time span"""
+    return jsonify({'success': True, 'devices': store.devices()})
+
+
+@app.route('/readings/summary', methods=['GET'])
+def readings_summary():
+    """
+    Rolling IOP mean, min/max, EWMA and slope over 1h / 24h / 30d
+
+    Query: device (optional, default every device)
+    """
+    device_id = request.args.get('device')
+    if device_id:
+        summary = aggregates.summary(device_id)
+        if summary is None:
+            return jsonify({'success': False, 'error': f'No readings for {device_id}'}), 404
+        return jsonify({'success': True, **summary})
+    return jsonify({
+        'success': True,
+        'devices': [aggregates.summary(d) for d in aggregates.devices()]
+    })
+
+
+@app.route('/changes', methods=['GET'])
+def get_changes():
+    """
+    Readings and analyses stored or updated after a sequence number
+
+    Query: since (last_seq of the previous call, 0 to start), limit,
+    kind ('reading' or 'analysis'), wait (seconds to long-poll when
+    there is nothing new). When reset is true the cursor is no longer
+    covered by the feed: resync from /readings and continue from last_seq.
+    """
+    params, error = parse_changes_query(request.args, CHANGES_MAX_WAIT)
+    if error:
+        return jsonify({'success': False, 'error': error}), 400
+    return jsonify({'success': True, **change_feed.poll(**params)})
+
+
+@app.route('/ingest/stats', methods=['GET'])
+def ingest_stats():
+    """Ingest throughput, flush latency and buffer occupancy"""
+    return jsonify({'sink': SINK, **ingest_buffer.stats()})
+
+
+if __name__ == '__main__':
+    print("\n" + "="*75)
+    print("              SONOSIGHT SENSOR INGESTION SERVICE")
+    print(f"           Buffering readings into the {SINK} sink...")
+    print("="*75 + "\n")
+    print(f"Server running on http://localhost:{PORT}")
+    print("Endpoints:")
+    print("  GET  /health - Health check")
+    print("  POST /readings - Ingest one or many sensor readings")
+    print("  GET  /readings - Stored readings of a device by time range")
+    print("  GET  /readings/devices - Devices with stored readings")
+    print("  GET  /readings/summary - Rolling IOP statistics per device")
+    print("  GET  /changes - Change feed (since=<seq>, optional long-poll)")
+    print("  GET  /ingest/stats - Ingest throughput and buffer state")
+    print("\nPress CTRL+C to stop\n")
+
+    app.run(host=HOST, port=PORT, debug=False, threaded=True)
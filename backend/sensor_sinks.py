@@ -0,0 +1,221 @@
+"""
+Storage sinks for the SonoSight sensor ingestion service
+Each sink receives whole batches of validated IOP readings; the Firebase
+sink writes them with one multi-path PATCH over pooled keep-alive
+connections, the file and SQLite sinks keep history locally for testing
+"""
+
+import http.client
+import json
+import os
+import queue
+import re
+import sqlite3
+import threading
+from typing import Dict, List, Optional
+from urllib.parse import urlencode, urlsplit
+
+# Reading fields in storage order (see validate_reading in sensor_ingest.py)
+READING_FIELDS = ('device_id', 'timestamp', 'distance', 'arf', 'deformation',
+                  'current_iop', 'avg_iop', 'resistance')
+
+
+class SinkError(Exception):
+    """A batch could not be stored; the ingest buffer retries it"""
+
+
+class BatchRejected(Exception):
+    """
+    The sink refused a batch for good (bad payload, revoked credentials):
+    retrying it cannot succeed, so the ingest buffer drops it
+    """
+
+
+class JsonlFileSink:
+    """Appends one JSON line per reading"""
+
+    def __init__(self, path: str):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._file = open(path, 'a', encoding='utf-8')
+
+    def write(self, readings: List[Dict]):
+        try:
+            self._file.write(''.join(json.dumps(r) + '\n' for r in readings))
+            self._file.flush()
+        except OSError as e:
+            raise SinkError(f'File sink write failed: {e}') from e
+
+    def close(self):
+        self._file.close()
+
+
+class SQLiteSink:
+    """Inserts readings into a 'readings' table, one transaction per batch"""
+
+    def __init__(self, path: str):
+        self.path = path
+        # Only the ingest flusher thread writes, but stats may read
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        self._conn.execute(
+            'CREATE TABLE IF NOT EXISTS readings ('
+            'device_id TEXT NOT NULL, timestamp INTEGER NOT NULL, '
+            'distance REAL, arf REAL, deformation REAL, current_iop REAL, '
+            'avg_iop REAL, resistance REAL)')
+        self._conn.execute('CREATE INDEX IF NOT EXISTS readings_device_time '
+                           'ON readings (device_id, timestamp)')
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self._insert = (f"INSERT INTO readings ({', '.join(READING_FIELDS)}) "
+                        f"VALUES ({', '.join('?' * len(READING_FIELDS))})")
+
+    def write(self, readings: List[Dict]):
+        rows = [tuple(r.get(field) for field in READING_FIELDS) for r in readings]
+        try:
+            with self._lock, self._conn:
+                self._conn.executemany(self._insert, rows)
+        except sqlite3.Error as e:
+            raise SinkError(f'SQLite sink write failed: {e}') from e
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute('SELECT COUNT(*) FROM readings').fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+class FirebaseSink:
+    """
+    Firebase Realtime Database sink
+
+    Each batch is one PATCH of the database root: every reading goes to
+    sensor_data/history/<device_id>/<timestamp> (history is kept instead
+    of overwritten) and the newest reading also updates the sensor_data
+    fields the app reads. Requests reuse a small pool of keep-alive
+    HTTPS connections.
+    """
+
+    def __init__(self, url: str, auth: Optional[str] = None, pool_size: int = 4,
+                 timeout: float = 10.0):
+        """
+        Args:
+            url: Database URL, e.g. https://<db>.firebasedatabase.app
+            auth: Database secret or ID token (sent as ?auth=)
+            pool_size: Keep-alive connections kept open
+            timeout: Socket timeout per request in seconds
+        """
+        parts = urlsplit(url)
+        self._https = parts.scheme == 'https'
+        self._host = parts.netloc
+        self._path = parts.path.rstrip('/') + '/.json'
+        if auth:
+            self._path += '?' + urlencode({'auth': auth})
+        self.timeout = timeout
+        self._pool = queue.LifoQueue(maxsize=max(1, pool_size))
+        self.requests = 0
+        self.connections_opened = 0
+
+    @staticmethod
+    def _key(value) -> str:
+        """Firebase keys may not contain . $ # [ ] /"""
+        return re.sub(r'[.$#\[\]/]', '_', str(value))
+
+    def _connect(self):
+        self.connections_opened += 1
+        cls = http.client.HTTPSConnection if self._https else http.client.HTTPConnection
+        return cls(self._host, timeout=self.timeout)
+
+    def _request(self, body: bytes):
+        try:
+            conn = self._pool.get_nowait()
+        except queue.Empty:
+            conn = self._connect()
+        # A pooled connection may have been closed by the server; retry once
+        for attempt in range(2):
+            try:
+                conn.request('PATCH', self._path, body=body,
+                             headers={'Content-Type': 'application/json',
+                                      'Connection': 'keep-alive'})
+                response = conn.getresponse()
+                payload = response.read()
+                break
+            except (http.client.HTTPException, OSError) as e:
+                conn.close()
+                if attempt:
+                    raise SinkError(f'Firebase request failed: {e}') from e
+                conn = self._connect()
+        self.requests += 1
+        try:
+            self._pool.put_nowait(conn)
+        except queue.Full:
+            conn.close()
+        if response.status >= 300:
+            message = f'Firebase returned {response.status}: {payload[:200]!r}'
+            if 400 <= response.status < 500 and response.status not in (408, 429):
+                # 400/401/403/...: the same batch would be refused again
+                raise BatchRejected(message)
+            raise SinkError(message)
+
+    def write(self, readings: List[Dict]):
+        update = {}
+        for reading in readings:
+            fields = {k: v for k, v in reading.items() if k not in ('device_id', 'timestamp')}
+            fields['timestamp'] = reading['timestamp']
+            path = (f"sensor_data/history/{self._key(reading['device_id'])}/"
+                    f"{self._key(reading['timestamp'])}")
+            update[path] = fields
+        latest = max(readings, key=lambda r: r['timestamp'])
+        for field, value in latest.items():
+            update[f'sensor_data/{field}'] = value
+        update['sensor_data/connected'] = True
+        self._request(json.dumps(update).encode('utf-8'))
+
+    def close(self):
+        while True:
+            try:
+                self._pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+class FanOutSink:
+    """
+    Writes each batch to several sinks in order
+
+    A failure in any sink fails the whole batch, so sinks after the first
+    should tolerate seeing a retried batch again.
+    """
+
+    def __init__(self, sinks: List):
+        self.sinks = sinks
+
+    def write(self, readings: List[Dict]):
+        for sink in self.sinks:
+            sink.write(readings)
+
+    def close(self):
+        for sink in self.sinks:
+            sink.close()
+
+
+def create_sink(kind: str, target: str, auth: Optional[str] = None):
+    """
+    Build a sink by name
+
+    Args:
+        kind: 'sqlite', 'file' or 'firebase'
+        target: Database/file path, or the Firebase database URL
+        auth: Firebase auth secret (firebase only)
+    """
+    if kind == 'sqlite':
+        return SQLiteSink(target)
+    if kind == 'file':
+        return JsonlFileSink(target)
+    if kind == 'firebase':
+        return FirebaseSink(target, auth=auth)
+    raise ValueError(f"Unknown sink '{kind}' (choose from sqlite, file, firebase)")
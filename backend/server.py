@@ -3,27 +3,41 @@ Flask Backend Server for SonoSight AI Eye Detection
 Hosts the Python AI model and provides REST API for Flutter app
 """
 
-from flask import Flask, request, jsonify
+import time
+
+# Reference point for the startup metrics reported by /health and /ready
+PROCESS_START = time.perf_counter()
+
+from flask import Flask, Response, g, request, jsonify
 from flask_cors import CORS
-import cv2
-import numpy as np
-import base64
-import sys
+import atexit
 import os
+import threading
 
-# Add parent directory to path to import eye_detector
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from analysis_log import parse_analysis_query, parse_log_context
+from analysis_service import AnalysisService, EyeDetector, format_result, parse_analysis_options
+from analysis_service import (CHANGES_MAX_WAIT, HOST, MAX_FACES, POOL_SIZE, PORT,
+                              PUPIL_BACKEND, QUALITY_GATE, READY_TIMEOUT, RECORD_TIMINGS,
+                              REDUCED_DECODE, WORKING_RESOLUTION)
+from change_feed import parse_changes_query
+from detector_pool import DetectorPool
+from frame_ring import FrameRing
+from inference_processes import InferenceProcessPool
+from image_upload import decode_base64, read_image_bytes
+from job_queue import JobQueue, QueueFull
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, MetricsRegistry
 
-try:
-    from lib.eye_detector import EyeDetector
-    print("✓ Eye detector imported successfully")
-except ImportError as e:
-    print(f"Error importing eye_detector: {e}")
+if EyeDetector is None:
     print("Creating a mock detector for testing...")
     
     # Mock detector for testing
     class EyeDetector:
-        def detect_eye(self, image, prefer_right_eye=True):
+        PUPIL_BACKENDS = ('threshold', 'ellipse')
+        
+        def __init__(self, **kwargs):
+            pass
+        
+        def detect_eye(self, image, prefer_right_eye=True, **options):
             return {
                 'success': True,
                 'iris': {
@@ -59,70 +73,318 @@ except ImportError as e:
 app = Flask(__name__)
 CORS(app)  # Allow Flutter app to access the API
 
-# Initialize the eye detector
-detector = EyeDetector()
-print("✓ AI Model initialized and ready")
+# Largest batch accepted by /analyze_eye/batch
+MAX_BATCH_SIZE = int(os.environ.get('SONOSIGHT_MAX_BATCH', 32))
+# Queued /jobs accepted before answering 429
+MAX_JOB_BACKLOG = int(os.environ.get('SONOSIGHT_MAX_JOBS', 64))
+# Seconds a finished job result stays available for polling
+JOB_RESULT_TTL = float(os.environ.get('SONOSIGHT_JOB_TTL', 300))
+# Run detection in this many worker processes fed through shared memory
+# (0 = detect in server threads)
+INFERENCE_PROCESSES = int(os.environ.get('SONOSIGHT_INFERENCE_PROCESSES', 0))
+# Capacity of each shared-memory frame slot in MiB (larger frames are pickled)
+FRAME_SLOT_MB = float(os.environ.get('SONOSIGHT_FRAME_SLOT_MB', 35))
+
+# Prometheus metrics served on /metrics
+metrics = MetricsRegistry()
+stage_seconds = metrics.histogram(
+    'sonosight_stage_duration_seconds',
+    'Duration of each eye analysis stage', 'stage')
+request_seconds = metrics.histogram(
+    'sonosight_request_duration_seconds',
+    'HTTP request latency by endpoint', 'endpoint')
+
+
+def observe_stages(timings_ms):
+    """EyeDetector timing hook: feed per-stage durations into the histogram"""
+    for stage, ms in timings_ms.items():
+        stage_seconds.observe(stage, ms / 1000)
+
+
+def create_detector():
+    """Build one EyeDetector with the server configuration"""
+    return EyeDetector(working_resolution=WORKING_RESOLUTION,
+                       timing_hook=observe_stages if RECORD_TIMINGS else None,
+                       pupil_backend=PUPIL_BACKEND,
+                       max_num_faces=MAX_FACES,
+                       quality_gate=QUALITY_GATE)
+
+
+# Eye detector pool, built and warmed up in the background (see warm_up_model)
+if INFERENCE_PROCESSES and not InferenceProcessPool.supported():
+    print("Warning: SONOSIGHT_INFERENCE_PROCESSES needs the fork start method, "
+          "detecting in server threads instead")
+if (INFERENCE_PROCESSES and EyeDetector.__module__ == 'lib.eye_detector'
+        and InferenceProcessPool.supported()):
+    # Workers are forked by warm_up_model, not while this module is imported
+    detector_pool = InferenceProcessPool(
+        FrameRing(slots=2 * INFERENCE_PROCESSES, slot_bytes=int(FRAME_SLOT_MB * 2 ** 20)),
+        size=INFERENCE_PROCESSES,
+        detector_kwargs={'working_resolution': WORKING_RESOLUTION,
+                         'record_timings': RECORD_TIMINGS,
+                         'pupil_backend': PUPIL_BACKEND,
+                         'max_num_faces': MAX_FACES,
+                         'quality_gate': QUALITY_GATE},
+        timing_hook=observe_stages if RECORD_TIMINGS else None)
+    atexit.register(detector_pool.shutdown)
+else:
+    detector_pool = DetectorPool(create_detector, size=POOL_SIZE, lazy=True)
+
+# Startup timings, in seconds since process start
+startup = {
+    'app_loaded_s': None,
+    'model_ready_s': None,
+    'warmup_ms': detector_pool.warmup_ms,
+    'error': None
+}
+
+# Background analysis jobs, one worker per pooled detector
+job_queue = JobQueue(workers=detector_pool.size, max_backlog=MAX_JOB_BACKLOG,
+                     result_ttl=JOB_RESULT_TTL)
+
+# Result cache, change feed and analysis log around the pool; worker
+# processes receive frames through shared memory as plain arrays, so
+# uploads are decoded at full size when they are enabled
+in_processes = isinstance(detector_pool, InferenceProcessPool)
+analysis = AnalysisService(detector_pool, reduced_decode=REDUCED_DECODE and not in_processes,
+                           stage_hook=stage_seconds.observe if RECORD_TIMINGS else None)
+
+def warm_up_model():
+    """Build the detector pool and run a synthetic frame through each detector"""
+    try:
+        detector_pool.populate(warm_up=True)
+    except Exception as e:
+        startup['error'] = f'Model initialization failed: {str(e)}'
+        print(f"Error initializing AI model: {e}")
+        return
+    startup['model_ready_s'] = round(time.perf_counter() - PROCESS_START, 3)
+    print(f"✓ AI Model initialized and ready ({detector_pool.size} detectors, "
+          f"{startup['model_ready_s']} s after start)")
+
+
+def model_unavailable():
+    """503 response if the model is not ready within READY_TIMEOUT, else None"""
+    if detector_pool.ready.wait(READY_TIMEOUT):
+        return None
+    response = jsonify({
+        'success': False,
+        'error': startup['error'] or 'AI model is still warming up'
+    })
+    response.headers['Retry-After'] = '5'
+    return response, 503
+
+
+def timed_jsonify(body):
+    """jsonify, recording serialization time as the 'serialize' stage"""
+    start = time.perf_counter()
+    response = jsonify(body)
+    if RECORD_TIMINGS:
+        stage_seconds.observe('serialize', time.perf_counter() - start)
+    return response
+
+
+def quality_outcomes():
+    """sonosight_quality_gate_total samples: passed plus one per rejection reason"""
+    stats = analysis.quality_stats.stats()
+    samples = {('passed',): stats['passed']}
+    samples.update({(reason,): count for reason, count in stats['reasons'].items()})
+    return samples
+
+
+# Gauges and counters read from live server state at scrape time
+metrics.gauge('sonosight_startup_seconds',
+              'Seconds from process start to each startup phase',
+              lambda: {('app_loaded',): startup['app_loaded_s'],
+                       ('model_ready',): startup['model_ready_s']},
+              ('phase',))
+metrics.gauge('sonosight_model_ready', 'Whether every pooled detector is warmed up',
+              lambda: 1 if detector_pool.ready.is_set() else 0)
+metrics.gauge('sonosight_detectors', 'Pooled detectors by state',
+              lambda: {(state,): detector_pool.stats()[state]
+                       for state in ('available', 'busy', 'idle')},
+              ('state',))
+metrics.gauge('sonosight_jobs', 'Analysis jobs by state',
+              lambda: {(state,): job_queue.stats()[state] for state in ('queued', 'running')},
+              ('state',))
+metrics.counter('sonosight_jobs_total', 'Analysis jobs by outcome',
+                lambda: {(outcome,): job_queue.stats()[outcome]
+                         for outcome in ('submitted', 'rejected', 'done', 'failed')},
+                ('outcome',))
+metrics.counter('sonosight_cache_lookups_total', 'Result cache lookups by outcome',
+                lambda: {(outcome,): analysis.result_cache.stats()[outcome]
+                         for outcome in ('hits', 'misses', 'disk_hits')},
+                ('outcome',))
+metrics.counter('sonosight_quality_gate_total',
+                'Fresh analyses by quality gate outcome (passed or rejection reason)',
+                quality_outcomes, ('outcome',))
+
+
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
+
+
+@app.after_request
+def record_request_time(response):
+    start = g.get('request_start')
+    if start is not None:
+        request_seconds.observe(request.endpoint or 'unknown', time.perf_counter() - start)
+    return response
 
 @app.route('/health', methods=['GET'])
 def health_check():
-    """Health check endpoint"""
+    """Health check endpoint (liveness: answers while the model warms up)"""
     return jsonify({
         'status': 'healthy',
-        'model': 'initialized',
+        'model': 'initialized' if detector_pool.ready.is_set() else 'warming_up',
+        'startup': startup,
+        'detectors': detector_pool.stats(),
+        'jobs': job_queue.stats(),
+        'cache': analysis.result_cache.stats(),
+        'quality_gate': analysis.quality_stats.stats(),
         'message': 'SonoSight AI Backend is running'
     })
 
+@app.route('/ready', methods=['GET'])
+def readiness_check():
+    """Readiness endpoint: 200 once every pooled detector is warmed up"""
+    ready = detector_pool.ready.is_set()
+    return jsonify({
+        'ready': ready,
+        'detectors': detector_pool.stats(),
+        'startup': startup
+    }), 200 if ready else 503
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Prometheus text-format metrics (stage/request latency histograms, pool state)"""
+    return Response(metrics.render(), mimetype=None, content_type=METRICS_CONTENT_TYPE)
+
 @app.route('/analyze_eye', methods=['POST'])
 def analyze_eye():
     """
     Analyze eye image from Flutter app
     
-    Expects JSON with base64 encoded image
+    Accepts JSON with a base64 encoded image, multipart/form-data with an
+    'image' file field, or a raw application/octet-stream / image/jpeg body
     Returns AI analysis results
     """
     try:
-        data = request.json
+        image_bytes, options, error = read_image_bytes(request)
         
-        if not data or 'image' not in data:
+        if error:
             return jsonify({
                 'success': False,
-                'error': 'No image data provided'
+                'error': error
             }), 400
         
-        # Decode base64 image
-        image_data = base64.b64decode(data['image'])
-        nparr = np.frombuffer(image_data, np.uint8)
-        image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        # Get preferences
+        settings, error = parse_analysis_options(options)
+        context, context_error = parse_log_context(options)
+        error = error or context_error
+        if error:
+            return jsonify({
+                'success': False,
+                'error': error
+            }), 400
         
-        if image is None:
+        upload = analysis.load_upload(image_bytes, settings, context)
+        
+        if upload['result'] is None and upload['image'] is None:
             return jsonify({
                 'success': False,
                 'error': 'Failed to decode image'
             }), 400
         
-        # Get preferences
-        prefer_right_eye = data.get('prefer_right_eye', True)
+        if upload['result'] is None:
+            unavailable = model_unavailable()
+            if unavailable:
+                return unavailable
         
-        # Run AI detection
-        result = detector.detect_eye(image, prefer_right_eye=prefer_right_eye)
+        # Run AI detection on a pooled detector (or reuse cached result)
+        result = analysis.run_detection(upload)
         
         # Return results
-        if result.get('success'):
+        body, status = format_result(result)
+        return timed_jsonify(body), status
+            
+    except Exception as e:
+        print(f"Error in analyze_eye: {e}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({
+            'success': False,
+            'error': f'Server error: {str(e)}'
+        }), 500
+
+@app.route('/analyze_eye/batch', methods=['POST'])
+def analyze_eye_batch():
+    """
+    Analyze several eye images in one request
+    
+    Expects JSON with a list of base64 encoded images
+    Returns one result per image, in the same order
+    """
+    try:
+        data = request.json
+        
+        if not data or not isinstance(data.get('images'), list) or not data['images']:
             return jsonify({
-                'success': True,
-                'iris': result.get('iris', {}),
-                'pupil': result.get('pupil', {}),
-                'features': result.get('features', {}),
-                'prediction': result.get('prediction', {})
-            }), 200
-        else:
+                'success': False,
+                'error': 'No image data provided'
+            }), 400
+        
+        images_b64 = data['images']
+        if len(images_b64) > MAX_BATCH_SIZE:
+            return jsonify({
+                'success': False,
+                'error': f'Batch too large (max {MAX_BATCH_SIZE} images)'
+            }), 413
+        
+        settings, error = parse_analysis_options(data)
+        context, context_error = parse_log_context(data)
+        error = error or context_error
+        if error:
             return jsonify({
                 'success': False,
-                'error': result.get('error', 'Detection failed')
-            }), 500
+                'error': error
+            }), 400
+        
+        def load(image_b64):
+            try:
+                image_bytes = decode_base64(image_b64)
+                if not image_bytes:
+                    return None
+                return analysis.load_upload(image_bytes, settings, context)
+            except Exception:
+                return None
+        
+        def run(upload):
+            if upload is None or (upload['result'] is None and upload['image'] is None):
+                return {'success': False, 'error': 'Failed to decode image'}
+            try:
+                return analysis.run_detection(upload)
+            except Exception as e:
+                return {'success': False, 'error': f'Detection error: {str(e)}'}
+        
+        # Decode in parallel, then spread detection over the pool
+        uploads = detector_pool.map(load, images_b64)
+        if any(upload and upload['result'] is None for upload in uploads):
+            unavailable = model_unavailable()
+            if unavailable:
+                return unavailable
+        results = detector_pool.map(run, uploads)
+        
+        bodies = [format_result(result)[0] for result in results]
+        return jsonify({
+            'success': True,
+            'count': len(bodies),
+            'succeeded': sum(1 for body in bodies if body['success']),
+            'results': bodies
+        }), 200
             
     except Exception as e:
-        print(f"Error in analyze_eye: {e}")
+        print(f"Error in analyze_eye_batch: {e}")
         import traceback
         traceback.print_exc()
         return jsonify({
@@ -130,16 +392,148 @@ def analyze_eye():
             'error': f'Server error: {str(e)}'
         }), 500
 
+@app.route('/changes', methods=['GET'])
+def get_changes():
+    """
+    Analyses and readings stored or updated after a sequence number
+
+    Query: since (last_seq of the previous call, 0 to start), limit,
+    kind ('reading' or 'analysis'), wait (seconds to long-poll when
+    there is nothing new)
+    """
+    params, error = parse_changes_query(request.args, CHANGES_MAX_WAIT)
+    if error:
+        return jsonify({'success': False, 'error': error}), 400
+    return jsonify({'success': True, **analysis.change_feed.poll(**params)})
+
+@app.route('/analyses', methods=['GET'])
+def list_analyses():
+    """
+    Logged analyses, newest first
+
+    Query: session_id, patient_id, image_hash, from / to (epoch ms),
+    limit, cursor (next_cursor of the previous page)
+    """
+    if analysis.analysis_log is None:
+        return jsonify({'success': False, 'error': 'Analysis log is disabled'}), 404
+    query, error = parse_analysis_query(request.args)
+    if error:
+        return jsonify({'success': False, 'error': error}), 400
+    return jsonify({'success': True, **analysis.analysis_log.find(**query)})
+
+@app.route('/analyses/report', methods=['GET'])
+def analyses_report():
+    """Aggregate report over logged analyses (same filters as /analyses)"""
+    if analysis.analysis_log is None:
+        return jsonify({'success': False, 'error': 'Analysis log is disabled'}), 404
+    query, error = parse_analysis_query(request.args)
+    if error:
+        return jsonify({'success': False, 'error': error}), 400
+    report = analysis.analysis_log.report(query['filters'], query['start'], query['end'])
+    return jsonify({'success': True, 'filters': query['filters'], **report})
+
+@app.route('/jobs', methods=['POST'])
+def submit_job():
+    """
+    Queue an eye analysis and return a job id immediately
+    
+    Accepts the same bodies as /analyze_eye
+    Returns 202 with the job id, or 429 when the backlog is full
+    """
+    try:
+        image_bytes, options, error = read_image_bytes(request)
+        
+        if error:
+            return jsonify({
+                'success': False,
+                'error': error
+            }), 400
+        
+        settings, error = parse_analysis_options(options)
+        context, context_error = parse_log_context(options)
+        error = error or context_error
+        if error:
+            return jsonify({
+                'success': False,
+                'error': error
+            }), 400
+        
+        upload = analysis.load_upload(image_bytes, settings, context)
+        
+        if upload['result'] is None and upload['image'] is None:
+            return jsonify({
+                'success': False,
+                'error': 'Failed to decode image'
+            }), 400
+        
+        def run():
+            return format_result(analysis.run_detection(upload))[0]
+        
+        try:
+            job_id = job_queue.submit(run)
+        except QueueFull as e:
+            response = jsonify({
+                'success': False,
+                'error': str(e)
+            })
+            response.headers['Retry-After'] = '1'
+            return response, 429
+        
+        return jsonify({
+            'success': True,
+            'job_id': job_id,
+            'status': 'queued',
+            'status_url': f'/jobs/{job_id}'
+        }), 202
+            
+    except Exception as e:
+        print(f"Error in submit_job: {e}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({
+            'success': False,
+            'error': f'Server error: {str(e)}'
+        }), 500
+
+@app.route('/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """
+    Poll a queued analysis
+    
+    Returns status (queued, running, done, failed), timings and,
+    once done, the same result body as /analyze_eye
+    """
+    job = job_queue.get(job_id)
+    
+    if job is None:
+        return jsonify({
+            'success': False,
+            'error': 'Unknown or expired job id'
+        }), 404
+    
+    return jsonify({'success': True, **job}), 200
+
+startup['app_loaded_s'] = round(time.perf_counter() - PROCESS_START, 3)
+threading.Thread(target=warm_up_model, name='model-warmup', daemon=True).start()
+
 if __name__ == '__main__':
     print("\n" + "="*75)
     print("              SONOSIGHT AI BACKEND SERVER")
     print("           Starting Flask API server...")
     print("="*75 + "\n")
-    print("Server running on http://localhost:5000")
+    print(f"Server running on http://localhost:{PORT}")
     print("Endpoints:")
     print("  GET  /health - Health check")
+    print("  GET  /ready - Readiness check (model warmed up)")
+    print("  GET  /metrics - Prometheus metrics")
     print("  POST /analyze_eye - Analyze eye image")
+    print("  POST /analyze_eye/batch - Analyze several eye images")
+    print("  POST /jobs - Queue eye analysis, returns job id")
+    print("  GET  /jobs/<id> - Poll queued analysis")
+    print("  GET  /analyses - Logged analyses by session, patient, image or time")
+    print("  GET  /analyses/report - Aggregate report over logged analyses")
+    print("  GET  /changes - Change feed (since=<seq>, optional long-poll)")
     print("\nPress CTRL+C to stop\n")
     
     # Run server
-    app.run(host='0.0.0.0', port=5000, debug=False, threaded=True)
+    app.run(host=HOST, port=PORT, debug=False, threaded=True)
@@ -0,0 +1,522 @@
+"""
+ASGI Backend Server for SonoSight AI Eye Detection
+asyncio-native variant of server.py serving the same /health, /ready and
+/analyze_eye contract with Starlette and Uvicorn, plus a /stream
+WebSocket for live camera analysis
+
+Run with:
+    python server_asgi.py
+    uvicorn server_asgi:app --host 0.0.0.0 --port 5000
+"""
+
+import time
+
+# Reference point for the startup metrics reported by /health and /ready
+PROCESS_START = time.perf_counter()
+
+import asyncio
+import json
+import os
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import JSONResponse
+from starlette.routing import Route, WebSocketRoute
+from starlette.websockets import WebSocketDisconnect
+
+from analysis_log import parse_analysis_query, parse_log_context
+from analysis_service import (AnalysisService, EyeDetector, EyeTracker, IMPORT_ERROR,
+                              format_result, parse_analysis_options)
+from analysis_service import (CHANGES_MAX_WAIT, HOST, MAX_FACES, POOL_SIZE, PORT,
+                              PUPIL_BACKEND, QUALITY_GATE, READY_TIMEOUT, RECORD_TIMINGS,
+                              WORKING_RESOLUTION)
+from change_feed import parse_changes_query
+from detector_pool import DetectorPool
+from image_upload import RAW_IMAGE_TYPES, decode_base64, decode_image, parse_bool
+
+# Detections running at once; further requests wait on the event loop
+MAX_CONCURRENCY = int(os.environ.get('SONOSIGHT_MAX_CONCURRENCY', POOL_SIZE))
+# WebSocket streams served at once (each keeps its own Face Mesh graph)
+MAX_STREAMS = int(os.environ.get('SONOSIGHT_MAX_STREAMS', 4))
+# Frames a stream buffers while inference is busy; older frames are dropped
+STREAM_BUFFER = int(os.environ.get('SONOSIGHT_STREAM_BUFFER', 1))
+# Seconds shutdown waits for in-flight analyses before giving up
+SHUTDOWN_TIMEOUT = float(os.environ.get('SONOSIGHT_SHUTDOWN_TIMEOUT', 30))
+
+
+def create_detector():
+    """Build one EyeDetector with the server configuration"""
+    return EyeDetector(working_resolution=WORKING_RESOLUTION,
+                       record_timings=RECORD_TIMINGS,
+                       pupil_backend=PUPIL_BACKEND,
+                       max_num_faces=MAX_FACES,
+                       quality_gate=QUALITY_GATE)
+
+
+detector_pool = DetectorPool(create_detector, size=POOL_SIZE, lazy=True)
+analysis = AnalysisService(detector_pool)
+
+# CPU-bound detect_eye calls; request parsing and decoding use the loop's
+# default executor so they never queue behind detections
+detect_executor = ThreadPoolExecutor(max_workers=max(1, MAX_CONCURRENCY),
+                                     thread_name_prefix='detect')
+
+# Startup timings, in seconds since process start
+startup = {
+    'app_loaded_s': None,
+    'model_ready_s': None,
+    'warmup_ms': detector_pool.warmup_ms,
+    'error': IMPORT_ERROR
+}
+
+# Event-loop state: in-flight analyses and the detection concurrency limit
+state = {
+    'running': 0,
+    'waiting': 0,
+    'inflight': 0,
+    'shutting_down': False,
+    'limit': None,   # asyncio.Semaphore, created on the server's loop
+    'idle': None,    # asyncio.Event set whenever nothing is in flight
+    'streams': 0
+}
+
+# Totals over all WebSocket streams
+stream_counters = {'connections': 0, 'frames': 0, 'analyzed': 0, 'dropped': 0}
+
+
+def warm_up_model():
+    """Build the detector pool and run a synthetic frame through each detector"""
+    if EyeDetector is None:
+        return
+    try:
+        detector_pool.populate(warm_up=True)
+    except Exception as e:
+        startup['error'] = f'Model initialization failed: {str(e)}'
+        print(f"Error initializing AI model: {e}")
+        return
+    startup['model_ready_s'] = round(time.perf_counter() - PROCESS_START, 3)
+    print(f"✓ AI Model initialized and ready ({detector_pool.size} detectors, "
+          f"{startup['model_ready_s']} s after start)")
+
+
+def error_response(message, status, retry_after=None):
+    response = JSONResponse({'success': False, 'error': message}, status_code=status)
+    if retry_after:
+        response.headers['Retry-After'] = str(retry_after)
+    return response
+
+
+async def read_request(request):
+    """
+    Read the image payload and options without blocking the event loop
+
+    Returns:
+        (image data or None, options, True if the data is base64 text)
+    """
+    mimetype = request.headers.get('content-type', '').split(';')[0].strip().lower()
+    query = dict(request.query_params)
+
+    if mimetype == 'multipart/form-data':
+        form = await request.form()
+        options = {k: v for k, v in form.items() if k != 'image'}
+        options.update({k: v for k, v in query.items() if k not in options})
+        upload = form.get('image')
+        if upload is None or isinstance(upload, str):
+            return None, options, False
+        return await upload.read(), options, False
+
+    body = await request.body()
+    if mimetype in RAW_IMAGE_TYPES:
+        return body, query, False
+
+    # JSON parsing of multi-megabyte base64 bodies is CPU work too
+    loop = asyncio.get_running_loop()
+    try:
+        data = await loop.run_in_executor(None, json.loads, body) if body else None
+    except ValueError:
+        data = None
+    if not isinstance(data, dict) or 'image' not in data:
+        return None, data if isinstance(data, dict) else {}, False
+    return data['image'], data, True
+
+
+def load_request_upload(image_data, is_base64, settings, context=None):
+    """
+    Decode base64, look up the result cache and decode the image on a miss
+    (runs in an executor thread)
+
+    Returns:
+        AnalysisService.load_upload result, or None if the base64 is invalid
+    """
+    image_bytes = decode_base64(image_data) if is_base64 else image_data
+    if not image_bytes:
+        return None
+    return analysis.load_upload(image_bytes, settings, context)
+
+
+async def model_unavailable():
+    """503 response if the model is not ready within READY_TIMEOUT, else None"""
+    if startup['error'] is None and not detector_pool.ready.is_set():
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, detector_pool.ready.wait, READY_TIMEOUT)
+    if detector_pool.ready.is_set() and startup['error'] is None:
+        return None
+    return error_response(startup['error'] or 'AI model is still warming up', 503,
+                          retry_after=5)
+
+
+async def health_check(request):
+    """Health check endpoint (liveness: answers while the model warms up)"""
+    return JSONResponse({
+        'status': 'shutting_down' if state['shutting_down'] else 'healthy',
+        'model': 'initialized' if detector_pool.ready.is_set() else 'warming_up',
+        'startup': startup,
+        'detectors': detector_pool.stats(),
+        'concurrency': {
+            'limit': MAX_CONCURRENCY,
+            'running': state['running'],
+            'waiting': state['waiting']
+        },
+        'streams': {
+            'active': state['streams'],
+            'limit': MAX_STREAMS,
+            **stream_counters
+        },
+        'cache': analysis.result_cache.stats(),
+        'quality_gate': analysis.quality_stats.stats(),
+        'message': 'SonoSight AI Backend is running'
+    })
+
+
+async def readiness_check(request):
+    """Readiness endpoint: 200 once every pooled detector is warmed up"""
+    ready = detector_pool.ready.is_set() and not state['shutting_down']
+    return JSONResponse({
+        'ready': ready,
+        'detectors': detector_pool.stats(),
+        'startup': startup
+    }, status_code=200 if ready else 503)
+
+
+async def analyze_eye(request):
+    """
+    Analyze eye image from Flutter app
+
+    Accepts JSON with a base64 encoded image, multipart/form-data with an
+    'image' file field, or a raw application/octet-stream / image/jpeg body
+    Returns AI analysis results
+    """
+    if state['shutting_down']:
+        return error_response('Server is shutting down', 503, retry_after=5)
+
+    state['inflight'] += 1
+    state['idle'].clear()
+    try:
+        image_data, options, is_base64 = await read_request(request)
+
+        if is_base64 and not isinstance(image_data, str):
+            # e.g. a number: not base64 text (as in image_upload.read_image_bytes)
+            return error_response('Failed to decode image', 400)
+        if image_data is None or len(image_data) == 0:
+            return error_response('No image data provided', 400)
+
+        # Get preferences
+        settings, error = parse_analysis_options(options)
+        context, context_error = parse_log_context(options)
+        error = error or context_error
+        if error:
+            return error_response(error, 400)
+
+        loop = asyncio.get_running_loop()
+        upload = await loop.run_in_executor(None, load_request_upload, image_data,
+                                            is_base64, settings, context)
+        if upload is None:
+            return error_response('Failed to decode image', 400)
+
+        if upload['result'] is not None:
+            result = await loop.run_in_executor(None, analysis.cached_result, upload)
+        else:
+            if upload['image'] is None:
+                return error_response('Failed to decode image', 400)
+
+            unavailable = await model_unavailable()
+            if unavailable:
+                return unavailable
+
+            # Bound concurrent detections; waiting requests cost no thread
+            state['waiting'] += 1
+            async with state['limit']:
+                state['waiting'] -= 1
+                state['running'] += 1
+                try:
+                    result = await loop.run_in_executor(detect_executor,
+                                                        analysis.run_detection, upload)
+                finally:
+                    state['running'] -= 1
+
+        body, status = format_result(result)
+        return JSONResponse(body, status_code=status)
+
+    except Exception as e:
+        print(f"Error in analyze_eye: {e}")
+        import traceback
+        traceback.print_exc()
+        return error_response(f'Server error: {str(e)}', 500)
+    finally:
+        state['inflight'] -= 1
+        if state['inflight'] == 0:
+            state['idle'].set()
+
+
+async def get_changes(request):
+    """
+    Analyses and readings stored or updated after a sequence number
+
+    Query: since, limit, kind, wait (see server.py). The long-poll sleeps
+    on the event loop instead of holding a thread per waiting client.
+    """
+    params, error = parse_changes_query(request.query_params, CHANGES_MAX_WAIT)
+    if error:
+        return error_response(error, 400)
+    wait = params.pop('wait')
+    page = analysis.change_feed.since(**params)
+    deadline = time.monotonic() + wait
+    while not page['changes'] and not page['reset'] and time.monotonic() < deadline \
+            and not state['shutting_down']:
+        await asyncio.sleep(min(analysis.change_feed.poll_interval, deadline - time.monotonic()))
+        if analysis.change_feed.latest_seq() > page['latest_seq']:
+            page = analysis.change_feed.since(**params)
+    return JSONResponse({'success': True, **page})
+
+
+async def list_analyses(request):
+    """Logged analyses, newest first (query as in server.py)"""
+    if analysis.analysis_log is None:
+        return error_response('Analysis log is disabled', 404)
+    query, error = parse_analysis_query(request.query_params)
+    if error:
+        return error_response(error, 400)
+    loop = asyncio.get_running_loop()
+    page = await loop.run_in_executor(None, lambda: analysis.analysis_log.find(**query))
+    return JSONResponse({'success': True, **page})
+
+
+async def analyses_report(request):
+    """Aggregate report over logged analyses"""
+    if analysis.analysis_log is None:
+        return error_response('Analysis log is disabled', 404)
+    query, error = parse_analysis_query(request.query_params)
+    if error:
+        return error_response(error, 400)
+    loop = asyncio.get_running_loop()
+    report = await loop.run_in_executor(
+        None, analysis.analysis_log.report, query['filters'], query['start'], query['end'])
+    return JSONResponse({'success': True, 'filters': query['filters'], **report})
+
+
+def create_tracker(pupil_backend):
+    """Per-stream EyeTracker: carries iris and pupil between frames"""
+    return EyeTracker(working_resolution=WORKING_RESOLUTION, pupil_backend=pupil_backend,
+                      quality_gate=QUALITY_GATE)
+
+
+def analyze_frame(tracker, frame_bytes, prefer_right_eye):
+    """Decode one streamed frame and run it through the stream's tracker"""
+    image = decode_image(frame_bytes)
+    if image is None:
+        return {'success': False, 'error': 'Failed to decode image'}
+    return tracker.track(image, prefer_right_eye)
+
+
+async def stream(websocket):
+    """
+    Live camera analysis over a WebSocket
+    
+    Connect to /stream (options such as prefer_right_eye and pupil_backend
+    in the query string) and send each camera frame as a binary JPEG/PNG
+    message, or as a JSON text message {"image": base64}. A JSON message
+    without an image updates options (prefer_right_eye) for later frames.
+    
+    Every analyzed frame is answered with the /analyze_eye body plus its
+    sequence number ('frame'), 'tracking' and the stream's 'dropped' count.
+    While inference is busy at most SONOSIGHT_STREAM_BUFFER frames wait;
+    when a new frame arrives the oldest waiting one is dropped.
+    """
+    await websocket.accept()
+    if state['shutting_down'] or EyeDetector is None or startup['error']:
+        await websocket.close(code=1011, reason='Analysis unavailable')
+        return
+    if state['streams'] >= MAX_STREAMS:
+        await websocket.close(code=1013, reason='Too many streams, try again later')
+        return
+    settings, error = parse_analysis_options(dict(websocket.query_params))
+    if not error and (settings.get('eyes') or settings.get('faces')):
+        error = 'eyes=both and faces=all are not supported on /stream'
+    if error:
+        await websocket.close(code=1008, reason=error[:120])
+        return
+
+    state['streams'] += 1
+    stream_counters['connections'] += 1
+    loop = asyncio.get_running_loop()
+    frames = deque(maxlen=max(1, STREAM_BUFFER))
+    frame_ready = asyncio.Event()
+    counters = {'frames': 0, 'dropped': 0}
+    running = []   # in-flight concurrent.futures.Future, awaited before cleanup
+    tracker = None
+
+    async def process():
+        try:
+            while True:
+                await frame_ready.wait()
+                seq, frame_bytes, prefer_right_eye, received_at = frames.popleft()
+                if not frames:
+                    frame_ready.clear()
+                async with state['limit']:
+                    # Keep the executor's own future: cancelling the asyncio
+                    # wrapper does not stop a thread that is already running
+                    future = detect_executor.submit(analyze_frame, tracker,
+                                                    frame_bytes, prefer_right_eye)
+                    running[:] = [future]
+                    result = await asyncio.wrap_future(future)
+                stream_counters['analyzed'] += 1
+                if (result.get('tracking') or {}).get('mode') != 'reused':
+                    analysis.quality_stats.record(result)
+                body, _ = format_result(result)
+                body.update({
+                    'frame': seq,
+                    'tracking': result.get('tracking'),
+                    'dropped': counters['dropped'],
+                    'latency_ms': round((time.perf_counter() - received_at) * 1000, 2)
+                })
+                await websocket.send_json(body)
+        except Exception as e:
+            # Without a processor frames would queue up unanswered: end the stream
+            print(f"Error in stream: {e}")
+            import traceback
+            traceback.print_exc()
+            try:
+                await websocket.close(code=1011, reason='Analysis failed')
+            except Exception:
+                pass
+
+    processor = None
+    try:
+        tracker = await loop.run_in_executor(None, create_tracker, settings['pupil_backend'])
+        processor = asyncio.create_task(process())
+        while True:
+            message = await websocket.receive()
+            if message['type'] == 'websocket.disconnect' or processor.done():
+                break
+            frame_bytes = message.get('bytes')
+            if frame_bytes is None:
+                try:
+                    data = json.loads(message.get('text') or '')
+                except ValueError:
+                    data = None
+                if not isinstance(data, dict):
+                    await websocket.send_json({'success': False,
+                                               'error': 'Expected a binary frame or JSON object'})
+                    continue
+                if 'prefer_right_eye' in data:
+                    settings['prefer_right_eye'] = parse_bool(data['prefer_right_eye'], True)
+                if 'image' not in data:
+                    continue
+                # Invalid base64 is answered like an undecodable frame
+                frame_bytes = decode_base64(data['image']) or b''
+
+            counters['frames'] += 1
+            stream_counters['frames'] += 1
+            if len(frames) == frames.maxlen:
+                # Inference fell behind: the oldest waiting frame is replaced
+                counters['dropped'] += 1
+                stream_counters['dropped'] += 1
+            frames.append((counters['frames'], frame_bytes, settings['prefer_right_eye'],
+                           time.perf_counter()))
+            frame_ready.set()
+    except WebSocketDisconnect:
+        pass
+    finally:
+        if processor is not None:
+            processor.cancel()
+            await asyncio.gather(processor, return_exceptions=True)
+        # The tracker may still be in use by an executor thread
+        if running:
+            await asyncio.gather(asyncio.wrap_future(running[0]), return_exceptions=True)
+        if tracker is not None:
+            await loop.run_in_executor(None, tracker.close)
+        state['streams'] -= 1
+
+
+@asynccontextmanager
+async def lifespan(app):
+    """Start model warm-up in the background; drain analyses on shutdown"""
+    state['limit'] = asyncio.Semaphore(max(1, MAX_CONCURRENCY))
+    state['idle'] = asyncio.Event()
+    state['idle'].set()
+    loop = asyncio.get_running_loop()
+    warm_up = loop.run_in_executor(None, warm_up_model)
+    startup['app_loaded_s'] = round(time.perf_counter() - PROCESS_START, 3)
+
+    yield
+
+    # Refuse new analyses, then let in-flight ones finish
+    state['shutting_down'] = True
+    print(f"\nShutting down: waiting for {state['inflight']} in-flight analyses...")
+    try:
+        await asyncio.wait_for(state['idle'].wait(), SHUTDOWN_TIMEOUT)
+    except asyncio.TimeoutError:
+        print(f"Warning: {state['inflight']} analyses still running after "
+              f"{SHUTDOWN_TIMEOUT} s")
+    await asyncio.wait([warm_up], timeout=SHUTDOWN_TIMEOUT)
+    detect_executor.shutdown(wait=False, cancel_futures=True)
+    detector_pool.shutdown()
+    print("✓ SonoSight backend stopped")
+
+
+app = Starlette(
+    routes=[
+        Route('/health', health_check, methods=['GET']),
+        Route('/ready', readiness_check, methods=['GET']),
+        Route('/analyze_eye', analyze_eye, methods=['POST']),
+        Route('/analyses', list_analyses, methods=['GET']),
+        Route('/analyses/report', analyses_report, methods=['GET']),
+        Route('/changes', get_changes, methods=['GET']),
+        WebSocketRoute('/stream', stream),
+    ],
+    middleware=[
+        # Allow Flutter app to access the API
+        Middleware(CORSMiddleware, allow_origins=['*'], allow_methods=['*'],
+                   allow_headers=['*'])
+    ],
+    lifespan=lifespan
+)
+
+
+if __name__ == '__main__':
+    import uvicorn
+
+    print("\n" + "="*75)
+    print("              SONOSIGHT AI BACKEND SERVER (ASGI)")
+    print("           Starting Uvicorn API server...")
+    print("="*75 + "\n")
+    print(f"Server running on http://localhost:{PORT}")
+    print("Endpoints:")
+    print("  GET  /health - Health check")
+    print("  GET  /ready - Readiness check (model warmed up)")
+    print("  POST /analyze_eye - Analyze eye image")
+    print("  GET  /analyses - Logged analyses by session, patient, image or time")
+    print("  GET  /analyses/report - Aggregate report over logged analyses")
+    print("  GET  /changes - Change feed (since=<seq>, optional long-poll)")
+    print("  WS   /stream - Live camera analysis (binary frames in, results out)")
+    print(f"\nDetection concurrency limit: {MAX_CONCURRENCY}")
+    print("\nPress CTRL+C to stop (in-flight analyses are completed first)\n")
+
+    # Uvicorn stops accepting connections on SIGINT/SIGTERM and waits for
+    # open requests before running the lifespan shutdown above
+    uvicorn.run(app, host=HOST, port=PORT, log_level='warning',
+                timeout_graceful_shutdown=SHUTDOWN_TIMEOUT)
@@ -5,11 +5,10 @@ Mock version for testing camera functionality
 
 from flask import Flask, request, jsonify
 from flask_cors import CORS
-import cv2
-import numpy as np
-import base64
 import random
 
+from image_upload import parse_bool, read_image_upload
+
 app = Flask(__name__)
 CORS(app)  # Allow Flutter app to access the API
 
@@ -96,31 +95,21 @@ def analyze_eye():
     """
     Analyze eye image from Flutter app
     
-    Expects JSON with base64 encoded image
+    Accepts JSON with a base64 encoded image, multipart/form-data with an
+    'image' file field, or a raw application/octet-stream / image/jpeg body
     Returns AI analysis results
     """
     try:
-        data = request.json
-        
-        if not data or 'image' not in data:
-            return jsonify({
-                'success': False,
-                'error': 'No image data provided'
-            }), 400
-        
-        # Decode base64 image
-        image_data = base64.b64decode(data['image'])
-        nparr = np.frombuffer(image_data, np.uint8)
-        image = cv2.imdecode(nparr, cv2.IMREAD_COLOR)
+        image, options, error = read_image_upload(request)
         
-        if image is None:
+        if error:
             return jsonify({
                 'success': False,
-                'error': 'Failed to decode image'
+                'error': error
             }), 400
         
         # Get preferences
-        prefer_right_eye = data.get('prefer_right_eye', True)
+        prefer_right_eye = parse_bool(options.get('prefer_right_eye'), True)
         
         # Run mock detection
         result = detector.detect_eye(image, prefer_right_eye=prefer_right_eye)
@@ -0,0 +1,305 @@
+"""
+Columnar time-series store for SonoSight sensor readings
+One directory per device holding an int64 timestamp column and a float64
+column per reading field, each a memory-mapped file kept sorted by
+timestamp so range queries are two binary searches and a slice
+"""
+
+import json
+import os
+import threading
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import quote
+
+import numpy as np
+
+from sensor_sinks import READING_FIELDS, SinkError
+
+# Value columns (None is stored as NaN)
+VALUE_FIELDS = tuple(f for f in READING_FIELDS if f not in ('device_id', 'timestamp'))
+
+# Rows allocated when a device is first seen; capacity doubles when full
+INITIAL_CAPACITY = 1024
+
+
+class DeviceSeries:
+    """
+    Append-only columns for one device
+
+    Rows stay sorted by timestamp: in-order batches are appended, a late
+    reading shifts the tail of each column by one row, and a reading
+    with an existing timestamp overwrites that row (so a retried batch
+    does not create duplicates).
+    """
+
+    def __init__(self, directory: str, device_id: str):
+        self.directory = directory
+        self.device_id = device_id
+        self.lock = threading.RLock()
+        os.makedirs(directory, exist_ok=True)
+        meta_path = os.path.join(directory, 'meta.json')
+        if os.path.exists(meta_path):
+            with open(meta_path, 'r', encoding='utf-8') as f:
+                meta = json.load(f)
+            self.count, self.capacity = meta['count'], meta['capacity']
+        else:
+            self.count, self.capacity = 0, INITIAL_CAPACITY
+        self._map_columns()
+
+    def _column_path(self, name: str) -> str:
+        return os.path.join(self.directory, f'{name}.col')
+
+    def _map_columns(self):
+        """(Re)open every column file as a memmap of self.capacity rows"""
+        self.columns = {}
+        for name in ('timestamp',) + VALUE_FIELDS:
+            dtype = np.dtype(np.int64 if name == 'timestamp' else np.float64)
+            path = self._column_path(name)
+            size = self.capacity * dtype.itemsize
+            if not os.path.exists(path) or os.path.getsize(path) < size:
+                with open(path, 'ab') as f:
+                    f.truncate(size)
+            self.columns[name] = np.memmap(path, dtype=dtype, mode='r+', shape=(self.capacity,))
+
+    def _write_meta(self):
+        meta_path = os.path.join(self.directory, 'meta.json')
+        with open(meta_path + '.tmp', 'w', encoding='utf-8') as f:
+            json.dump({'device_id': self.device_id, 'count': self.count,
+                       'capacity': self.capacity}, f)
+        os.replace(meta_path + '.tmp', meta_path)
+
+    def _reserve(self, rows: int):
+        if self.count + rows <= self.capacity:
+            return
+        while self.count + rows > self.capacity:
+            self.capacity *= 2
+        for column in self.columns.values():
+            column.flush()
+        self._map_columns()
+
+    def append(self, readings: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+        """
+        Store readings for this device
+
+        Returns:
+            (new readings, readings that overwrote an existing timestamp)
+        """
+        readings = sorted(readings, key=lambda r: r['timestamp'])
+        with self.lock:
+            self._reserve(len(readings))
+            timestamps = self.columns['timestamp']
+            n = self.count
+            # Fast path: the whole batch is newer than anything stored
+            if n == 0 or readings[0]['timestamp'] > timestamps[n - 1]:
+                unique = {r['timestamp']: r for r in readings}
+                new, updated = list(unique.values()), []
+                timestamps[n:n + len(new)] = list(unique)
+                for name in VALUE_FIELDS:
+                    self.columns[name][n:n + len(new)] = [
+                        np.nan if r.get(name) is None else r[name] for r in new]
+                self.count += len(new)
+            else:
+                new, updated = [], []
+                for reading in readings:
+                    outcome = self._insert(reading)
+                    if outcome == 'new':
+                        new.append(reading)
+                    elif outcome == 'updated':
+                        updated.append(reading)
+            self._write_meta()
+        return new, updated
+
+    def _insert(self, reading: Dict) -> Optional[str]:
+        """
+        Place one reading at its sorted position (caller holds the lock)
+
+        Returns:
+            'new', 'updated' (overwrote a row with different values) or
+            None (identical to the stored row, e.g. a retried batch)
+        """
+        n = self.count
+        timestamps = self.columns['timestamp']
+        pos = int(np.searchsorted(timestamps[:n], reading['timestamp']))
+        values = [np.nan if reading.get(name) is None else reading[name]
+                  for name in VALUE_FIELDS]
+        if pos < n and timestamps[pos] == reading['timestamp']:
+            stored = [self.columns[name][pos] for name in VALUE_FIELDS]
+            if all(a == b or (a != a and b != b) for a, b in zip(values, stored)):
+                return None
+            outcome = 'updated'
+        else:
+            for column in self.columns.values():
+                column[pos + 1:n + 1] = column[pos:n]
+            timestamps[pos] = reading['timestamp']
+            self.count += 1
+            outcome = 'new'
+        for name, value in zip(VALUE_FIELDS, values):
+            self.columns[name][pos] = value
+        return outcome
+
+    def window(self, start: Optional[int], end: Optional[int]):
+        """Row range [lo, hi) with start <= timestamp <= end"""
+        timestamps = self.columns['timestamp'][:self.count]
+        lo = 0 if start is None else int(np.searchsorted(timestamps, start, 'left'))
+        hi = self.count if end is None else int(np.searchsorted(timestamps, end, 'right'))
+        return lo, max(lo, hi)
+
+    def rows(self, lo: int, hi: int, step: int = 1) -> List[Dict]:
+        """Readings for rows lo..hi (hi exclusive), reversed when step is -1"""
+        if hi <= lo:
+            return []
+        index = slice(lo, hi) if step == 1 else slice(hi - 1, lo - 1 if lo else None, -1)
+        columns = {name: self.columns[name][index].tolist() for name in VALUE_FIELDS}
+        timestamps = self.columns['timestamp'][index].tolist()
+        result = []
+        for i, timestamp in enumerate(timestamps):
+            reading = {'device_id': self.device_id, 'timestamp': timestamp}
+            for name in VALUE_FIELDS:
+                value = columns[name][i]
+                reading[name] = None if value != value else value
+            result.append(reading)
+        return result
+
+    def close(self):
+        with self.lock:
+            for column in self.columns.values():
+                column.flush()
+            self.columns = {}
+
+
+class TimeSeriesStore:
+    """
+    Sensor readings by device and time, persisted under one directory
+
+    Also usable as an ingest sink: write() takes a batch of validated
+    readings, and storing the same batch twice is harmless. Listeners
+    added with add_listener() see each reading once when it is first
+    stored, and again only if a later write changes it.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._series: Dict[str, DeviceSeries] = {}
+        self._listeners: List[Callable] = []
+        for entry in sorted(os.listdir(directory)):
+            meta_path = os.path.join(directory, entry, 'meta.json')
+            if os.path.exists(meta_path):
+                with open(meta_path, 'r', encoding='utf-8') as f:
+                    device_id = json.load(f)['device_id']
+                self._series[device_id] = DeviceSeries(os.path.join(directory, entry),
+                                                       device_id)
+
+    def _get_series(self, device_id: str, create: bool = False) -> Optional[DeviceSeries]:
+        with self._lock:
+            series = self._series.get(device_id)
+            if series is None and create:
+                # The prefix keeps ids like '..' from naming a directory outside the store
+                series = DeviceSeries(os.path.join(self.directory,
+                                                   'device-' + quote(device_id, safe='')),
+                                      device_id)
+                self._series[device_id] = series
+            return series
+
+    def add_listener(self, listener: Callable[[List[Dict], List[Dict]], None]):
+        """Call listener(new, updated) after every write that stores something"""
+        self._listeners.append(listener)
+
+    def write(self, readings: Iterable[Dict]) -> int:
+        """Append readings (any devices, any order); returns new rows stored"""
+        by_device: Dict[str, List[Dict]] = {}
+        for reading in readings:
+            by_device.setdefault(reading['device_id'], []).append(reading)
+        new, updated = [], []
+        try:
+            for device_id, batch in by_device.items():
+                device_new, device_updated = self._get_series(device_id, create=True).append(batch)
+                new.extend(device_new)
+                updated.extend(device_updated)
+        except OSError as e:
+            raise SinkError(f'Time-series store write failed: {e}') from e
+        if new or updated:
+            for listener in self._listeners:
+                # The readings are stored; a failing listener must not fail the write
+                try:
+                    listener(new, updated)
+                except Exception as e:
+                    print(f"Warning: time-series listener {getattr(listener, '__name__', listener)} "
+                          f"failed: {type(e).__name__}: {e}")
+        return len(new)
+
+    def column(self, device_id: str, field: str, start: Optional[int] = None):
+        """
+        Copy of (timestamps, values) for one field from start onwards
+
+        Returns:
+            Two numpy arrays (empty for an unknown device); missing values are NaN
+        """
+        series = self._get_series(device_id)
+        if series is None:
+            return np.empty(0, np.int64), np.empty(0, np.float64)
+        with series.lock:
+            lo, hi = series.window(start, None)
+            return (np.array(series.columns['timestamp'][lo:hi]),
+                    np.array(series.columns[field][lo:hi]))
+
+    def devices(self) -> List[Dict]:
+        """Every device with its reading count and first/last timestamp"""
+        with self._lock:
+            series_list = list(self._series.values())
+        result = []
+        for series in series_list:
+            with series.lock:
+                timestamps = series.columns['timestamp']
+                result.append({
+                    'device_id': series.device_id,
+                    'count': series.count,
+                    'first': int(timestamps[0]) if series.count else None,
+                    'last': int(timestamps[series.count - 1]) if series.count else None,
+                })
+        return result
+
+    def query(self, device_id: str, start: Optional[int] = None, end: Optional[int] = None,
+              limit: int = 500, cursor: Optional[int] = None, newest_first: bool = False) -> Dict:
+        """
+        Readings of one device in a time range, one page at a time
+
+        Args:
+            device_id: Device to read
+            start: Earliest timestamp (epoch ms, inclusive)
+            end: Latest timestamp (epoch ms, inclusive)
+            limit: Largest page size
+            cursor: next_cursor from the previous page
+            newest_first: Page from end towards start
+
+        Returns:
+            Dictionary with 'readings' and 'next_cursor' (None on the last page)
+        """
+        series = self._get_series(device_id)
+        if series is None:
+            return {'readings': [], 'next_cursor': None}
+        # The cursor is the last timestamp returned; timestamps are unique
+        # per device, so paging is stable while new readings arrive
+        if cursor is not None:
+            if newest_first:
+                end = cursor - 1 if end is None else min(end, cursor - 1)
+            else:
+                start = cursor + 1 if start is None else max(start, cursor + 1)
+        with series.lock:
+            lo, hi = series.window(start, end)
+            if newest_first:
+                page = series.rows(max(lo, hi - limit), hi, step=-1)
+                more = hi - limit > lo
+            else:
+                page = series.rows(lo, min(hi, lo + limit))
+                more = lo + limit < hi
+        return {
+            'readings': page,
+            'next_cursor': page[-1]['timestamp'] if more and page else None
+        }
+
+    def close(self):
+        with self._lock:
+            for series in self._series.values():
+                series.close()
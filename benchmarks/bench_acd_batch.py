@@ -0,0 +1,127 @@
+"""
+Parity check and throughput benchmark for vectorized ACD scoring
+Compares extract_features_batch / predict_acd_batch with the scalar
+EyeDetector._extract_features / _predict_acd path
+
+Usage:
+    python benchmarks/bench_acd_batch.py [--rows 100000]
+
+Exits non-zero if any row differs from the scalar path.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.eye_detector import EyeDetector, extract_features_batch, predict_acd_batch
+
+
+def random_measurements(rows: int, rng: np.random.Generator):
+    """Integer centers/pupil radii and float iris radii, as detect_eye produces"""
+    iris_radii = rng.uniform(10, 120, rows)
+    iris_centers = rng.integers(100, 1000, (rows, 2))
+    pupil_radii = np.maximum(3, (iris_radii * rng.uniform(0.05, 0.9, rows)).astype(int))
+    offsets = (iris_radii[:, None] * rng.uniform(-0.6, 0.6, (rows, 2))).astype(int)
+    methods = np.where(rng.random(rows) < 0.2, 'fallback', 'contour')
+    return iris_centers, iris_radii, iris_centers + offsets, pupil_radii, methods
+
+
+def check_parity(detector: EyeDetector, rows: int, rng: np.random.Generator) -> int:
+    """Count rows where the batch path differs from the scalar path"""
+    iris_c, iris_r, pupil_c, pupil_r, methods = random_measurements(rows, rng)
+    features = extract_features_batch(iris_c, iris_r, pupil_c, pupil_r)
+    prediction = predict_acd_batch(features, methods)
+
+    mismatches = 0
+    for i in range(rows):
+        iris = {'center': tuple(int(v) for v in iris_c[i]), 'radius': float(iris_r[i]),
+                'diameter_px': 2 * float(iris_r[i])}
+        pupil = {'center': tuple(int(v) for v in pupil_c[i]), 'radius': int(pupil_r[i]),
+                 'diameter_px': 2 * int(pupil_r[i])}
+        scalar_features = detector._extract_features(iris, pupil)
+        scalar = detector._predict_acd(scalar_features, str(methods[i]))
+
+        same = all(scalar_features[key] == features[key][i] for key in scalar_features)
+        same = same and all(scalar[key] == prediction[key][i]
+                            for key in ('acd_mm', 'risk_level', 'risk_score',
+                                        'confidence', 'detection_quality'))
+        if not same:
+            mismatches += 1
+            if mismatches <= 5:
+                print(f"  mismatch at row {i}: {scalar_features} {scalar['risk_score']}")
+    return mismatches
+
+
+def grid_parity(detector: EyeDetector) -> int:
+    """Sweep each stored (3-decimal) feature across its thresholds"""
+    fine = np.round(np.arange(0.0, 0.701, 0.001), 3)
+    coarse = np.array([0.0, 0.05, 0.1, 0.2, 0.3, 0.45, 0.6])
+    rows = []
+    for column in range(3):
+        sweep = [coarse] * 3
+        sweep[column] = fine
+        mesh = np.meshgrid(*sweep, indexing='ij')
+        rows.append(np.stack([m.ravel() for m in mesh], axis=1))
+    table = np.concatenate(rows)
+    mismatches = 0
+    for method in ('contour', 'fallback'):
+        prediction = predict_acd_batch(table, np.full(len(table), method))
+        for i, (r, e, n) in enumerate(table):
+            scalar = detector._predict_acd({'iris_pupil_ratio': float(r),
+                                            'pupil_eccentricity': float(e),
+                                            'normalized_pupil_size': float(n)}, method)
+            if (scalar['risk_score'] != prediction['risk_score'][i] or
+                    scalar['acd_mm'] != prediction['acd_mm'][i] or
+                    scalar['risk_level'] != prediction['risk_level'][i] or
+                    scalar['confidence'] != prediction['confidence'][i]):
+                mismatches += 1
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--parity-rows', type=int, default=20000)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    detector = EyeDetector()
+
+    print("\nParity (random measurements)...")
+    random_mismatches = check_parity(detector, args.parity_rows, rng)
+    print(f"  {random_mismatches} / {args.parity_rows} rows differ")
+    print("Parity (threshold grid)...")
+    grid_mismatches = grid_parity(detector)
+    print(f"  {grid_mismatches} rows differ")
+
+    iris_c, iris_r, pupil_c, pupil_r, methods = random_measurements(args.rows, rng)
+
+    start = time.perf_counter()
+    for i in range(args.rows):
+        iris = {'center': (int(iris_c[i, 0]), int(iris_c[i, 1])), 'radius': float(iris_r[i]),
+                'diameter_px': 2 * float(iris_r[i])}
+        pupil = {'center': (int(pupil_c[i, 0]), int(pupil_c[i, 1])), 'radius': int(pupil_r[i]),
+                 'diameter_px': 2 * int(pupil_r[i])}
+        detector._predict_acd(detector._extract_features(iris, pupil), methods[i])
+    scalar_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    predict_acd_batch(extract_features_batch(iris_c, iris_r, pupil_c, pupil_r), methods)
+    batch_s = time.perf_counter() - start
+
+    print(f"\nThroughput over {args.rows} rows:")
+    print(f"  scalar: {args.rows / scalar_s:12,.0f} rows/s")
+    print(f"  batch:  {args.rows / batch_s:12,.0f} rows/s  ({scalar_s / batch_s:.0f}x)")
+
+    if random_mismatches or grid_mismatches:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+Analysis log benchmark
+Measures the per-analysis cost of AnalysisLog.record and the latency of
+indexed lookups and reports as the log grows to millions of rows
+
+Usage:
+    python benchmarks/bench_analysis_log.py [--rows 100000 1000000]
+
+Rows are spread over 1 analysis per second across 10,000 sessions and
+2,000 patients; the bulk of each log is loaded with executemany so the
+run stays short, record() itself is timed on a separate sample.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                             'backend'))
+
+from analysis_log import _COLUMNS, AnalysisLog
+
+RESULT = {
+    'success': True,
+    'features': {'iris_pupil_ratio': 0.41, 'pupil_eccentricity': 0.08,
+                 'normalized_pupil_size': 0.17, 'iris_diameter_px': 96.0,
+                 'pupil_diameter_px': 39.4},
+    'prediction': {'acd_mm': 3.1, 'risk_level': 'LOW', 'risk_score': 2, 'confidence': 0.83},
+    'timings_ms': {'landmarks': 21.4, 'iris': 0.3, 'pupil': 1.2, 'predict': 0.1, 'total': 23.0},
+}
+SETTINGS = {'prefer_right_eye': True, 'pupil_backend': 'threshold'}
+
+
+def fill(log, rows, start_ms):
+    """Bulk-load synthetic analyses"""
+    rng = random.Random(0)
+    insert = (f"INSERT INTO analyses ({', '.join(_COLUMNS)}) "
+              f"VALUES ({', '.join('?' * len(_COLUMNS))})")
+    batch = []
+    for i in range(rows):
+        batch.append((start_ms + i * 1000, f's{rng.randrange(10_000)}', f'p{rng.randrange(2_000)}',
+                      f'{rng.getrandbits(256):064x}', 'right', 'threshold', 0, 1, None,
+                      rng.uniform(2.0, 4.0), rng.choice(('LOW', 'MODERATE', 'HIGH')), 2, 0.8,
+                      rng.uniform(15, 40), '{"iris_pupil_ratio":0.4}', '{"total":23.0}'))
+        if len(batch) == 50_000:
+            with log._conn:
+                log._conn.executemany(insert, batch)
+            batch = []
+    if batch:
+        with log._conn:
+            log._conn.executemany(insert, batch)
+
+
+def median_ms(fn, repeat=20):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, nargs='+', default=[100_000, 1_000_000])
+    args = parser.parse_args()
+
+    print(f"\n{'rows':>9} {'MB':>6} | {'record us':>9} | {'session':>8} {'hash':>7} "
+          f"{'page 3':>7} | {'session rpt':>11} {'day rpt':>8} {'patient rpt':>11}  (ms)")
+    for rows in args.rows:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'analyses.db')
+            log = AnalysisLog(path)
+            start_ms = int(time.time() * 1000) - rows * 1000
+            fill(log, rows, start_ms)
+
+            start = time.perf_counter()
+            for i in range(2000):
+                log.record(f'{i:064x}', SETTINGS, {'session_id': 'bench'}, RESULT)
+            record_us = (time.perf_counter() - start) / 2000 * 1e6
+
+            session = median_ms(lambda: log.find({'session_id': 's42'}, limit=50))
+            by_hash = median_ms(lambda: log.find({'image_hash': f'{7:064x}'}))
+            first = log.find({}, limit=100)
+
+            def third_page():
+                page = log.find({}, limit=100, cursor=first['next_cursor'])
+                log.find({}, limit=100, cursor=page['next_cursor'])
+
+            paged = median_ms(third_page)
+            session_report = median_ms(lambda: log.report({'session_id': 's42'}))
+            day_end = start_ms + rows * 1000
+            day_report = median_ms(lambda: log.report({}, day_end - 86_400_000, day_end), 5)
+            patient_report = median_ms(lambda: log.report({'patient_id': 'p7'}))
+            size_mb = sum(os.path.getsize(os.path.join(tmp, f)) for f in os.listdir(tmp)) / 2 ** 20
+            print(f"{rows:>9} {size_mb:>6.0f} | {record_us:>9.1f} | {session:>8.3f} {by_hash:>7.3f} "
+                  f"{paged:>7.3f} | {session_report:>11.3f} {day_report:>8.2f} {patient_report:>11.3f}")
+            log.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,101 @@
+"""
+Both-eyes benchmark for EyeDetector.detect_both_eyes
+Compares analyzing both eyes with two detect_eye calls (two Face Mesh
+passes) against one detect_both_eyes call (one pass, per-eye stages twice)
+
+Usage:
+    python benchmarks/bench_both_eyes.py [--image face.jpg] [--runs 20]
+
+With --image both paths are timed end to end. Without it a synthetic
+two-eye frame is used: Face Mesh finds no face there, so the landmark
+pass is timed on the frame and the per-eye stages on synthetic iris
+landmarks, and the two paths are composed from those stage times.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.eye_detector import EyeDetector
+
+# Synthetic eyes: (iris center, iris radius, pupil radius) in a 1280x720 frame
+EYES = {'right': ((480, 360), 48, 17), 'left': ((800, 360), 46, 19)}
+
+
+def synthetic_frame():
+    """Grey frame with two dark pupils inside lighter irises, plus landmarks"""
+    height, width = 720, 1280
+    frame = np.full((height, width, 3), 190, dtype=np.uint8)
+    landmarks = [SimpleNamespace(x=0.0, y=0.0) for _ in range(478)]
+    for name, ((cx, cy), iris, pupil) in EYES.items():
+        cv2.circle(frame, (cx, cy), iris, (120, 110, 100), -1)
+        cv2.circle(frame, (cx, cy), pupil, (15, 15, 15), -1)
+        indices = EyeDetector.RIGHT_IRIS if name == 'right' else EyeDetector.LEFT_IRIS
+        points = [(cx, cy), (cx + iris, cy), (cx, cy - iris), (cx - iris, cy), (cx, cy + iris)]
+        for index, (x, y) in zip(indices, points):
+            landmarks[index] = SimpleNamespace(x=x / width, y=y / height)
+    return frame, SimpleNamespace(landmark=landmarks)
+
+
+def median_ms(fn, runs: int) -> float:
+    fn()  # warm-up
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--image', help='Face image with both eyes visible')
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args()
+
+    detector = EyeDetector(record_timings=False)
+
+    if args.image:
+        frame = cv2.imread(args.image)
+        if frame is None:
+            sys.exit(f"Could not read {args.image}")
+        two_calls = median_ms(lambda: (detector.detect_eye(frame, True),
+                                       detector.detect_eye(frame, False)), args.runs)
+        both = median_ms(lambda: detector.detect_both_eyes(frame), args.runs)
+        landmarks_ms = None
+    else:
+        frame, landmarks = synthetic_frame()
+        landmarks_ms = median_ms(lambda: detector._find_landmarks(frame), args.runs)
+        eye_ms = {name: median_ms(lambda: detector._analyze_eye(frame, landmarks, name == 'right',
+                                                                 None, None), args.runs)
+                  for name in EYES}
+        right = detector._analyze_eye(frame, landmarks, True, None, None)
+        left = detector._analyze_eye(frame, landmarks, False, None, None)
+        asymmetry_ms = median_ms(lambda: detector._asymmetry_features(right, left), args.runs)
+        per_eye = sum(eye_ms.values())
+        two_calls = 2 * landmarks_ms + per_eye
+        both = landmarks_ms + per_eye + asymmetry_ms
+        print(f"\nStages (ms): landmarks {landmarks_ms:.2f}, right eye {eye_ms['right']:.2f}, "
+              f"left eye {eye_ms['left']:.2f}, asymmetry {asymmetry_ms:.3f}")
+        if right['success'] and left['success']:
+            print(f"Asymmetry: {detector._asymmetry_features(right, left)}")
+
+    print(f"\n{'path':<28} {'ms':>8} {'vs 1 eye':>9}")
+    single = (landmarks_ms + eye_ms['right']) if landmarks_ms is not None else two_calls / 2
+    for name, ms in (('one eye (detect_eye)', single),
+                     ('two detect_eye calls', two_calls),
+                     ('detect_both_eyes', both)):
+        print(f"{name:<28} {ms:>8.2f} {ms / single:>8.2f}x")
+
+
+if __name__ == '__main__':
+    main()
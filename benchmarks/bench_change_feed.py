@@ -0,0 +1,64 @@
+"""
+Change feed benchmark
+Measures how fast readings are sequenced into the feed and compares the
+bytes a client downloads to catch up after N new readings: GET /changes
+versus re-pulling the whole history
+
+Usage:
+    python benchmarks/bench_change_feed.py [--history 100000] [--new 10 100 1000]
+"""
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                             'backend'))
+
+from change_feed import ChangeFeed
+
+
+def reading(i):
+    return {'device_id': 'esp', 'timestamp': 1_700_000_000_000 + i * 2000, 'distance': 5.0,
+            'arf': 0.5, 'deformation': 0.05, 'current_iop': 15.0 + i % 10,
+            'avg_iop': 16.0, 'resistance': 10.0}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--history', type=int, default=100_000)
+    parser.add_argument('--new', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--batch', type=int, default=500)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        feed = ChangeFeed(os.path.join(tmp, 'changes.db'))
+        history = [reading(i) for i in range(args.history)]
+        start = time.perf_counter()
+        for i in range(0, len(history), args.batch):
+            feed.append('reading', [('insert', f"esp/{r['timestamp']}", r)
+                                    for r in history[i:i + args.batch]])
+        rate = len(history) / (time.perf_counter() - start)
+        print(f"\nSequenced {len(history)} readings at {rate:.0f} readings/s")
+
+        print(f"{'new':>6} | {'changes KB':>10} {'ms':>7} | {'full history KB':>15}")
+        total = len(history)
+        for new in args.new:
+            since = feed.latest_seq()
+            added = [reading(total + i) for i in range(new)]
+            feed.append('reading', [('insert', f"esp/{r['timestamp']}", r) for r in added])
+            total += new
+            start = time.perf_counter()
+            body = json.dumps(feed.since(since, limit=5000))
+            elapsed = (time.perf_counter() - start) * 1000
+            full = len(json.dumps([reading(i) for i in range(total)]))
+            print(f"{new:>6} | {len(body) / 1024:>10.1f} {elapsed:>7.2f} | {full / 1024:>15.0f}")
+        feed.close()
+
+
+if __name__ == '__main__':
+    main()
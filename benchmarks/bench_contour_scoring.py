@@ -0,0 +1,174 @@
+"""
+Contour scoring benchmark for EyeDetector._detect_pupil
+Compares the pupil contour selector (_select_pupil_contour), through both
+its per-contour path and its single-pass NumPy path, with the original
+per-contour Python loop on noisy, eyelash-heavy iris crops, reporting
+times by contour count so PUPIL_CONTOUR_BATCH_MIN can be checked
+
+Usage:
+    python benchmarks/bench_contour_scoring.py [--crops 300] [--runs 5]
+        [--max-lashes 150] [--max-specks 0.04]
+
+Exits non-zero if any selector ever picks a different contour.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.eye_detector import EyeDetector
+
+# Contour-count buckets results are reported in: [low, high)
+BUCKETS = [(0, 40), (40, 160), (160, 250), (250, None)]
+
+
+def reference_select(contours, cx, cy, r):
+    """The original per-contour loop from _detect_pupil"""
+    iris_area = np.pi * r * r
+    valid_contours = []
+    for contour in contours:
+        area = cv2.contourArea(contour)
+        if area < 30:
+            continue
+        perimeter = cv2.arcLength(contour, True)
+        if perimeter == 0:
+            continue
+        circularity = 4 * np.pi * area / (perimeter ** 2)
+        area_ratio = area / iris_area
+        if (0.08 <= area_ratio <= 0.90 and circularity >= 0.4):
+            M = cv2.moments(contour)
+            if M['m00'] != 0:
+                cx_local = int(M['m10'] / M['m00'])
+                cy_local = int(M['m01'] / M['m00'])
+                dist = np.sqrt((cx_local - cx)**2 + (cy_local - cy)**2)
+                if dist <= r * 1.2:
+                    valid_contours.append({'contour': contour, 'area': area,
+                                           'circularity': circularity, 'distance': dist})
+    if not valid_contours:
+        return None
+    return max(valid_contours,
+               key=lambda x: x['area'] * x['circularity'] / (x['distance'] + 1))['contour']
+
+
+def selector(batch_min):
+    """_select_pupil_contour on a detector switching paths at batch_min contours"""
+    detector = EyeDetector()
+    if batch_min is not None:
+        detector.PUPIL_CONTOUR_BATCH_MIN = batch_min
+    return detector._select_pupil_contour
+
+
+def noisy_crop(rng: np.random.Generator, r: int, lashes: int, specks: float = 0.0):
+    """
+    Iris crop with a dark pupil, speckle noise and dark eyelash strokes,
+    plus isolated dark specks (dust, sensor noise) covering about the
+    fraction specks of the crop: each speck is its own contour, so dusty
+    crops give hundreds where eyelash strokes merge into a few blobs
+    """
+    padding = max(15, int(r * 0.4))
+    size = 2 * (r + padding)
+    crop = np.full((size, size), 190, np.uint8)
+    center = (size // 2 + int(rng.integers(-3, 4)), size // 2 + int(rng.integers(-3, 4)))
+    cv2.circle(crop, center, r, 120, -1)
+    cv2.ellipse(crop, center, (int(r * rng.uniform(0.3, 0.5)), int(r * rng.uniform(0.3, 0.5))),
+                float(rng.uniform(0, 180)), 0, 360, 25, -1)
+    for _ in range(lashes):
+        p1 = tuple(int(v) for v in rng.integers(0, size, 2))
+        p2 = (p1[0] + int(rng.integers(-25, 26)), p1[1] + int(rng.integers(-25, 26)))
+        cv2.line(crop, p1, p2, int(rng.integers(0, 60)), int(rng.integers(1, 3)))
+    for _ in range(lashes * 2):
+        spot = tuple(int(v) for v in rng.integers(0, size, 2))
+        cv2.circle(crop, spot, int(rng.integers(1, 5)), int(rng.integers(0, 80)), -1)
+    for x, y in rng.integers(0, size, (int(specks * size * size), 2)):
+        cv2.circle(crop, (int(x), int(y)), 1, 0, -1)
+    crop = np.clip(crop + rng.normal(0, 12, crop.shape), 0, 255).astype(np.uint8)
+    return crop, padding
+
+
+def contours_for(crop):
+    """Same thresholding as _detect_pupil"""
+    blurred = cv2.GaussianBlur(crop, (5, 5), 0)
+    _, binary = cv2.threshold(blurred, 0, 255, cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+    contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    return contours
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--crops', type=int, default=300)
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--max-lashes', type=int, default=150,
+                        help='Upper bound on eyelash strokes per crop')
+    parser.add_argument('--max-specks', type=float, default=0.04,
+                        help='Upper bound on the fraction of a crop covered by isolated '
+                             'specks (more = hundreds of contours)')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    cases = []
+    for _ in range(args.crops):
+        r = int(rng.integers(20, 90))
+        lashes = int(rng.integers(20, max(21, args.max_lashes)))
+        # Half the crops are clean, the rest dusty up to hundreds of contours
+        specks = rng.uniform(0, args.max_specks) if rng.random() < 0.5 else 0.0
+        crop, padding = noisy_crop(rng, r, lashes, specks)
+        contours = contours_for(crop)
+        if contours:
+            cases.append((contours, r + padding, r + padding, r))
+
+    selectors = [
+        ('original loop', reference_select),
+        ('per-contour path', selector(float('inf'))),
+        ('single-pass NumPy', selector(0)),
+        (f'selector (batch at {EyeDetector.PUPIL_CONTOUR_BATCH_MIN}+)', selector(None)),
+    ]
+
+    mismatches = 0
+    for case in cases:
+        expected = reference_select(*case)
+        for _, select in selectors[1:]:
+            actual = select(*case)
+            if (expected is None) != (actual is None) or (
+                    expected is not None and expected is not actual):
+                mismatches += 1
+
+    def timed(select, bucket_cases):
+        samples = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            for case in bucket_cases:
+                select(*case)
+            samples.append((time.perf_counter() - start) * 1000 / len(bucket_cases))
+        return statistics.median(samples)
+
+    counts = [len(case[0]) for case in cases]
+    print(f"\n{len(cases)} crops, contours per crop: median {int(np.median(counts))}, "
+          f"max {max(counts)}")
+    print(f"  selection mismatches: {mismatches}")
+    for low, high in BUCKETS:
+        bucket_cases = [case for case in cases
+                        if len(case[0]) >= low and (high is None or len(case[0]) < high)]
+        if not bucket_cases:
+            continue
+        label = f"{low}+" if high is None else f"{low}-{high - 1}"
+        print(f"\n  {label} contours ({len(bucket_cases)} crops)")
+        loop_ms = None
+        for name, select in selectors:
+            ms = timed(select, bucket_cases)
+            loop_ms = loop_ms or ms
+            print(f"    {name + ':':30} {ms:8.3f} ms/crop  ({loop_ms / ms:.2f}x)")
+
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
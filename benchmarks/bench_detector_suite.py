@@ -0,0 +1,274 @@
+"""
+EyeDetector benchmark suite with regression check
+Times detect_eye end to end and each per-eye stage (_extract_iris,
+_detect_pupil, _extract_features, _predict_acd) on deterministic
+synthetic faces (see synthetic_eyes.py) across image sizes and scenes,
+measures pupil error against the known geometry, and writes the results
+as JSON
+
+Usage:
+    python benchmarks/bench_detector_suite.py --output baseline.json
+    python benchmarks/bench_detector_suite.py --baseline baseline.json [--tolerance 0.25]
+
+With --baseline the run exits with status 1 if a timing's fastest sample
+and median are both more than --tolerance slower than the baseline (by at
+least --min-ms, so the fastest stages do not flap) and stay so when its
+scene is re-measured --confirm-rounds more times, if an eye the
+baseline measured falls back or fails, or if a pupil radius error grows
+by more than --accuracy-tolerance. Compare baselines from the same,
+otherwise idle machine; shared VMs may need a larger --tolerance.
+
+Face Mesh finds no face in synthetic frames, so detect_eye runs with the
+graph replaced by the frame's synthetic landmarks (resize and colour
+conversion still run); the graph's cost on each frame size is timed
+separately as find_landmarks.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from typing import Dict, List
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from lib.eye_detector import EyeDetector
+from synthetic_eyes import StubMesh, synthetic_face
+
+SIZES = ['640x480', '1280x720', '1920x1080', '4032x3024']
+SCENES = {
+    'clean': {},
+    'noisy': {'noise': 12.0},
+    'eccentric': {'eccentricity': 0.6, 'angle': 30.0},
+}
+
+
+def measure(fn, runs: int, sample_ms: float = 5.0):
+    """
+    Median and 90th percentile in ms per call over runs samples, after a
+    warm-up; fast calls are repeated within a sample (like timeit) until
+    it lasts about sample_ms, so timer resolution and jitter average out
+    """
+    start = time.perf_counter()
+    fn()
+    once = (time.perf_counter() - start) * 1000
+    number = max(1, min(1000, int(sample_ms / max(once, 1e-3))))
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        samples.append((time.perf_counter() - start) * 1000 / number)
+    samples.sort()
+    return {'min_ms': round(samples[0], 4),
+            'median_ms': round(statistics.median(samples), 4),
+            'p90_ms': round(samples[min(len(samples) - 1, int(len(samples) * 0.9))], 4),
+            'calls_per_sample': number}
+
+
+def stage_timings(detector: EyeDetector, image: np.ndarray, landmarks, runs: int):
+    """Per-stage timings for the right eye, fed with the previous stage's output"""
+    height, width = image.shape[:2]
+    iris = detector._extract_iris(landmarks, width, height, True)
+    pupil = detector._detect_pupil(image, iris)
+    features = detector._extract_features(iris, pupil)
+    method = pupil.get('method', 'contour')
+    return {
+        'extract_iris': measure(lambda: detector._extract_iris(landmarks, width, height, True), runs),
+        'detect_pupil': measure(lambda: detector._detect_pupil(image, iris), runs),
+        'extract_features': measure(lambda: detector._extract_features(iris, pupil), runs),
+        'predict_acd': measure(lambda: detector._predict_acd(features, method), runs),
+    }
+
+
+def accuracy(detector: EyeDetector, image: np.ndarray, truth):
+    """Pupil error of each eye against the synthetic geometry"""
+    eyes = {}
+    for name in ('right', 'left'):
+        result = detector.detect_eye(image, name == 'right')
+        if not result['success']:
+            eyes[name] = {'success': False, 'error': result.get('error')}
+            continue
+        pupil, expected = result['pupil'], truth[name]
+        eyes[name] = {
+            'success': True,
+            'detection_method': pupil['detection_method'],
+            'pupil_radius': pupil['radius'],
+            'pupil_radius_error': round(abs(pupil['radius'] - expected['pupil_radius'])
+                                        / expected['pupil_radius'], 4),
+            'pupil_center_error_px': round(float(np.hypot(
+                pupil['center'][0] - expected['pupil_center'][0],
+                pupil['center'][1] - expected['pupil_center'][1])), 2)
+        }
+    return eyes
+
+
+def run_suite(groups, runs: int, rounds: int, seed: int, working_resolution: int,
+              timings=None):
+    """
+    Timings keyed by 'size/scene/stage' (plus 'size/find_landmarks') and
+    accuracy keyed by 'size/scene', for (size, scene) groups
+
+    The groups are measured rounds times over and each case keeps its
+    fastest round, so a slow spell on the machine (another process, CPU
+    frequency changes) only spoils the cases it overlaps in one round.
+    Pass earlier timings to merge the new rounds into them.
+    """
+    detector = EyeDetector(static_image_mode=True, working_resolution=working_resolution,
+                           record_timings=False)
+    graph = EyeDetector(static_image_mode=True, working_resolution=working_resolution,
+                        record_timings=False)
+    timings = {} if timings is None else timings
+    measurements = {}
+
+    def keep(case, timing):
+        if case not in timings or timing['median_ms'] < timings[case]['median_ms']:
+            timings[case] = timing
+
+    for round_index in range(rounds):
+        for size, scene in groups:
+            width, height = (int(v) for v in size.split('x'))
+            image, landmarks, truth = synthetic_face(width, height, seed=seed, **SCENES[scene])
+            if scene == 'clean':
+                keep(f'{size}/find_landmarks', measure(lambda: graph._find_landmarks(image), runs))
+            detector.face_mesh.close()
+            detector.face_mesh = StubMesh(landmarks)
+            keep(f'{size}/{scene}/detect_eye', measure(lambda: detector.detect_eye(image), runs))
+            for stage, timing in stage_timings(detector, image, landmarks, runs).items():
+                keep(f'{size}/{scene}/{stage}', timing)
+            if round_index == 0:
+                # Results are deterministic, one round measures them
+                measurements[f'{size}/{scene}'] = accuracy(detector, image, truth)
+        print(f"  round {round_index + 1}/{rounds} done", file=sys.stderr)
+    graph.close()
+    detector.close()
+    return timings, measurements
+
+
+def case_group(case: str):
+    """(size, scene) group that measures a timing case"""
+    size, name = case.split('/')[:2]
+    # size/find_landmarks is measured with the clean scene
+    return size, name if name in SCENES else 'clean'
+
+
+def slow_cases(current, baseline, tolerance: float, min_ms: float) -> Dict[str, str]:
+    """Timing regressions of current against baseline, case -> description"""
+    slow = {}
+    for case, base in baseline['timings'].items():
+        now = current['timings'].get(case)
+        if now is None:
+            continue
+        # Both the fastest sample and the median must slow down: a busy
+        # spell on the machine inflates the median but rarely every sample
+        slower = {stat: now[stat] - base[stat] for stat in ('min_ms', 'median_ms')}
+        if all(now[stat] > base[stat] * (1 + tolerance) and slower[stat] > min_ms
+               for stat in slower):
+            slow[case] = (f"{case}: median {base['median_ms']:.3f} -> "
+                          f"{now['median_ms']:.3f} ms "
+                          f"(+{slower['median_ms'] / base['median_ms']:.0%})")
+    return slow
+
+
+def accuracy_regressions(current, baseline, accuracy_tolerance: float) -> List[str]:
+    """Eyes that fail, fall back or measure the pupil worse than in baseline"""
+    regressions = []
+    for case, eyes in baseline['accuracy'].items():
+        for name, base in eyes.items():
+            now = current['accuracy'].get(case, {}).get(name)
+            if now is None or not base['success']:
+                continue
+            if not now['success']:
+                regressions.append(f"{case}/{name}: detection failed ({now['error']})")
+            elif base['detection_method'] != 'fallback' and now['detection_method'] == 'fallback':
+                regressions.append(f"{case}/{name}: pupil detection fell back")
+            elif now['pupil_radius_error'] > base['pupil_radius_error'] + accuracy_tolerance:
+                regressions.append(f"{case}/{name}: pupil radius error "
+                                   f"{base['pupil_radius_error']:.1%} -> "
+                                   f"{now['pupil_radius_error']:.1%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--sizes', nargs='+', default=SIZES, help='WIDTHxHEIGHT frame sizes')
+    parser.add_argument('--runs', type=int, default=10, help='Samples per case and round')
+    parser.add_argument('--rounds', type=int, default=3,
+                        help='Passes over the suite; each case keeps its fastest (default 3)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--working-resolution', type=int, default=640)
+    parser.add_argument('--output', help='Write the results to this JSON file')
+    parser.add_argument('--baseline', help='Results JSON to check this run against')
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help='Allowed slowdown as a fraction (default 0.25)')
+    parser.add_argument('--min-ms', type=float, default=0.05,
+                        help='Slowdowns smaller than this many ms never count (default 0.05)')
+    parser.add_argument('--confirm-rounds', type=int, default=3,
+                        help='Rounds re-measuring slow cases before they count (0 = none)')
+    parser.add_argument('--accuracy-tolerance', type=float, default=0.02,
+                        help='Allowed growth of a relative pupil radius error (default 0.02)')
+    args = parser.parse_args()
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    groups = [(size, scene) for size in args.sizes for scene in SCENES]
+    timings, measurements = run_suite(groups, args.runs, args.rounds, args.seed,
+                                      args.working_resolution)
+    results = {
+        'suite': 'eye_detector',
+        'environment': {
+            'python': platform.python_version(),
+            'opencv': cv2.__version__,
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'cpu_count': os.cpu_count()
+        },
+        'settings': {'runs': args.runs, 'rounds': args.rounds, 'seed': args.seed,
+                     'working_resolution': args.working_resolution},
+        'timings': timings,
+        'accuracy': measurements
+    }
+
+    regressions = []
+    if baseline is not None:
+        if baseline.get('environment') != results['environment']:
+            print("Warning: baseline was recorded in a different environment", file=sys.stderr)
+        slow = slow_cases(results, baseline, args.tolerance, args.min_ms)
+        if slow and args.confirm_rounds:
+            # Re-measure the slow groups: a real regression stays slow
+            recheck = sorted({case_group(case) for case in slow})
+            print(f"Re-measuring {len(slow)} slow case(s)", file=sys.stderr)
+            run_suite(recheck, args.runs, args.confirm_rounds, args.seed,
+                      args.working_resolution, timings)
+            slow = slow_cases(results, baseline, args.tolerance, args.min_ms)
+        regressions = list(slow.values()) + accuracy_regressions(results, baseline,
+                                                                 args.accuracy_tolerance)
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+        print(f"Results written to {args.output}", file=sys.stderr)
+    else:
+        json.dump(results, sys.stdout, indent=2, sort_keys=True)
+        print()
+
+    for regression in regressions:
+        print(f"REGRESSION {regression}", file=sys.stderr)
+    if regressions:
+        sys.exit(1)
+    if baseline is not None:
+        print(f"No regressions against {args.baseline}", file=sys.stderr)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""
+Frame handoff benchmark for the inference worker processes
+Compares pickling decoded frames through a multiprocessing queue with
+passing slot references into the shared-memory FrameRing
+
+Usage:
+    python benchmarks/bench_frame_handoff.py [--frames 200]
+
+For each resolution one worker process receives frames and reads them
+(mean of a pixel row, so the frame data is really accessed); the parent
+measures the round trip per frame and its own send cost.
+"""
+
+import argparse
+import multiprocessing
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                             'backend'))
+
+from frame_ring import FrameRing
+
+RESOLUTIONS = [(480, 640), (1080, 1920), (3024, 4032)]
+
+
+def _pickle_worker(tasks, results):
+    """Receive whole frames through the queue"""
+    while True:
+        frame = tasks.get()
+        if frame is None:
+            break
+        results.put(float(frame[frame.shape[0] // 2].mean()))
+
+
+def _ring_worker(ring_spec, tasks, results):
+    """Receive slot references and read the frames in place"""
+    ring = FrameRing.attach(*ring_spec, untrack=False)
+    while True:
+        task = tasks.get()
+        if task is None:
+            break
+        frame = ring.view(*task)
+        results.put(float(frame[frame.shape[0] // 2].mean()))
+        del frame
+    ring.close()
+
+
+def run(context, frames, shape, use_ring):
+    """Round-trip and send-side milliseconds per frame"""
+    image = np.random.default_rng(0).integers(0, 255, shape + (3,), dtype=np.uint8)
+    tasks, results = context.Queue(), context.Queue()
+    ring = FrameRing(slots=2, slot_bytes=image.nbytes) if use_ring else None
+    if use_ring:
+        worker = context.Process(target=_ring_worker, args=(ring.spec, tasks, results))
+    else:
+        worker = context.Process(target=_pickle_worker, args=(tasks, results))
+    worker.start()
+
+    round_trip, send = [], []
+    for i in range(frames + 5):
+        start = time.perf_counter()
+        if use_ring:
+            slot = ring.acquire()
+            shape_, dtype = ring.write(slot, image)
+            tasks.put((slot, shape_, dtype))
+        else:
+            tasks.put(image)
+        sent = time.perf_counter()
+        results.get()
+        if use_ring:
+            ring.release(slot)
+        if i >= 5:  # skip warm-up frames
+            round_trip.append((time.perf_counter() - start) * 1000)
+            send.append((sent - start) * 1000)
+
+    tasks.put(None)
+    worker.join()
+    if ring is not None:
+        ring.close()
+    return statistics.median(round_trip), statistics.median(send)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--frames', type=int, default=200)
+    args = parser.parse_args()
+
+    context = multiprocessing.get_context(
+        'fork' if 'fork' in multiprocessing.get_all_start_methods() else 'spawn')
+
+    print(f"\nFrame handoff, median of {args.frames} frames (ms per frame)")
+    print(f"{'frame':>11} {'MB':>6} | {'pickle rt':>9} {'send':>7} | "
+          f"{'ring rt':>8} {'send':>7} | {'speedup':>7}")
+    for height, width in RESOLUTIONS:
+        frames = max(20, args.frames // (height * width // (480 * 640)))
+        pickle_rt, pickle_send = run(context, frames, (height, width), use_ring=False)
+        ring_rt, ring_send = run(context, frames, (height, width), use_ring=True)
+        print(f"{width:>5}x{height:<5} {height * width * 3 / 2 ** 20:6.1f} | "
+              f"{pickle_rt:9.3f} {pickle_send:7.3f} | {ring_rt:8.3f} {ring_send:7.3f} | "
+              f"{pickle_rt / ring_rt:6.1f}x")
+
+
+if __name__ == '__main__':
+    main()
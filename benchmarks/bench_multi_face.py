@@ -0,0 +1,125 @@
+"""
+Multi-face benchmark for EyeDetector.detect_faces
+Measures faces/second for group images analyzed in one landmark pass,
+with per-face work run in turn (face_workers=1) or concurrently, against
+analyzing each face as a separate single-face upload
+
+Usage:
+    python benchmarks/bench_multi_face.py [--image group.jpg] [--faces 1 2 4 8]
+
+With --image the real Face Mesh graph is timed end to end on that photo.
+Without it a synthetic group frame is used: Face Mesh is timed on the
+frame once, then a stub returning synthetic landmarks replaces it so the
+per-face stages can be timed; the landmark time is added back to every
+pass (and to every upload of the separate-upload baseline).
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.eye_detector import EyeDetector
+
+WIDTH, HEIGHT = 1920, 1080
+
+
+def synthetic_group(count: int):
+    """Frame with count faces (two eyes each) and their synthetic landmarks"""
+    frame = np.full((HEIGHT, WIDTH, 3), 190, dtype=np.uint8)
+    faces = []
+    for k in range(count):
+        cx, cy = 150 + (k % 8) * 230, 250 + (k // 8) * 320
+        points = [SimpleNamespace(x=(cx - 100) / WIDTH, y=(cy - 130) / HEIGHT)] * 478
+        points[0] = SimpleNamespace(x=(cx + 100) / WIDTH, y=(cy + 160) / HEIGHT)
+        for indices, ex, pupil in ((EyeDetector.RIGHT_IRIS, cx - 45, 8),
+                                   (EyeDetector.LEFT_IRIS, cx + 45, 9)):
+            cv2.circle(frame, (ex, cy), 22, (120, 110, 100), -1)
+            cv2.circle(frame, (ex, cy), pupil, (15, 15, 15), -1)
+            iris = [(ex, cy), (ex + 22, cy), (ex, cy - 22), (ex - 22, cy), (ex, cy + 22)]
+            for index, (x, y) in zip(indices, iris):
+                points[index] = SimpleNamespace(x=x / WIDTH, y=y / HEIGHT)
+        faces.append(SimpleNamespace(landmark=points))
+    return frame, faces
+
+
+class StubMesh:
+    """Face Mesh stand-in returning fixed landmarks"""
+
+    def __init__(self, faces):
+        self.faces = faces
+
+    def process(self, image_rgb):
+        return SimpleNamespace(multi_face_landmarks=self.faces)
+
+    def close(self):
+        pass
+
+
+def median_ms(fn, runs: int) -> float:
+    fn()  # warm-up
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--image', help='Group photo (timed with the real Face Mesh graph)')
+    parser.add_argument('--faces', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args()
+    max_faces = max(args.faces)
+
+    print(f"\n{'faces':>5} | {'landmarks':>9} | {'in turn ms':>10} {'faces/s':>8} | "
+          f"{'concurrent ms':>13} {'faces/s':>8} | {'uploads faces/s':>15}")
+    for count in args.faces:
+        detectors = {workers: EyeDetector(max_num_faces=max_faces, face_workers=workers)
+                     for workers in (1, max_faces)}
+        if args.image:
+            frame = cv2.imread(args.image)
+            if frame is None:
+                sys.exit(f"Could not read {args.image}")
+            single = EyeDetector()
+            landmarks_ms = median_ms(lambda: single._find_landmarks(frame), args.runs)
+            upload_ms = median_ms(lambda: single.detect_eye(frame), args.runs)
+            extra_ms = 0.0
+        else:
+            frame, faces = synthetic_group(count)
+            single = EyeDetector()
+            # Real graph cost on this frame, then stubbed landmarks
+            landmarks_ms = median_ms(lambda: single._find_landmarks(frame), args.runs)
+            for detector in list(detectors.values()) + [single]:
+                detector.face_mesh.close()
+                detector.face_mesh = StubMesh(faces)
+            upload_ms = median_ms(lambda: single.detect_eye(frame), args.runs) + landmarks_ms
+            extra_ms = landmarks_ms
+
+        found = detectors[1].detect_faces(frame)['face_count'] if args.image else count
+        in_turn = median_ms(lambda: detectors[1].detect_faces(frame), args.runs) + extra_ms
+        concurrent = median_ms(lambda: detectors[max_faces].detect_faces(frame),
+                               args.runs) + extra_ms
+        print(f"{found:>5} | {landmarks_ms:>9.2f} | {in_turn:>10.2f} {found / in_turn * 1000:>8.0f} | "
+              f"{concurrent:>13.2f} {found / concurrent * 1000:>8.0f} | "
+              f"{1000 / upload_ms:>15.0f}")
+        for detector in detectors.values():
+            detector.close()
+        if args.image:
+            break
+
+    print(f"\n{os.cpu_count()} CPU(s); concurrent runs use face_workers={max_faces}")
+
+
+if __name__ == '__main__':
+    main()
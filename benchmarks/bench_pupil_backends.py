@@ -0,0 +1,119 @@
+"""
+Pupil backend benchmark for EyeDetector
+Runs every registered pupil detection backend on synthetic iris images
+with known pupil geometry and compares latency, fallback rate and error
+
+Usage:
+    python benchmarks/bench_pupil_backends.py [--images 300] [--runs 3]
+
+Scenes mix clean captures with sensor noise, eyelash strokes, specular
+glints, dark (low-contrast) irises and off-center pupils.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.eye_detector import EyeDetector
+
+SCENES = ('clean', 'noise', 'lashes', 'glint', 'dark_iris', 'off_center')
+
+
+def synthetic_eye(rng: np.random.Generator, scene: str):
+    """
+    Skin-toned frame with an iris and pupil of known size
+
+    Returns:
+        (BGR image, iris_data as produced by _extract_iris, (px, py, pr))
+    """
+    height, width = 360, 480
+    image = np.full((height, width, 3), (150, 170, 200), np.uint8)
+    r = int(rng.integers(35, 80))
+    cx = int(rng.integers(r + 40, width - r - 40))
+    cy = int(rng.integers(r + 40, height - r - 40))
+
+    iris_level = 45 if scene == 'dark_iris' else int(rng.integers(90, 150))
+    cv2.circle(image, (cx, cy), r, (iris_level, iris_level + 10, iris_level + 5), -1)
+
+    pr = int(r * rng.uniform(0.2, 0.6))
+    px, py = cx, cy
+    if scene == 'off_center':
+        max_offset = max(1, int((r - pr) * 0.5))
+        px += int(rng.integers(-max_offset, max_offset + 1))
+        py += int(rng.integers(-max_offset, max_offset + 1))
+    pupil_level = 25 if scene == 'dark_iris' else 12
+    cv2.circle(image, (px, py), pr, (pupil_level,) * 3, -1)
+
+    if scene == 'glint':
+        gx = px + int(pr * rng.uniform(-0.6, 0.6))
+        gy = py + int(pr * rng.uniform(-0.6, 0.6))
+        cv2.circle(image, (gx, gy), max(2, pr // 4), (255, 255, 255), -1)
+    if scene == 'lashes':
+        for _ in range(int(rng.integers(15, 40))):
+            x = int(rng.integers(cx - r, cx + r))
+            y = cy - r + int(rng.integers(-10, 15))
+            end = (x + int(rng.integers(-15, 16)), y + int(rng.integers(10, 35)))
+            cv2.line(image, (x, y), end, (20, 20, 25), int(rng.integers(1, 3)))
+    if scene in ('noise', 'lashes', 'dark_iris'):
+        noise = rng.normal(0, 10, image.shape)
+        image = np.clip(image + noise, 0, 255).astype(np.uint8)
+
+    iris_data = {'success': True, 'center': (cx, cy), 'radius': float(r),
+                 'diameter_px': 2.0 * r, 'points': [(cx, cy)] * 5}
+    return image, iris_data, (px, py, pr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--images', type=int, default=300)
+    parser.add_argument('--runs', type=int, default=3)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    detector = EyeDetector(static_image_mode=True)
+    cases = [(scene, *synthetic_eye(rng, scene))
+             for i in range(args.images) for scene in [SCENES[i % len(SCENES)]]]
+
+    print(f"\n{len(cases)} synthetic images, scenes: {', '.join(SCENES)}")
+    print(f"{'backend':<10} {'ms/img':>8} {'p95 ms':>8} {'fallback':>9} "
+          f"{'radius err':>11} {'center err':>11}")
+
+    for backend in detector.PUPIL_BACKENDS:
+        samples = []
+        for _ in range(args.runs):
+            for _, image, iris, _ in cases:
+                start = time.perf_counter()
+                detector._detect_pupil(image, iris, backend)
+                samples.append((time.perf_counter() - start) * 1000)
+
+        fallbacks = {scene: 0 for scene in SCENES}
+        radius_errors, center_errors = [], []
+        for scene, image, iris, (px, py, pr) in cases:
+            pupil = detector._detect_pupil(image, iris, backend)
+            if pupil['method'] == 'fallback':
+                fallbacks[scene] += 1
+                continue
+            radius_errors.append(abs(pupil['radius'] - pr))
+            center_errors.append(np.hypot(pupil['center'][0] - px, pupil['center'][1] - py))
+
+        samples.sort()
+        fallback_rate = sum(fallbacks.values()) / len(cases)
+        print(f"{backend:<10} {statistics.median(samples):8.3f} "
+              f"{samples[int(len(samples) * 0.95)]:8.3f} {fallback_rate:9.1%} "
+              f"{np.mean(radius_errors) if radius_errors else float('nan'):9.2f}px "
+              f"{np.mean(center_errors) if center_errors else float('nan'):9.2f}px")
+        per_scene = len(cases) / len(SCENES)
+        print('           fallback by scene: ' + ', '.join(
+            f"{scene} {count / per_scene:.0%}" for scene, count in fallbacks.items()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,95 @@
+"""
+Quality gate benchmark for EyeDetector.check_quality
+Measures the gate's cost per frame size and what it saves on unusable
+frames (dark, overexposed, flat, blurry) that would otherwise go through
+the landmark pass before failing
+
+Usage:
+    python benchmarks/bench_quality_gate.py [--image face.jpg] [--runs 20]
+
+Without --image a synthetic textured frame is used. Face Mesh finds no
+face in it, so the 'without gate' column is the landmark pass a bad
+frame pays before it fails.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.eye_detector import EyeDetector
+
+INPUT_SIZES = [(640, 480), (1920, 1080), (4032, 3024)]
+
+
+def synthetic_scene(width: int, height: int) -> np.ndarray:
+    """Textured frame: smooth shading, overlapping discs and sensor noise"""
+    rng = np.random.default_rng(0)
+    frame = np.full((height, width, 3), 150, dtype=np.uint8)
+    yy, xx = np.mgrid[0:height, 0:width]
+    frame[..., 1] = (120 + 60 * np.sin(xx / width * 6) * np.cos(yy / height * 4)).astype(np.uint8)
+    for _ in range(40):
+        center = (int(rng.integers(0, width)), int(rng.integers(0, height)))
+        radius = int(rng.integers(height // 60, height // 10))
+        cv2.circle(frame, center, radius, tuple(int(v) for v in rng.integers(20, 230, 3)), -1)
+    return np.clip(frame + rng.normal(0, 6, frame.shape), 0, 255).astype(np.uint8)
+
+
+def variants(frame: np.ndarray):
+    """The frame plus degraded copies a screening camera produces"""
+    width = frame.shape[1]
+    return {
+        'good': frame,
+        'dark': (frame * 0.12).astype(np.uint8),
+        'overexposed': np.clip(frame.astype(np.int16) + 150, 0, 255).astype(np.uint8),
+        'flat': cv2.GaussianBlur(frame, (0, 0), width / 20) // 8 + 110,
+        'blurry': cv2.GaussianBlur(frame, (0, 0), width / 120),
+    }
+
+
+def median_ms(fn, runs: int) -> float:
+    fn()  # warm-up
+    times = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--image', help='Good face image to degrade and resize')
+    parser.add_argument('--runs', type=int, default=20)
+    args = parser.parse_args()
+
+    source = cv2.imread(args.image) if args.image else None
+    if args.image and source is None:
+        sys.exit(f"Could not read {args.image}")
+    ungated = EyeDetector(static_image_mode=True)
+    gated = EyeDetector(static_image_mode=True, quality_gate=True)
+
+    print(f"\n{'size':>10} {'frame':>12} | {'verdict':>12} {'gate ms':>8} | "
+          f"{'without gate':>12} {'with gate':>9} {'saved':>7}")
+    for width, height in INPUT_SIZES:
+        frame = (cv2.resize(source, (width, height), interpolation=cv2.INTER_AREA)
+                 if source is not None else synthetic_scene(width, height))
+        for name, image in variants(frame).items():
+            quality = gated.check_quality(image)
+            gate_ms = median_ms(lambda: gated.check_quality(image), args.runs)
+            without = median_ms(lambda: ungated.detect_eye(image), args.runs)
+            with_gate = median_ms(lambda: gated.detect_eye(image), args.runs)
+            print(f"{width}x{height:<5} {name:>11} | {quality['reason'] or 'passed':>12} "
+                  f"{gate_ms:>8.3f} | {without:>12.2f} {with_gate:>9.2f} "
+                  f"{without - with_gate:>7.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,77 @@
+"""
+Time-series store benchmark
+Measures bulk append throughput into the columnar store and the cost of
+fetching one history page versus re-reading a device's whole history
+(what a listener on the full measurements tree does on every update)
+
+Usage:
+    python benchmarks/bench_readings_store.py [--history 10000 100000 1000000]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                             'backend'))
+
+from timeseries_store import TimeSeriesStore
+
+
+def readings(device_id, count, start=1_700_000_000_000, step=2000):
+    return [{'device_id': device_id, 'timestamp': start + i * step, 'distance': 5.0,
+             'arf': 0.5, 'deformation': 0.05, 'current_iop': 15.0 + (i % 10),
+             'avg_iop': 16.0, 'resistance': 10.0} for i in range(count)]
+
+
+def median_ms(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--history', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--page', type=int, default=50)
+    parser.add_argument('--batch', type=int, default=500)
+    args = parser.parse_args()
+
+    print(f"\n{'history':>9} | {'append/s':>10} | {'page ms':>8} {'1h ms':>7} | "
+          f"{'full read ms':>12} {'full JSON MB':>12}")
+    for size in args.history:
+        with tempfile.TemporaryDirectory() as tmp:
+            store = TimeSeriesStore(tmp)
+            rows = readings('esp', size)
+            start = time.perf_counter()
+            for i in range(0, size, args.batch):
+                store.write(rows[i:i + args.batch])
+            append_rate = size / (time.perf_counter() - start)
+            last = rows[-1]['timestamp']
+            del rows
+
+            page_ms = median_ms(lambda: json.dumps(
+                store.query('esp', limit=args.page, newest_first=True)), 50)
+            hour_ms = median_ms(lambda: json.dumps(
+                store.query('esp', start=last - 3_600_000, end=last, limit=5000)), 20)
+            full = {}
+
+            def read_all():
+                full['body'] = json.dumps(store.query('esp', limit=size))
+
+            full_ms = median_ms(read_all, 3)
+            print(f"{size:>9} | {append_rate:>10.0f} | {page_ms:>8.3f} {hour_ms:>7.2f} | "
+                  f"{full_ms:>12.1f} {len(full['body']) / 2 ** 20:>12.1f}")
+            store.close()
+
+
+if __name__ == '__main__':
+    main()
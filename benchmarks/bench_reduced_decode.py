@@ -0,0 +1,130 @@
+"""
+Reduced-resolution decode benchmark
+Compares decoding uploads at full resolution with decode_reduced (DCT-
+domain 1/2, 1/4 or 1/8 decode for the landmark pass, iris crops decoded
+on demand): decode time, request time and peak traced memory per request,
+and whether the pupil measurements still agree
+
+Usage:
+    python benchmarks/bench_reduced_decode.py [--image face.jpg] [--runs 10]
+
+A request is decode, landmark pass and both iris crops through
+_analyze_eye. Without --image a synthetic JPEG with two eyes (--iris sets
+their size) is used with synthetic landmarks (Face Mesh still runs on
+the frame for its cost); --image uses the real landmarks of a face photo
+resized to each input size.
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+from types import SimpleNamespace
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.eye_detector import EyeDetector, ReducedImage, decode_reduced
+
+INPUT_SIZES = [(1280, 960), (1920, 1440), (3264, 2448), (4032, 3024)]
+WORKING_RESOLUTION = 640
+
+
+def synthetic_jpeg(width: int, height: int, iris_fraction: float):
+    """JPEG of a textured frame with two eyes and their synthetic landmarks"""
+    rng = np.random.default_rng(0)
+    frame = cv2.GaussianBlur(rng.integers(60, 200, (height, width, 3), dtype=np.uint8),
+                             (0, 0), 2)
+    landmarks = [SimpleNamespace(x=0.0, y=0.0) for _ in range(478)]
+    iris = int(width * iris_fraction)
+    for indices, cx in ((EyeDetector.RIGHT_IRIS, int(width * 0.5 - 1.5 * iris)),
+                        (EyeDetector.LEFT_IRIS, int(width * 0.5 + 1.5 * iris))):
+        cy = height // 2
+        cv2.circle(frame, (cx, cy), iris, (110, 100, 90), -1)
+        cv2.circle(frame, (cx, cy), int(iris * 0.38), (15, 15, 15), -1)
+        points = [(cx, cy), (cx + iris, cy), (cx, cy - iris), (cx - iris, cy), (cx, cy + iris)]
+        for index, (x, y) in zip(indices, points):
+            landmarks[index] = SimpleNamespace(x=x / width, y=y / height)
+    ok, encoded = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 92])
+    return encoded.tobytes(), SimpleNamespace(landmark=landmarks)
+
+
+def full_decode(encoded):
+    return cv2.imdecode(np.frombuffer(encoded, np.uint8), cv2.IMREAD_COLOR)
+
+
+def run_request(detector, decode, encoded, landmarks):
+    """Decode, landmark pass and both eyes; returns (decode ms, total ms, pupils)"""
+    start = time.perf_counter()
+    image = decode(encoded)
+    decoded = time.perf_counter()
+    found = detector._find_landmarks(image)
+    landmarks = landmarks or found   # synthetic frames keep their own landmarks
+    pupils = [detector._analyze_eye(image, landmarks, right, None, None).get('pupil')
+              for right in (True, False)]
+    end = time.perf_counter()
+    return (decoded - start) * 1000, (end - start) * 1000, pupils, image
+
+
+def peak_mb(fn) -> float:
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 2 ** 20
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--image', help='Face photo to resize to each input size')
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--iris', type=float, default=0.025,
+                        help='Synthetic iris radius as a fraction of the frame width '
+                             '(0.025 ~ face photo, 0.12 ~ eye close-up)')
+    args = parser.parse_args()
+
+    source = cv2.imread(args.image) if args.image else None
+    if args.image and source is None:
+        sys.exit(f"Could not read {args.image}")
+    detector = EyeDetector(static_image_mode=True, working_resolution=WORKING_RESOLUTION)
+    reduced = lambda encoded: decode_reduced(encoded, WORKING_RESOLUTION)
+
+    print(f"\n{'size':>10} {'KB':>5} | {'decode ms':>15} | {'request ms':>15} | "
+          f"{'peak MB':>13} | {'scales':>8} {'pupil r':>11}")
+    print(f"{'':>16} | {'full':>7} {'reduced':>7} | {'full':>7} {'reduced':>7} | "
+          f"{'full':>6} {'reduced':>6} |")
+    for width, height in INPUT_SIZES:
+        if source is not None:
+            frame = cv2.resize(source, (width, height), interpolation=cv2.INTER_AREA)
+            encoded = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, 92])[1].tobytes()
+            landmarks = None
+        else:
+            encoded, landmarks = synthetic_jpeg(width, height, args.iris)
+
+        rows = {}
+        for name, decode in (('full', full_decode), ('reduced', reduced)):
+            run_request(detector, decode, encoded, landmarks)  # warm-up
+            runs = [run_request(detector, decode, encoded, landmarks) for _ in range(args.runs)]
+            memory = peak_mb(lambda: run_request(detector, decode, encoded, landmarks))
+            rows[name] = (statistics.median(r[0] for r in runs),
+                          statistics.median(r[1] for r in runs), memory, runs[-1][2],
+                          runs[-1][3])
+
+        image = rows['reduced'][4]
+        scales = ('/'.join(str(s) for s in image.decoded_scales)
+                  if isinstance(image, ReducedImage) else '1')
+        radii = '/'.join(str(p['radius']) if p else '-'
+                         for p in rows['full'][3] + rows['reduced'][3])
+        print(f"{width}x{height:<5} {len(encoded) // 1024:>5} | {rows['full'][0]:>7.1f} "
+              f"{rows['reduced'][0]:>7.1f} | {rows['full'][1]:>7.1f} {rows['reduced'][1]:>7.1f} | "
+              f"{rows['full'][2]:>6.1f} {rows['reduced'][2]:>6.1f} | {scales:>8} {radii:>11}")
+    print("\npupil r: right/left radius with the full decode, then with the reduced decode")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,72 @@
+"""
+Rolling aggregates benchmark
+Compares the per-reading cost of the incremental 1h/24h/30d windows and
+the cost of a summary with recomputing the same statistics from raw
+history (numpy over the stored columns) on every request
+
+Usage:
+    python benchmarks/bench_rolling_aggregates.py [--history 10000 100000 1000000]
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+
+import numpy as np
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                             'backend'))
+
+from rolling_aggregates import WINDOWS, RollingAggregates
+
+
+def recompute(timestamps, values, now_ms):
+    """What a client without server-side aggregates does: rescan everything"""
+    result = {}
+    for name, length in WINDOWS.items():
+        mask = timestamps > now_ms - length
+        t, v = (timestamps[mask] - timestamps[0]) / 3.6e6, values[mask]
+        result[name] = (v.mean(), v.min(), v.max(), np.polyfit(t, v, 1)[0] if len(v) > 1 else None)
+    return result
+
+
+def median_ms(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append((time.perf_counter() - start) * 1000)
+    return statistics.median(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--history', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--interval-s', type=float, default=2.0,
+                        help='Seconds between readings of the simulated device')
+    args = parser.parse_args()
+
+    print(f"\n{'history':>9} | {'update us':>9} | {'summary ms':>10} | {'rescan ms':>9}")
+    for size in args.history:
+        now = int(time.time() * 1000)
+        timestamps = now - (np.arange(size)[::-1] * args.interval_s * 1000).astype(np.int64)
+        values = 15 + np.random.default_rng(0).normal(0, 1.5, size)
+        readings = [{'device_id': 'esp', 'timestamp': t, 'current_iop': v}
+                    for t, v in zip(timestamps.tolist(), values.tolist())]
+
+        aggregates = RollingAggregates()
+        start = time.perf_counter()
+        for i in range(0, size, 500):
+            aggregates.update(readings[i:i + 500])
+        update_us = (time.perf_counter() - start) / size * 1e6
+
+        summary_ms = median_ms(lambda: aggregates.summary('esp', now), 200)
+        rescan_ms = median_ms(lambda: recompute(timestamps, values, now), 5)
+        print(f"{size:>9} | {update_us:>9.2f} | {summary_ms:>10.3f} | {rescan_ms:>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,199 @@
+"""
+Sensor ingestion benchmark
+Simulates many IOP devices pushing readings through the IngestBuffer into
+each sink, and compares bulk writes against one blocking PUT per reading
+(the write_test_data_to_firebase.py pattern)
+
+Usage:
+    python benchmarks/bench_sensor_ingest.py [--devices 200] [--readings 50]
+                                             [--batch-size 500]
+
+The firebase sink is measured against a local HTTP server that accepts
+PUT/PATCH like the Realtime Database REST API, with --latency-ms added to
+every request to stand in for the network round trip.
+"""
+
+import argparse
+import http.client
+import http.server
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                             'backend'))
+
+from ingest_buffer import IngestBuffer
+from sensor_sinks import FirebaseSink, JsonlFileSink, SQLiteSink
+
+
+class FakeFirebase(http.server.ThreadingHTTPServer):
+    """Accepts REST writes after a fixed delay and counts requests/connections"""
+
+    daemon_threads = True
+
+    def __init__(self, latency_ms):
+        self.latency = latency_ms / 1000
+        self.requests = 0
+        self.connections = 0
+        self.lock = threading.Lock()
+        super().__init__(('127.0.0.1', 0), FakeFirebaseHandler)
+
+    @property
+    def url(self):
+        return f'http://127.0.0.1:{self.server_address[1]}'
+
+
+class FakeFirebaseHandler(http.server.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def setup(self):
+        super().setup()
+        with self.server.lock:
+            self.server.connections += 1
+
+    def _write(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        json.loads(body)
+        time.sleep(self.server.latency)
+        with self.server.lock:
+            self.server.requests += 1
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'{}')
+
+    do_PUT = _write
+    do_PATCH = _write
+
+    def log_message(self, *args):
+        pass
+
+
+def make_readings(devices, per_device):
+    """Realistic readings in the shape sent by the ESP8266 firmware"""
+    rng = random.Random(0)
+    start = int(time.time() * 1000)
+    readings = []
+    for i in range(per_device):
+        for device in range(devices):
+            deformation = rng.uniform(0.04, 0.06)
+            arf = rng.uniform(0.4, 0.6)
+            iop = 15.0 + deformation * 100
+            readings.append({
+                'device_id': f'esp8266-{device:04d}',
+                'timestamp': start + i * 2000 + device,
+                'distance': rng.uniform(3.0, 7.0),
+                'arf': arf,
+                'deformation': deformation,
+                'current_iop': iop,
+                'avg_iop': iop + rng.uniform(-1.0, 1.0),
+                'resistance': arf / deformation,
+            })
+    return readings
+
+
+def run_buffered(sink, readings, devices, batch_size, per_request):
+    """Device threads add per_request readings at a time; wait until all are flushed"""
+    buffer = IngestBuffer(sink, batch_size=batch_size, flush_interval=0.2,
+                          max_buffer=len(readings) + 1)
+    chunks = [readings[i:i + per_request] for i in range(0, len(readings), per_request)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=min(32, devices)) as executor:
+        list(executor.map(buffer.add, chunks))
+    accepted = time.perf_counter() - start
+    while buffer.stats()['flushed'] < len(readings):
+        time.sleep(0.005)
+    elapsed = time.perf_counter() - start
+    stats = buffer.stats()
+    buffer.close()
+    return {
+        'readings': len(readings),
+        'accept_per_s': round(len(readings) / accepted),
+        'stored_per_s': round(len(readings) / elapsed),
+        'flushes': stats['flushes'],
+        'avg_flush_ms': stats['avg_flush_ms'],
+    }
+
+
+def run_per_reading_put(url, readings, concurrency):
+    """Baseline: one PUT of sensor_data per reading on a fresh connection"""
+    host = url.split('://', 1)[1]
+
+    def put(reading):
+        connection = http.client.HTTPConnection(host, timeout=30)
+        try:
+            connection.request('PUT', '/sensor_data.json', body=json.dumps(reading),
+                               headers={'Content-Type': 'application/json'})
+            connection.getresponse().read()
+        finally:
+            connection.close()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(put, readings))
+    elapsed = time.perf_counter() - start
+    return {'readings': len(readings), 'stored_per_s': round(len(readings) / elapsed)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--devices', type=int, default=200)
+    parser.add_argument('--readings', type=int, default=50, help='Readings per device')
+    parser.add_argument('--per-request', type=int, default=10,
+                        help='Readings each device sends per request')
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--latency-ms', type=float, default=20.0,
+                        help='Simulated round trip of the fake Firebase server')
+    parser.add_argument('--json', help='Also write results to this JSON file')
+    args = parser.parse_args()
+
+    readings = make_readings(args.devices, args.readings)
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        results['sqlite'] = run_buffered(SQLiteSink(os.path.join(tmp, 'r.db')), readings,
+                                         args.devices, args.batch_size, args.per_request)
+        results['file'] = run_buffered(JsonlFileSink(os.path.join(tmp, 'r.jsonl')), readings,
+                                       args.devices, args.batch_size, args.per_request)
+
+    server = FakeFirebase(args.latency_ms)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        sink = FirebaseSink(server.url)
+        results['firebase'] = run_buffered(sink, readings, args.devices, args.batch_size,
+                                           args.per_request)
+        results['firebase'].update(requests=server.requests, connections=server.connections)
+
+        # The baseline is slow by design; time a slice and report the rate
+        baseline = readings[:min(len(readings), 1000)]
+        server.requests = server.connections = 0
+        results['per_reading_put'] = run_per_reading_put(server.url, baseline, 8)
+        results['per_reading_put'].update(requests=server.requests,
+                                          connections=server.connections)
+    finally:
+        server.shutdown()
+
+    print(f"\n{args.devices} devices x {args.readings} readings, "
+          f"{args.per_request} per request, batch {args.batch_size}, "
+          f"firebase latency {args.latency_ms:.0f} ms")
+    print(f"{'sink':>16} {'readings':>9} {'accept/s':>10} {'stored/s':>10} "
+          f"{'requests':>9} {'conns':>6}")
+    for name, row in results.items():
+        print(f"{name:>16} {row['readings']:9d} {row.get('accept_per_s', '-'):>10} "
+              f"{row['stored_per_s']:>10} {row.get('requests', row.get('flushes', '-')):>9} "
+              f"{row.get('connections', '-'):>6}")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,165 @@
+"""
+Load test: Flask (server.py) vs ASGI (server_asgi.py) backend
+Starts each server in turn, fires concurrent /analyze_eye uploads at it
+and probes /health during the load to show how responsive it stays
+
+Usage:
+    python benchmarks/bench_server_load.py [--image eye.jpg] [--requests 200]
+                                           [--concurrency 1 4 16]
+
+Without --image a synthetic (face-less) frame is uploaded: Face Mesh
+still runs in full and answers 'No face detected', which is counted as
+a completed analysis. The result cache is disabled for both servers.
+"""
+
+import argparse
+import http.client
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                           'backend')
+
+SERVERS = {
+    'flask': 'server.py',
+    'asgi': 'server_asgi.py',
+}
+
+
+def synthetic_jpeg():
+    """1280x960 skin-toned frame with an iris and pupil, JPEG-encoded"""
+    image = np.full((960, 1280, 3), (150, 170, 200), np.uint8)
+    cv2.circle(image, (640, 480), 60, (110, 120, 115), -1)
+    cv2.circle(image, (640, 480), 22, (12, 12, 12), -1)
+    return cv2.imencode('.jpg', image, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes()
+
+
+def request(port, method, path, body=None, timeout=60):
+    """One HTTP request on a fresh connection; returns (status, seconds)"""
+    start = time.perf_counter()
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=timeout)
+    try:
+        headers = {'Content-Type': 'image/jpeg'} if body is not None else {}
+        connection.request(method, path, body=body, headers=headers)
+        response = connection.getresponse()
+        response.read()
+        return response.status, time.perf_counter() - start
+    except OSError:
+        return None, time.perf_counter() - start
+    finally:
+        connection.close()
+
+
+def start_server(name, port, workers):
+    """Launch a server and wait until /ready answers 200"""
+    env = dict(os.environ, SONOSIGHT_PORT=str(port), SONOSIGHT_CACHE_SIZE='0',
+               SONOSIGHT_WORKERS=str(workers))
+    process = subprocess.Popen([sys.executable, SERVERS[name]], cwd=BACKEND_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    deadline = time.time() + 120
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'{name} server exited with code {process.returncode}')
+        status, _ = request(port, 'GET', '/ready', timeout=2)
+        if status == 200:
+            return process
+        time.sleep(0.5)
+    process.terminate()
+    raise RuntimeError(f'{name} server did not become ready')
+
+
+def run_load(port, body, total, concurrency):
+    """Fire total uploads with the given concurrency while probing /health"""
+    health_latencies = []
+    stop = threading.Event()
+
+    def probe():
+        while not stop.is_set():
+            status, seconds = request(port, 'GET', '/health', timeout=30)
+            if status == 200:
+                health_latencies.append(seconds)
+            stop.wait(0.05)
+
+    prober = threading.Thread(target=probe, daemon=True)
+    prober.start()
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        results = list(executor.map(
+            lambda _: request(port, 'POST', '/analyze_eye', body), range(total)))
+    elapsed = time.perf_counter() - start
+    stop.set()
+    prober.join()
+
+    latencies = sorted(seconds for status, seconds in results if status is not None)
+    completed = sum(1 for status, _ in results if status in (200, 500))
+
+    def pct(values, q):
+        return values[min(len(values) - 1, int(len(values) * q))] * 1000 if values else None
+
+    health_latencies.sort()
+    return {
+        'requests': total,
+        'concurrency': concurrency,
+        'completed': completed,
+        'failed': total - completed,
+        'throughput_rps': round(completed / elapsed, 2),
+        'p50_ms': pct(latencies, 0.50),
+        'p95_ms': pct(latencies, 0.95),
+        'p99_ms': pct(latencies, 0.99),
+        'health_p50_ms': pct(health_latencies, 0.50),
+        'health_max_ms': health_latencies[-1] * 1000 if health_latencies else None,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--image', help='Eye photo to upload (default: synthetic frame)')
+    parser.add_argument('--requests', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[1, 4, 16])
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2,
+                        help='SONOSIGHT_WORKERS for both servers')
+    parser.add_argument('--servers', nargs='+', choices=list(SERVERS), default=list(SERVERS))
+    parser.add_argument('--port', type=int, default=5070)
+    parser.add_argument('--json', help='Also write results to this JSON file')
+    args = parser.parse_args()
+
+    if args.image:
+        with open(args.image, 'rb') as f:
+            body = f.read()
+    else:
+        body = synthetic_jpeg()
+
+    rows = []
+    for name in args.servers:
+        process = start_server(name, args.port, args.workers)
+        try:
+            request(args.port, 'POST', '/analyze_eye', body)  # first-request warm-up
+            for concurrency in args.concurrency:
+                row = {'server': name, **run_load(args.port, body, args.requests,
+                                                  concurrency)}
+                rows.append(row)
+                print(f"{name:>5} c={concurrency:<3} {row['throughput_rps']:7.2f} req/s  "
+                      f"p50 {row['p50_ms']:7.1f} ms  p95 {row['p95_ms']:7.1f} ms  "
+                      f"p99 {row['p99_ms']:7.1f} ms  failed {row['failed']:<3} "
+                      f"/health p50 {row['health_p50_ms'] or 0:6.1f} ms "
+                      f"max {row['health_max_ms'] or 0:6.1f} ms")
+        finally:
+            process.terminate()
+            process.wait(timeout=60)
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(rows, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""
+Working-resolution benchmark for EyeDetector.detect_eye
+Compares the full-resolution landmark pass against the downscaled
+two-stage pipeline (landmarks on a small copy, pupil on a full-res crop)
+
+Usage:
+    python benchmarks/bench_working_resolution.py [--image face.jpg] [--runs 10]
+
+Without --image a synthetic frame is used, which only exercises the
+landmark stage (no face is found).
+"""
+
+import argparse
+import os
+import statistics
+import sys
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.eye_detector import EyeDetector
+
+INPUT_SIZES = [(640, 480), (1280, 720), (1920, 1080), (4032, 3024)]
+
+
+def make_frame(source, width: int, height: int) -> np.ndarray:
+    """Resize the source image, or build a synthetic frame of the given size"""
+    if source is not None:
+        return cv2.resize(source, (width, height), interpolation=cv2.INTER_AREA)
+    rng = np.random.default_rng(0)
+    return rng.integers(0, 256, (height, width, 3), dtype=np.uint8)
+
+
+def measure(detector: EyeDetector, frame: np.ndarray, runs: int):
+    """Median latency (ms) and peak traced allocation (MB) of detect_eye"""
+    detector.detect_eye(frame)  # warm-up
+
+    latencies = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = detector.detect_eye(frame)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    tracemalloc.start()
+    detector.detect_eye(frame)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    return statistics.median(latencies), peak / 1e6, result.get('success', False)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--image', help='Face image to resize to each input size')
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--working-resolution', type=int, default=640)
+    args = parser.parse_args()
+
+    source = None
+    if args.image:
+        source = cv2.imread(args.image)
+        if source is None:
+            sys.exit(f"Error: Could not load image from {args.image}")
+
+    full = EyeDetector(static_image_mode=True, working_resolution=None)
+    reduced = EyeDetector(static_image_mode=True,
+                          working_resolution=args.working_resolution)
+
+    print(f"\n{'input':>11} | {'full ms':>8} {'full MB':>8} | "
+          f"{'ws ms':>8} {'ws MB':>8} | {'speedup':>7} {'mem':>6} | face")
+    print("-" * 78)
+    for width, height in INPUT_SIZES:
+        frame = make_frame(source, width, height)
+        full_ms, full_mb, full_ok = measure(full, frame, args.runs)
+        ws_ms, ws_mb, ws_ok = measure(reduced, frame, args.runs)
+        print(f"{width:>5}x{height:<5} | {full_ms:8.1f} {full_mb:8.1f} | "
+              f"{ws_ms:8.1f} {ws_mb:8.1f} | {full_ms / ws_ms:6.2f}x "
+              f"{full_mb / max(ws_mb, 1e-6):5.1f}x | {full_ok}/{ws_ok}")
+
+
+if __name__ == '__main__':
+    main()
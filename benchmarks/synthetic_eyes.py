@@ -0,0 +1,148 @@
+"""
+Synthetic eye images for EyeDetector benchmarks
+Deterministic face frames with two eyes of known geometry: iris and pupil
+radius, pupil eccentricity, sensor noise and resolution are controlled,
+and the same arguments (and seed) always produce the same pixels
+
+Face Mesh does not find a face in these frames, so each frame comes with
+Face Mesh style landmarks (478 normalized points, iris points in the
+RIGHT_IRIS/LEFT_IRIS slots) and StubMesh can stand in for the graph.
+
+Usage:
+    from synthetic_eyes import StubMesh, synthetic_face
+    image, landmarks, truth = synthetic_face(1920, 1080, eccentricity=0.5)
+"""
+
+import math
+import os
+import sys
+from types import SimpleNamespace
+from typing import Dict, Optional, Tuple
+
+import cv2
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from lib.eye_detector import EyeDetector
+
+MESH_POINTS = 478
+SKIN = (150, 170, 205)
+SCLERA = (225, 230, 235)
+IRIS = (165, 160, 150)
+PUPIL = (14, 14, 16)
+
+
+def default_iris_radius(width: int) -> int:
+    """Iris radius of a face filling about half of a frame this wide"""
+    return max(12, round(width * 0.028))
+
+
+def _draw_eye(image: np.ndarray, rng: np.random.Generator, center: Tuple[int, int],
+              iris_radius: int, pupil_axes: Tuple[float, float], angle: float):
+    """Sclera, textured iris and elliptical pupil at center"""
+    cx, cy = center
+    cv2.ellipse(image, center, (int(iris_radius * 2.1), int(iris_radius * 1.15)),
+                0, 0, 360, SCLERA, -1, cv2.LINE_AA)
+    cv2.circle(image, center, iris_radius, IRIS, -1, cv2.LINE_AA)
+    # Radial fibres so the iris is not a flat disc
+    for _ in range(48):
+        theta = rng.uniform(0, 2 * math.pi)
+        inner = iris_radius * rng.uniform(0.45, 0.6)
+        outer = iris_radius * rng.uniform(0.8, 0.97)
+        level = int(rng.integers(-25, 26))
+        color = tuple(int(np.clip(c + level, 0, 255)) for c in IRIS)
+        cv2.line(image,
+                 (int(cx + inner * math.cos(theta)), int(cy + inner * math.sin(theta))),
+                 (int(cx + outer * math.cos(theta)), int(cy + outer * math.sin(theta))),
+                 color, max(1, iris_radius // 25), cv2.LINE_AA)
+    limbus = tuple(c - 35 for c in IRIS)
+    cv2.circle(image, center, iris_radius, limbus, max(1, iris_radius // 20), cv2.LINE_AA)
+    axes = (max(1, round(pupil_axes[0])), max(1, round(pupil_axes[1])))
+    cv2.ellipse(image, center, axes, angle, 0, 360, PUPIL, -1, cv2.LINE_AA)
+
+
+def synthetic_face(width: int = 1280, height: int = 720, iris_radius: Optional[int] = None,
+                   pupil_ratio: float = 0.38, eccentricity: float = 0.0,
+                   angle: float = 0.0, noise: float = 4.0, seed: int = 0):
+    """
+    Face frame with two eyes of known geometry
+
+    Args:
+        width: Frame width in pixels
+        height: Frame height in pixels
+        iris_radius: Iris radius in pixels (None = default_iris_radius)
+        pupil_ratio: Pupil radius / iris radius (the left pupil is 10%
+            larger, so the eyes are not identical)
+        eccentricity: Pupil ellipse eccentricity (0 = circle)
+        angle: Pupil ellipse rotation in degrees
+        noise: Standard deviation of the Gaussian sensor noise
+        seed: Seed of the noise and iris texture
+
+    Returns:
+        (BGR image, landmarks with a .landmark list like Face Mesh output,
+        truth {'right': {...}, 'left': {...}} with iris_center,
+        iris_radius, pupil_center, pupil_axes and pupil_radius (radius of
+        the circle with the pupil ellipse's area))
+    """
+    rng = np.random.default_rng(seed)
+    iris_radius = iris_radius or default_iris_radius(width)
+    image = np.empty((height, width, 3), np.uint8)
+    image[:] = (70, 75, 80)
+
+    face_center = (width // 2, height // 2)
+    face_axes = (int(iris_radius * 7), int(min(height * 0.48, iris_radius * 9)))
+    cv2.ellipse(image, face_center, face_axes, 0, 0, 360, SKIN, -1, cv2.LINE_AA)
+
+    truth = {}
+    # The subject's right eye is on the left of the frame
+    for name, dx, ratio in (('right', -1, pupil_ratio), ('left', 1, pupil_ratio * 1.1)):
+        center = (face_center[0] + dx * int(iris_radius * 3), face_center[1] - iris_radius)
+        major = iris_radius * ratio / (1 - eccentricity ** 2) ** 0.25
+        minor = major * math.sqrt(1 - eccentricity ** 2)
+        _draw_eye(image, rng, center, iris_radius, (major, minor), angle)
+        truth[name] = {
+            'iris_center': center,
+            'iris_radius': float(iris_radius),
+            'pupil_center': center,
+            'pupil_axes': (major, minor),
+            'pupil_radius': math.sqrt(major * minor),
+            'eccentricity': eccentricity
+        }
+
+    if noise:
+        image = np.clip(image + rng.normal(0, noise, image.shape), 0, 255).astype(np.uint8)
+    return image, face_landmarks(width, height, face_center, face_axes, truth), truth
+
+
+def face_landmarks(width: int, height: int, face_center: Tuple[int, int],
+                   face_axes: Tuple[int, int], truth: Dict) -> SimpleNamespace:
+    """
+    Face Mesh style landmarks: points spread over the face outline, iris
+    points (center, right, top, left, bottom) in the iris slots
+    """
+    points = []
+    for k in range(MESH_POINTS):
+        theta = 2 * math.pi * k / MESH_POINTS
+        points.append(SimpleNamespace(
+            x=(face_center[0] + face_axes[0] * math.cos(theta)) / width,
+            y=(face_center[1] + face_axes[1] * math.sin(theta)) / height, z=0.0))
+    for name, indices in (('right', EyeDetector.RIGHT_IRIS), ('left', EyeDetector.LEFT_IRIS)):
+        (cx, cy), r = truth[name]['iris_center'], truth[name]['iris_radius']
+        iris = [(cx, cy), (cx + r, cy), (cx, cy - r), (cx - r, cy), (cx, cy + r)]
+        for index, (x, y) in zip(indices, iris):
+            points[index] = SimpleNamespace(x=x / width, y=y / height, z=0.0)
+    return SimpleNamespace(landmark=points)
+
+
+class StubMesh:
+    """Face Mesh stand-in returning fixed landmarks"""
+
+    def __init__(self, landmarks):
+        self.faces = [landmarks]
+
+    def process(self, image_rgb):
+        return SimpleNamespace(multi_face_landmarks=self.faces)
+
+    def close(self):
+        pass
@@ -4,11 +4,201 @@ MediaPipe-based iris and pupil detection with ACD prediction
 FINAL FIXED VERSION - All logic errors corrected, webcam flipped, confidence improved
 """
 
-import cv2
-import numpy as np
-import mediapipe as mp
-from typing import Dict, Optional, Tuple, List
+from __future__ import annotations
+
+import importlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, Iterator, Optional, Tuple, List
 import sys
+import threading
+import time
+
+
+class _LazyModule:
+    """
+    Module placeholder that imports on first attribute access
+    
+    cv2, numpy and mediapipe take seconds to import together; deferring
+    them lets servers bind and answer /health before the model loads.
+    On first use the real module replaces the placeholder in globals().
+    """
+    
+    def __init__(self, global_name: str, module_name: str):
+        self._global_name = global_name
+        self._module_name = module_name
+    
+    def __getattr__(self, attr):
+        module = importlib.import_module(self._module_name)
+        globals()[self._global_name] = module
+        return getattr(module, attr)
+
+
+cv2 = _LazyModule('cv2', 'cv2')
+np = _LazyModule('np', 'numpy')
+mp = _LazyModule('mp', 'mediapipe')
+
+
+class StageTimer:
+    """Accumulates wall-clock time per pipeline stage between lap() calls"""
+    
+    __slots__ = ('stages', '_last')
+    
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+        self._last = time.perf_counter()
+    
+    def lap(self, stage: str):
+        """Charge the time since the previous lap to stage"""
+        now = time.perf_counter()
+        self.stages[stage] = self.stages.get(stage, 0.0) + (now - self._last)
+        self._last = now
+    
+    def timings_ms(self) -> Dict[str, float]:
+        """Per-stage durations in milliseconds, plus their total"""
+        timings = {stage: round(seconds * 1000, 3) for stage, seconds in self.stages.items()}
+        timings['total'] = round(sum(self.stages.values()) * 1000, 3)
+        return timings
+
+
+# JPEG start-of-frame markers (they carry the image dimensions)
+_JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+
+def jpeg_size(data) -> Optional[Tuple[int, int]]:
+    """
+    (width, height) from a JPEG header without decoding, or None if data
+    is not a JPEG (or the header is truncated)
+    """
+    data = memoryview(data)
+    if len(data) < 4 or data[0] != 0xFF or data[1] != 0xD8:
+        return None
+    i = 2
+    while i + 9 <= len(data):
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:      # fill byte
+            i += 1
+            continue
+        if marker in _JPEG_SOF_MARKERS:
+            height = (data[i + 5] << 8) | data[i + 6]
+            width = (data[i + 7] << 8) | data[i + 8]
+            return (width, height) if width and height else None
+        if marker == 0xD9 or marker == 0xDA:   # end of image / start of scan
+            return None
+        i += 2 + ((data[i + 2] << 8) | data[i + 3])
+    return None
+
+
+class ReducedImage:
+    """
+    A JPEG decoded at 1/scale resolution standing in for the full frame
+    
+    Reports the full-resolution shape and size, so iris coordinates stay
+    in original pixels. The landmark pass and quality gate use `preview`;
+    slicing (as _detect_pupil does for the iris crop) returns a crop in
+    full-resolution coordinates, decoded on demand at the smallest scale
+    that still has min_crop_px pixels across it. libjpeg cannot decode
+    a sub-rectangle through OpenCV, so a finer scale is decoded whole,
+    once, and shared by later crops.
+    """
+    
+    def __init__(self, encoded, preview: np.ndarray, scale: int,
+                 full_size: Tuple[int, int], min_crop_px: int = 96):
+        """
+        Args:
+            encoded: The JPEG bytes
+            preview: encoded decoded at 1/scale
+            scale: 2, 4 or 8
+            full_size: (width, height) of the full-resolution frame
+            min_crop_px: Shortest crop side, in decoded pixels, accepted
+                before a finer scale is decoded for it
+        """
+        width, height = full_size
+        self.encoded = encoded
+        self.preview = preview
+        self.scale = scale
+        self.shape = (height, width) + preview.shape[2:]
+        self.ndim = preview.ndim
+        self.size = height * width * (preview.shape[2] if preview.ndim == 3 else 1)
+        self.min_crop_px = min_crop_px
+        self._decoded = {scale: preview}
+        self._lock = threading.Lock()
+    
+    @property
+    def decoded_scales(self) -> List[int]:
+        """Scales decoded so far, coarsest first"""
+        return sorted(self._decoded, reverse=True)
+    
+    def _decode(self, scale: int) -> np.ndarray:
+        with self._lock:
+            image = self._decoded.get(scale)
+            if image is None:
+                flag = {1: cv2.IMREAD_COLOR, 2: cv2.IMREAD_REDUCED_COLOR_2,
+                        4: cv2.IMREAD_REDUCED_COLOR_4}[scale]
+                image = cv2.imdecode(np.frombuffer(self.encoded, np.uint8), flag)
+                self._decoded[scale] = image
+            return image
+    
+    def __getitem__(self, key) -> np.ndarray:
+        rows, cols = key[0], key[1]
+        y1, y2, _ = rows.indices(self.shape[0])
+        x1, x2, _ = cols.indices(self.shape[1])
+        if y2 <= y1 or x2 <= x1:
+            return self.preview[0:0, 0:0]
+        
+        scale = self.scale
+        while scale > 1 and min(x2 - x1, y2 - y1) < self.min_crop_px * scale:
+            scale //= 2
+        source = self._decode(scale)
+        if scale == 1:
+            return source[y1:y2, x1:x2]
+        
+        # Covering block at this scale, upsampled, then trimmed to the request
+        sy1, sx1 = y1 // scale, x1 // scale
+        sy2, sx2 = -(-y2 // scale), -(-x2 // scale)
+        block = source[sy1:sy2, sx1:sx2]
+        block = cv2.resize(block, (block.shape[1] * scale, block.shape[0] * scale),
+                           interpolation=cv2.INTER_LINEAR)
+        return block[y1 - sy1 * scale:y2 - sy1 * scale, x1 - sx1 * scale:x2 - sx1 * scale]
+
+
+def decode_reduced(encoded, target_size: Optional[int], min_crop_px: int = 96):
+    """
+    Decode a JPEG at the coarsest 1/2, 1/4 or 1/8 scale whose longest side
+    is still at least target_size (libjpeg scales in the DCT domain, so
+    this is much cheaper than decoding and resizing)
+    
+    Args:
+        encoded: Encoded image bytes (non-JPEG images decode at full size)
+        target_size: Landmark working resolution (None = full decode)
+        min_crop_px: See ReducedImage
+        
+    Returns:
+        ReducedImage, a full-resolution BGR array, or None if decoding failed
+    """
+    if encoded is None or len(encoded) == 0:
+        return None
+    buffer = np.frombuffer(encoded, np.uint8)
+    size = jpeg_size(encoded) if target_size else None
+    scale = 1
+    if size is not None:
+        while scale < 8 and max(size) // (scale * 2) >= target_size:
+            scale *= 2
+    if scale == 1:
+        return cv2.imdecode(buffer, cv2.IMREAD_COLOR)
+    
+    flag = {2: cv2.IMREAD_REDUCED_COLOR_2, 4: cv2.IMREAD_REDUCED_COLOR_4,
+            8: cv2.IMREAD_REDUCED_COLOR_8}[scale]
+    preview = cv2.imdecode(buffer, flag)
+    if preview is None:
+        return None
+    width, height = size
+    if abs(preview.shape[1] - width / scale) > 1:
+        # EXIF orientation was applied: the frame is rotated by 90 degrees
+        width, height = height, width
+    return ReducedImage(encoded, preview, scale, (width, height), min_crop_px)
 
 
 class EyeDetector:
@@ -17,7 +207,8 @@ class EyeDetector:
     
     Features:
     - Iris detection via MediaPipe landmarks
-    - Pupil detection via thresholding with improved fallback
+    - Pupil detection via pluggable backends (thresholding or ellipse fit)
+      with improved fallback
     - Feature extraction with realistic thresholds
     - ACD prediction with corrected scoring logic
     - Visualization with color-coded risk levels
@@ -28,32 +219,134 @@ class EyeDetector:
     RIGHT_IRIS = [468, 469, 470, 471, 472]
     LEFT_IRIS = [473, 474, 475, 476, 477]
     
+    # Pupil detection backends: name -> (method, reported detection_method).
+    # Each method takes (gray_crop, cx, cy, r) with the iris center in crop
+    # coordinates and returns ((x, y), radius) in crop coordinates, or None
+    # to use the fallback estimate. Subclasses may register more entries.
+    PUPIL_BACKENDS = {
+        'threshold': ('_pupil_threshold', 'contour'),
+        'ellipse': ('_pupil_ellipse', 'ellipse'),
+    }
+    
+    # Contour count from which the threshold backend measures all contours
+    # in one NumPy pass instead of one at a time (the crossover measured by
+    # benchmarks/bench_contour_scoring.py)
+    PUPIL_CONTOUR_BATCH_MIN = 250
+    
+    # Quality gate: longest side of the grey thumbnail the measures use
+    QUALITY_THUMBNAIL = 160
+    
+    # Quality gate limits, checked in this order (the first miss is the
+    # rejection reason). Sharpness is the Laplacian standard deviation
+    # relative to the grey-level standard deviation, so it does not
+    # depend on exposure; heavily defocused frames score below ~0.15.
+    QUALITY_LIMITS = {
+        'min_brightness': 35.0,    # mean grey level -> 'too_dark'
+        'max_brightness': 225.0,   # mean grey level -> 'too_bright'
+        'max_clipped': 0.30,       # fraction of pixels >= 250 -> 'overexposed'
+        'min_contrast': 10.0,      # grey-level standard deviation -> 'low_contrast'
+        'min_sharpness': 0.20,     # -> 'blurry'
+    }
+    
     def __init__(self, 
                  min_detection_confidence: float = 0.5,
-                 min_tracking_confidence: float = 0.5):
+                 min_tracking_confidence: float = 0.5,
+                 static_image_mode: bool = False,
+                 working_resolution: Optional[int] = 640,
+                 record_timings: bool = False,
+                 timing_hook: Optional[Callable[[Dict[str, float]], None]] = None,
+                 pupil_backend: str = 'threshold',
+                 max_num_faces: int = 1,
+                 face_workers: Optional[int] = None,
+                 quality_gate: bool = False,
+                 quality_limits: Optional[Dict[str, float]] = None):
         """
         Initialize MediaPipe Face Mesh
         
         Args:
             min_detection_confidence: Minimum confidence for face detection (0-1)
             min_tracking_confidence: Minimum confidence for landmark tracking (0-1)
+            static_image_mode: Run face detection on every frame (True) or
+                track landmarks between consecutive frames (False)
+            working_resolution: Longest image side used for the landmark pass;
+                larger frames are downscaled first (None = full resolution)
+            record_timings: Add per-stage durations to every result as
+                'timings_ms' (implied by timing_hook)
+            timing_hook: Optional callable receiving each call's timings_ms
+            pupil_backend: Default pupil detection backend (see PUPIL_BACKENDS)
+            max_num_faces: Faces located by the landmark pass; detect_faces
+                analyzes all of them, detect_eye the first
+            face_workers: Threads analyzing the faces of one detect_faces
+                call (None = one per face, up to max_num_faces and the CPU
+                count; 1 = in turn)
+            quality_gate: Reject unusable frames (dark, overexposed, flat,
+                blurry) before the landmark pass (see check_quality)
+            quality_limits: Overrides for QUALITY_LIMITS entries
         """
+        if pupil_backend not in self.PUPIL_BACKENDS:
+            raise ValueError(f"Unknown pupil backend '{pupil_backend}' "
+                             f"(choose from {', '.join(self.PUPIL_BACKENDS)})")
+        self.pupil_backend = pupil_backend
+        self.working_resolution = working_resolution
+        self.record_timings = record_timings or timing_hook is not None
+        self.timing_hook = timing_hook
+        self.max_num_faces = max(1, max_num_faces)
+        if face_workers is None:
+            face_workers = min(self.max_num_faces, os.cpu_count() or 1)
+        self.face_workers = max(1, face_workers)
+        self._face_executor = None   # created by the first multi-face call
+        self.quality_gate = quality_gate
+        self.quality_limits = dict(self.QUALITY_LIMITS, **(quality_limits or {}))
         self.mp_face_mesh = mp.solutions.face_mesh
         self.face_mesh = self.mp_face_mesh.FaceMesh(
-            max_num_faces=1,
+            static_image_mode=static_image_mode,
+            max_num_faces=self.max_num_faces,
             refine_landmarks=True,
             min_detection_confidence=min_detection_confidence,
             min_tracking_confidence=min_tracking_confidence
         )
         print("✓ MediaPipe Face Mesh initialized successfully")
     
-    def detect_eye(self, image: np.ndarray, prefer_right_eye: bool = True) -> Dict:
+    def warm_up(self) -> float:
+        """
+        Run synthetic data through every stage so the first real request
+        does not pay for graph initialization and lazy allocations
+        
+        Returns:
+            Warm-up duration in milliseconds
+        """
+        start = time.perf_counter()
+        
+        # Face Mesh: a blank frame still initializes the detection graph
+        frame = np.full((480, 640, 3), 128, dtype=np.uint8)
+        self._run_pipeline(frame, True, None)  # bypasses timing hooks
+        
+        # Pupil, feature and ACD stages on a synthetic iris
+        cv2.circle(frame, (320, 240), 40, (150, 150, 150), -1)
+        cv2.circle(frame, (320, 240), 14, (10, 10, 10), -1)
+        iris = {'success': True, 'center': (320, 240), 'radius': 40.0,
+                'diameter_px': 80.0, 'points': [(320, 240)] * 5}
+        for backend in self.PUPIL_BACKENDS:
+            pupil = self._detect_pupil(frame, iris, backend)
+        self._predict_acd(self._extract_features(iris, pupil), pupil['method'])
+        
+        return (time.perf_counter() - start) * 1000
+    
+    def detect_eye(self, image: np.ndarray, prefer_right_eye: bool = True,
+                   pupil_backend: Optional[str] = None, eyes: Optional[str] = None,
+                   faces: Optional[str] = None) -> Dict:
         """
         Main detection function - analyzes eye and returns all results
         
         Args:
             image: BGR image from OpenCV (numpy array)
             prefer_right_eye: Which eye to analyze (True=right, False=left)
+            pupil_backend: Pupil detection backend for this call
+                (None = the detector's default)
+            eyes: 'both' to analyze both eyes (see detect_both_eyes);
+                None analyzes the preferred eye only
+            faces: 'all' to analyze every face found (see detect_faces);
+                None analyzes the first face only
             
         Returns:
             Complete results dictionary with:
@@ -62,64 +355,373 @@ class EyeDetector:
             - pupil: dict with center, radius, diameter
             - features: dict with extracted features
             - prediction: dict with ACD, risk level, recommendation
+            - timings_ms: per-stage durations (only if record_timings)
             - error: str (only if success=False)
         """
+        if pupil_backend is not None and pupil_backend not in self.PUPIL_BACKENDS:
+            return {'success': False, 'error': f"Unknown pupil backend '{pupil_backend}'"}
+        if eyes not in (None, 'both'):
+            return {'success': False, 'error': f"Unknown eyes option '{eyes}'"}
+        if faces == 'all':
+            return self.detect_faces(image, prefer_right_eye, pupil_backend, eyes)
+        if faces is not None:
+            return {'success': False, 'error': f"Unknown faces option '{faces}'"}
+        if eyes == 'both':
+            return self.detect_both_eyes(image, pupil_backend)
+        
+        return self._timed(self._run_pipeline, image, prefer_right_eye, pupil_backend)
+    
+    def detect_both_eyes(self, image: np.ndarray, pupil_backend: Optional[str] = None) -> Dict:
+        """
+        Analyze both eyes from a single Face Mesh pass
+        
+        The landmark pass (the expensive stage) runs once; iris, pupil,
+        feature and ACD stages then run for each eye.
+        
+        Args:
+            image: BGR image from OpenCV (numpy array)
+            pupil_backend: Pupil detection backend for this call
+                (None = the detector's default)
+            
+        Returns:
+            Dictionary with:
+            - success: bool (True if at least one eye was analyzed)
+            - eyes: 'both'
+            - right / left: per-eye results as returned by detect_eye
+            - asymmetry: right-vs-left features (None unless both succeeded)
+            - timings_ms: per-stage durations (only if record_timings)
+            - error: str (only if success=False)
+        """
+        if pupil_backend is not None and pupil_backend not in self.PUPIL_BACKENDS:
+            return {'success': False, 'error': f"Unknown pupil backend '{pupil_backend}'"}
+        return self._timed(self._run_both_pipeline, image, pupil_backend)
+    
+    def detect_faces(self, image: np.ndarray, prefer_right_eye: bool = True,
+                     pupil_backend: Optional[str] = None, eyes: Optional[str] = None) -> Dict:
+        """
+        Analyze every face in a group image from a single Face Mesh pass
+        
+        Up to max_num_faces faces are located; their iris/pupil/ACD stages
+        run concurrently on face_workers threads (OpenCV releases the GIL).
+        
+        Args:
+            image: BGR image from OpenCV (numpy array)
+            prefer_right_eye: Which eye to analyze per face (True=right, False=left)
+            pupil_backend: Pupil detection backend for this call
+                (None = the detector's default)
+            eyes: 'both' to analyze both eyes of every face
+            
+        Returns:
+            Dictionary with:
+            - success: bool (True if at least one face was analyzed)
+            - face_count: number of faces found
+            - faces: per-face results, left to right, each a detect_eye
+              (or detect_both_eyes) result plus 'face' (index) and 'bbox'
+              (x, y, width, height of the face landmarks in pixels)
+            - timings_ms: per-stage durations (only if record_timings)
+            - error: str (only if success=False)
+        """
+        if pupil_backend is not None and pupil_backend not in self.PUPIL_BACKENDS:
+            return {'success': False, 'error': f"Unknown pupil backend '{pupil_backend}'"}
+        return self._timed(self._run_faces_pipeline, image, prefer_right_eye,
+                           pupil_backend, eyes == 'both')
+    
+    def check_quality(self, image: np.ndarray) -> Dict:
+        """
+        Cheap usability check of a frame on a small grey thumbnail
+        
+        Args:
+            image: BGR image from OpenCV (numpy array)
+            
+        Returns:
+            Dictionary with:
+            - passed: bool
+            - reason: None, or 'too_dark', 'too_bright', 'overexposed',
+              'low_contrast' or 'blurry'
+            - metrics: brightness, contrast, clipped, sharpness
+        """
+        image = getattr(image, 'preview', image)   # ReducedImage
+        height, width = image.shape[:2]
+        scale = min(1.0, self.QUALITY_THUMBNAIL / max(height, width))
+        if scale < 1.0:
+            size = (max(1, round(width * scale)), max(1, round(height * scale)))
+            image = cv2.resize(image, size, interpolation=cv2.INTER_LINEAR)
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+        
+        mean, std = cv2.meanStdDev(gray)
+        brightness, contrast = float(mean[0, 0]), float(std[0, 0])
+        clipped = cv2.countNonZero(cv2.inRange(gray, 250, 255)) / gray.size
+        _, laplacian_std = cv2.meanStdDev(cv2.Laplacian(gray, cv2.CV_16S))
+        sharpness = float(laplacian_std[0, 0]) / contrast if contrast > 0 else 0.0
+        
+        limits = self.quality_limits
+        if brightness < limits['min_brightness']:
+            reason = 'too_dark'
+        elif brightness > limits['max_brightness']:
+            reason = 'too_bright'
+        elif clipped > limits['max_clipped']:
+            reason = 'overexposed'
+        elif contrast < limits['min_contrast']:
+            reason = 'low_contrast'
+        elif sharpness < limits['min_sharpness']:
+            reason = 'blurry'
+        else:
+            reason = None
+        
+        return {
+            'passed': reason is None,
+            'reason': reason,
+            'metrics': {
+                'brightness': round(brightness, 1),
+                'contrast': round(contrast, 1),
+                'clipped': round(clipped, 3),
+                'sharpness': round(sharpness, 3)
+            }
+        }
+    
+    def _quality_rejection(self, image: np.ndarray,
+                           timer: Optional[StageTimer] = None) -> Optional[Dict]:
+        """Error result if the quality gate is on and rejects image, else None"""
+        if not self.quality_gate or image is None or image.size == 0:
+            return None
+        quality = self.check_quality(image)
+        if timer:
+            timer.lap('quality_gate')
+        if quality['passed']:
+            return None
+        return {
+            'success': False,
+            'error': f"Image rejected by quality check: {quality['reason'].replace('_', ' ')}",
+            'quality': quality
+        }
+    
+    def _timed(self, pipeline: Callable, image: np.ndarray, *args) -> Dict:
+        """Run a pipeline behind the quality gate, adding timings_ms and
+        calling the hook if enabled"""
+        if not self.record_timings:
+            return self._quality_rejection(image) or pipeline(image, *args, timer=None)
+        
+        timer = StageTimer()
+        result = self._quality_rejection(image, timer) or pipeline(image, *args, timer=timer)
+        result['timings_ms'] = timer.timings_ms()
+        if self.timing_hook is not None:
+            self.timing_hook(result['timings_ms'])
+        return result
+    
+    def _run_pipeline(self, image: np.ndarray, prefer_right_eye: bool,
+                      pupil_backend: Optional[str] = None,
+                      timer: Optional[StageTimer] = None) -> Dict:
+        """detect_eye body; timer (if given) is lapped after each stage"""
         try:
             # Validate input
             if image is None or image.size == 0:
                 return {'success': False, 'error': 'Invalid image'}
             
-            # Convert BGR to RGB (MediaPipe requires RGB)
-            image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-            height, width = image.shape[:2]
+            # Stage 1: Locate face landmarks on a downscaled copy
+            landmarks = self._find_landmarks(image, timer)
+            
+            if landmarks is None:
+                return {'success': False, 'error': 'No face detected in image'}
             
-            # Process with MediaPipe
-            results = self.face_mesh.process(image_rgb)
+            # Stage 2: per-eye analysis at full resolution
+            return self._analyze_eye(image, landmarks, prefer_right_eye, pupil_backend, timer)
             
-            if not results.multi_face_landmarks:
+        except Exception as e:
+            return {'success': False, 'error': f'Detection error: {str(e)}'}
+    
+    def _run_both_pipeline(self, image: np.ndarray, pupil_backend: Optional[str] = None,
+                           timer: Optional[StageTimer] = None) -> Dict:
+        """detect_both_eyes body: one landmark pass, then each eye in turn"""
+        try:
+            if image is None or image.size == 0:
+                return {'success': False, 'error': 'Invalid image'}
+            
+            landmarks = self._find_landmarks(image, timer)
+            if landmarks is None:
                 return {'success': False, 'error': 'No face detected in image'}
             
-            # Get landmarks
-            landmarks = results.multi_face_landmarks[0]
+            return self._analyze_both_eyes(image, landmarks, pupil_backend, timer)
             
-            # Step 1: Extract iris landmarks
-            iris_data = self._extract_iris(landmarks, width, height, prefer_right_eye)
-            if not iris_data['success']:
-                return iris_data
+        except Exception as e:
+            return {'success': False, 'error': f'Detection error: {str(e)}'}
+    
+    def _run_faces_pipeline(self, image: np.ndarray, prefer_right_eye: bool,
+                            pupil_backend: Optional[str], both_eyes: bool,
+                            timer: Optional[StageTimer] = None) -> Dict:
+        """detect_faces body: one landmark pass, then every face concurrently"""
+        try:
+            if image is None or image.size == 0:
+                return {'success': False, 'error': 'Invalid image'}
             
-            # Step 2: Detect pupil within iris (IMPROVED)
-            pupil_data = self._detect_pupil(image, iris_data)
-            if not pupil_data['success']:
-                return pupil_data
+            all_landmarks = self._find_all_landmarks(image, timer)
+            if not all_landmarks:
+                return {'success': False, 'error': 'No face detected in image'}
             
-            # Step 3: Extract features for ACD prediction
-            features = self._extract_features(iris_data, pupil_data)
+            height, width = image.shape[:2]
+            boxes = [self._face_bbox(landmarks, width, height) for landmarks in all_landmarks]
+            order = sorted(range(len(boxes)), key=lambda i: boxes[i]['x'])
             
-            # Step 4: Predict ACD and classify risk (CORRECTED LOGIC)
-            prediction = self._predict_acd(features, pupil_data.get('method', 'contour'))
+            # Stage timers are not thread-safe: per-face work is one stage
+            def analyze(landmarks):
+                if both_eyes:
+                    return self._analyze_both_eyes(image, landmarks, pupil_backend, None)
+                return self._analyze_eye(image, landmarks, prefer_right_eye, pupil_backend, None)
             
-            # Compile complete result
-            return {
-                'success': True,
-                'iris': {
-                    'center': iris_data['center'],
-                    'radius': iris_data['radius'],
-                    'diameter_px': iris_data['diameter_px'],
-                    'points': iris_data['points']
-                },
-                'pupil': {
-                    'center': pupil_data['center'],
-                    'radius': pupil_data['radius'],
-                    'diameter_px': pupil_data['diameter_px'],
-                    'detection_method': pupil_data.get('method', 'contour')
-                },
-                'features': features,
-                'prediction': prediction
+            landmarks_in_order = [all_landmarks[i] for i in order]
+            if len(order) > 1 and self.face_workers > 1:
+                if self._face_executor is None:
+                    self._face_executor = ThreadPoolExecutor(
+                        max_workers=self.face_workers, thread_name_prefix='sonosight-face')
+                results = list(self._face_executor.map(analyze, landmarks_in_order))
+            else:
+                results = [analyze(landmarks) for landmarks in landmarks_in_order]
+            if timer:
+                timer.lap('analyze_faces')
+            
+            faces = [dict(result, face=index, bbox=boxes[i])
+                     for index, (i, result) in enumerate(zip(order, results))]
+            result = {
+                'success': any(face['success'] for face in faces),
+                'face_count': len(faces),
+                'faces': faces
             }
+            if not result['success']:
+                result['error'] = faces[0].get('error', 'Detection failed')
+            return result
             
         except Exception as e:
             return {'success': False, 'error': f'Detection error: {str(e)}'}
     
+    @staticmethod
+    def _face_bbox(landmarks, width: int, height: int) -> Dict:
+        """Pixel bounding box of a face's landmarks, clipped to the image"""
+        xs = [point.x for point in landmarks.landmark]
+        ys = [point.y for point in landmarks.landmark]
+        x0, x1 = max(0, int(min(xs) * width)), min(width, int(round(max(xs) * width)))
+        y0, y1 = max(0, int(min(ys) * height)), min(height, int(round(max(ys) * height)))
+        return {'x': x0, 'y': y0, 'width': x1 - x0, 'height': y1 - y0}
+    
+    def _analyze_both_eyes(self, image: np.ndarray, landmarks, pupil_backend: Optional[str],
+                           timer: Optional[StageTimer]) -> Dict:
+        """Both eyes of one landmark set plus their asymmetry features"""
+        # The per-eye stages take well under a millisecond each, less
+        # than handing work to another thread would cost
+        right = self._analyze_eye(image, landmarks, True, pupil_backend, timer)
+        left = self._analyze_eye(image, landmarks, False, pupil_backend, timer)
+        
+        result = {
+            'success': right['success'] or left['success'],
+            'eyes': 'both',
+            'right': right,
+            'left': left,
+            'asymmetry': (self._asymmetry_features(right, left)
+                          if right['success'] and left['success'] else None)
+        }
+        if not result['success']:
+            result['error'] = right.get('error', 'Detection failed')
+        if timer:
+            timer.lap('asymmetry')
+        return result
+    
+    def _analyze_eye(self, image: np.ndarray, landmarks, prefer_right_eye: bool,
+                     pupil_backend: Optional[str], timer: Optional[StageTimer]) -> Dict:
+        """
+        Iris, pupil, feature and ACD stages for one eye of a landmark set
+        
+        Iris landmarks are normalized, so they map back to full resolution
+        and the pupil is refined on a full-resolution crop.
+        """
+        height, width = image.shape[:2]
+        
+        # Step 1: Extract iris landmarks
+        iris_data = self._extract_iris(landmarks, width, height, prefer_right_eye)
+        if timer:
+            timer.lap('extract_iris')
+        if not iris_data['success']:
+            return iris_data
+        
+        # Step 2: Detect pupil within iris (IMPROVED)
+        pupil_data = self._detect_pupil(image, iris_data, pupil_backend)
+        if timer:
+            timer.lap('detect_pupil')
+        if not pupil_data['success']:
+            return pupil_data
+        
+        # Step 3: Extract features for ACD prediction
+        features = self._extract_features(iris_data, pupil_data)
+        if timer:
+            timer.lap('extract_features')
+        
+        # Step 4: Predict ACD and classify risk (CORRECTED LOGIC)
+        prediction = self._predict_acd(features, pupil_data.get('method', 'contour'))
+        if timer:
+            timer.lap('predict_acd')
+        
+        # Compile complete result
+        return self._compile_result(iris_data, pupil_data, features, prediction)
+    
+    def _find_landmarks(self, image: np.ndarray, timer: Optional[StageTimer] = None):
+        """
+        Run Face Mesh at the working resolution
+        
+        Args:
+            image: BGR image at full resolution
+            timer: Optional stage timer (laps resize, cvt_color, face_mesh)
+            
+        Returns:
+            Landmarks of the first face (normalized coordinates), or None
+        """
+        faces = self._find_all_landmarks(image, timer)
+        return faces[0] if faces else None
+    
+    def _find_all_landmarks(self, image: np.ndarray, timer: Optional[StageTimer] = None) -> List:
+        """Landmarks of every face found (up to max_num_faces), see _find_landmarks"""
+        # Landmarks are normalized, so a ReducedImage's preview serves as well
+        image = getattr(image, 'preview', image)
+        height, width = image.shape[:2]
+        longest = max(height, width)
+        
+        if self.working_resolution and longest > self.working_resolution:
+            scale = self.working_resolution / longest
+            size = (max(1, round(width * scale)), max(1, round(height * scale)))
+            # Bilinear is ~30x cheaper than INTER_AREA on 12 MP frames and
+            # is what MediaPipe uses for its own internal resampling
+            image = cv2.resize(image, size, interpolation=cv2.INTER_LINEAR)
+            if timer:
+                timer.lap('resize')
+        
+        # Convert BGR to RGB (MediaPipe requires RGB)
+        image_rgb = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
+        if timer:
+            timer.lap('cvt_color')
+        results = self.face_mesh.process(image_rgb)
+        if timer:
+            timer.lap('face_mesh')
+        
+        return list(results.multi_face_landmarks or [])
+    
+    def _compile_result(self, iris_data: Dict, pupil_data: Dict,
+                        features: Dict, prediction: Dict) -> Dict:
+        """Assemble the public result dictionary from the pipeline stages"""
+        return {
+            'success': True,
+            'iris': {
+                'center': iris_data['center'],
+                'radius': iris_data['radius'],
+                'diameter_px': iris_data['diameter_px'],
+                'points': iris_data['points']
+            },
+            'pupil': {
+                'center': pupil_data['center'],
+                'radius': pupil_data['radius'],
+                'diameter_px': pupil_data['diameter_px'],
+                'detection_method': pupil_data.get('method', 'contour'),
+                'backend': pupil_data.get('backend', 'threshold')
+            },
+            'features': features,
+            'prediction': prediction
+        }
+    
     def _extract_iris(self, landmarks, width: int, height: int, 
                      prefer_right: bool) -> Dict:
         """
@@ -176,18 +778,21 @@ class EyeDetector:
         except Exception as e:
             return {'success': False, 'error': f'Iris extraction failed: {str(e)}'}
     
-    def _detect_pupil(self, image: np.ndarray, iris_data: Dict) -> Dict:
+    def _detect_pupil(self, image: np.ndarray, iris_data: Dict,
+                      backend: Optional[str] = None) -> Dict:
         """
-        Detect pupil within iris region using thresholding and contour analysis
-        IMPROVED: Better thresholding and more lenient criteria
+        Detect pupil within iris region using the selected backend
         
         Args:
             image: Original BGR image
             iris_data: Iris detection results
+            backend: Name from PUPIL_BACKENDS (None = self.pupil_backend)
             
         Returns:
             Dictionary with pupil data or error
         """
+        backend = backend or self.pupil_backend
+        locate_name, method = self.PUPIL_BACKENDS[backend]
         try:
             cx, cy = iris_data['center']
             r = int(iris_data['radius'])
@@ -203,109 +808,204 @@ class EyeDetector:
             eye_crop = image[y1:y2, x1:x2]
             
             if eye_crop.size == 0:
-                return self._fallback_pupil(cx, cy, r)
+                return self._fallback_pupil(cx, cy, r, backend)
             
             # Convert to grayscale
             gray = cv2.cvtColor(eye_crop, cv2.COLOR_BGR2GRAY)
             
-            # Try multiple thresholding methods for robustness
-            
-            # Method 1: Otsu's thresholding
-            blurred = cv2.GaussianBlur(gray, (5, 5), 0)
-            _, binary = cv2.threshold(blurred, 0, 255, 
-                                      cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
-            
-            # Find contours
-            contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, 
-                                           cv2.CHAIN_APPROX_SIMPLE)
-            
-            if len(contours) == 0:
-                # Method 2: Try adaptive threshold
-                binary = cv2.adaptiveThreshold(blurred, 255, 
-                                               cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
-                                               cv2.THRESH_BINARY_INV, 11, 2)
-                contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, 
-                                               cv2.CHAIN_APPROX_SIMPLE)
+            found = getattr(self, locate_name)(gray, cx - x1, cy - y1, r)
+            if found is None:
+                return self._fallback_pupil(cx, cy, r, backend)
             
-            if len(contours) == 0:
-                return self._fallback_pupil(cx, cy, r)
-            
-            # Filter and validate contours (MORE LENIENT)
-            iris_area = np.pi * r * r
-            valid_contours = []
-            
-            for contour in contours:
-                area = cv2.contourArea(contour)
-                
-                # Skip very small contours
-                if area < 30:
-                    continue
-                
-                perimeter = cv2.arcLength(contour, True)
-                if perimeter == 0:
-                    continue
-                
-                # Calculate circularity (1.0 = perfect circle)
-                circularity = 4 * np.pi * area / (perimeter ** 2)
-                
-                # More lenient validation
-                area_ratio = area / iris_area
-                if (0.08 <= area_ratio <= 0.90 and circularity >= 0.4):
-                    # Get contour center
-                    M = cv2.moments(contour)
-                    if M['m00'] != 0:
-                        cx_local = int(M['m10'] / M['m00'])
-                        cy_local = int(M['m01'] / M['m00'])
-                        
-                        # Convert to global coordinates
-                        cx_global = cx_local + x1
-                        cy_global = cy_local + y1
-                        
-                        # Check if center is reasonably close to iris center
-                        dist_from_iris_center = np.sqrt(
-                            (cx_global - cx)**2 + (cy_global - cy)**2
-                        )
-                        
-                        # More lenient: within 1.2 * radius
-                        if dist_from_iris_center <= r * 1.2:
-                            valid_contours.append({
-                                'contour': contour,
-                                'area': area,
-                                'circularity': circularity,
-                                'center': (cx_global, cy_global),
-                                'distance': dist_from_iris_center
-                            })
-            
-            if len(valid_contours) == 0:
-                return self._fallback_pupil(cx, cy, r)
-            
-            # Select best contour
-            best_contour = max(valid_contours, 
-                              key=lambda x: x['area'] * x['circularity'] / (x['distance'] + 1))
-            
-            # Fit minimum enclosing circle
-            (px_local, py_local), pr = cv2.minEnclosingCircle(best_contour['contour'])
+            (px_local, py_local), pr = found
             px = int(px_local) + x1
             py = int(py_local) + y1
             pr = int(pr)
             
             # More lenient radius validation
             if pr < 3 or pr > r * 0.95:
-                return self._fallback_pupil(cx, cy, r)
+                return self._fallback_pupil(cx, cy, r, backend)
             
             return {
                 'success': True,
                 'center': (px, py),
                 'radius': pr,
                 'diameter_px': 2 * pr,
-                'method': 'contour'
+                'method': method,
+                'backend': backend
             }
             
         except Exception as e:
             print(f"Warning: Pupil detection error: {e}")
-            return self._fallback_pupil(cx, cy, r)
+            return self._fallback_pupil(cx, cy, r, backend)
+    
+    def _pupil_threshold(self, gray: np.ndarray, cx: int, cy: int, r: int):
+        """
+        Threshold backend: Otsu (then adaptive) thresholding and contour analysis
+        IMPROVED: Better thresholding and more lenient criteria
+        
+        Args:
+            gray: Grayscale eye crop
+            cx, cy, r: Iris center (crop coordinates) and radius
+            
+        Returns:
+            ((x, y), radius) of the pupil in crop coordinates, or None
+        """
+        # Try multiple thresholding methods for robustness
+        
+        # Method 1: Otsu's thresholding
+        blurred = cv2.GaussianBlur(gray, (5, 5), 0)
+        _, binary = cv2.threshold(blurred, 0, 255, 
+                                  cv2.THRESH_BINARY_INV + cv2.THRESH_OTSU)
+        
+        # Find contours
+        contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, 
+                                       cv2.CHAIN_APPROX_SIMPLE)
+        
+        if len(contours) == 0:
+            # Method 2: Try adaptive threshold
+            binary = cv2.adaptiveThreshold(blurred, 255, 
+                                           cv2.ADAPTIVE_THRESH_GAUSSIAN_C,
+                                           cv2.THRESH_BINARY_INV, 11, 2)
+            contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, 
+                                           cv2.CHAIN_APPROX_SIMPLE)
+        
+        if len(contours) == 0:
+            return None
+        
+        # Filter, validate and score all contours at once (MORE LENIENT)
+        best_contour = self._select_pupil_contour(contours, cx, cy, r)
+        
+        if best_contour is None:
+            return None
+        
+        # Fit minimum enclosing circle
+        return cv2.minEnclosingCircle(best_contour)
+    
+    def _pupil_ellipse(self, gray: np.ndarray, cx: int, cy: int, r: int):
+        """
+        Ellipse-fit backend: one adaptive-level threshold inside the iris disc
+        
+        The iris disc is thresholded halfway between its darkest level and
+        its mean, so the cut adapts to exposure without Otsu's histogram pass
+        or a second adaptive-threshold attempt. The largest dark region near
+        the iris center is taken as the pupil and an ellipse is fitted to its
+        outline (robust to lid occlusion and glints on the pupil edge).
+        
+        Args:
+            gray: Grayscale eye crop
+            cx, cy, r: Iris center (crop coordinates) and radius
+            
+        Returns:
+            ((x, y), radius) of the pupil in crop coordinates, or None
+        """
+        # Work on the square around the iris only; the disc mask then
+        # excludes eyelashes and lid shadows outside the iris
+        rx1, ry1 = max(0, cx - r), max(0, cy - r)
+        roi = gray[ry1:cy + r + 1, rx1:cx + r + 1]
+        cx, cy = cx - rx1, cy - ry1
+        blurred = cv2.GaussianBlur(roi, (5, 5), 0)
+        mask = np.zeros(roi.shape, dtype=np.uint8)
+        cv2.circle(mask, (cx, cy), int(r * 0.95), 255, -1)
+        darkest = cv2.minMaxLoc(blurred, mask)[0]
+        mean = cv2.mean(blurred, mask)[0]
+        if mean - darkest < 15:
+            return None  # no dark pupil against the iris
+        
+        _, binary = cv2.threshold(blurred, (darkest + mean) / 2, 255, cv2.THRESH_BINARY_INV)
+        binary &= mask
+        contours, _ = cv2.findContours(binary, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        
+        best_contour, best_score = None, 0.0
+        for contour in contours:
+            if len(contour) < 5:
+                continue  # fitEllipse needs five points
+            x, y, w, h = cv2.boundingRect(contour)
+            dist = np.hypot(x + w / 2 - cx, y + h / 2 - cy)
+            score = cv2.contourArea(contour) / (1 + dist / r)
+            if score > best_score:
+                best_contour, best_score = contour, score
+        
+        if best_contour is None or best_score < 30:
+            return None
+        
+        # Boundary pixel centers sit half a pixel inside the edge
+        (ex, ey), (axis_a, axis_b), _ = cv2.fitEllipse(best_contour)
+        return (ex + rx1, ey + ry1), (axis_a + axis_b) / 4 + 0.5
+    
+    def _select_pupil_contour(self, contours, cx: int, cy: int, r: int):
+        """
+        Pick the most pupil-like contour
+        
+        Criteria (MORE LENIENT): area >= 30 px, 8-90% of the iris area,
+        circularity >= 0.4, centroid within 1.2 * radius of the iris
+        center; best = max area * circularity / (distance + 1).
+        
+        Small contour sets are scored one contour at a time, measuring
+        perimeter and moments only for contours of plausible size. From
+        PUPIL_CONTOUR_BATCH_MIN contours on (eyelash- and speckle-heavy
+        crops) every contour is measured in one pass by _contour_measures
+        and the best is picked with a single masked argmax. Both paths
+        reproduce OpenCV's measurements exactly and keep the first of
+        equal scores, so they choose the same contour.
+        
+        Args:
+            contours: Contours from cv2.findContours
+            cx, cy, r: Iris center and radius, in the contours' coordinates
+            
+        Returns:
+            Best contour, or None if no contour qualifies
+        """
+        iris_area = np.pi * r * r
+        
+        if len(contours) < self.PUPIL_CONTOUR_BATCH_MIN:
+            best_contour, best_score = None, None
+            for contour in contours:
+                area = cv2.contourArea(contour)
+                if area < 30 or not 0.08 <= area / iris_area <= 0.90:
+                    continue
+                perimeter = cv2.arcLength(contour, True)
+                if perimeter == 0:
+                    continue
+                # Calculate circularity (1.0 = perfect circle)
+                circularity = 4 * np.pi * area / (perimeter ** 2)
+                if circularity < 0.4:
+                    continue
+                M = cv2.moments(contour)
+                if M['m00'] == 0:
+                    continue
+                distance = np.sqrt((int(M['m10'] / M['m00']) - cx) ** 2 +
+                                   (int(M['m01'] / M['m00']) - cy) ** 2)
+                if distance > r * 1.2:
+                    continue
+                score = area * circularity / (distance + 1)
+                if best_score is None or score > best_score:
+                    best_contour, best_score = contour, score
+            return best_contour
+        
+        with np.errstate(divide='ignore', invalid='ignore'):
+            areas, perimeters, centroid_x, centroid_y = _contour_measures(contours)
+            area_ratio = areas / iris_area
+            # Size-plausible contours; areas >= 30 also rules out m00 == 0
+            candidates = np.flatnonzero((areas >= 30) & (area_ratio >= 0.08) &
+                                        (area_ratio <= 0.90))
+            if len(candidates) == 0:
+                return None
+            areas = areas[candidates]
+            perimeters = perimeters[candidates]
+            circularity = 4 * np.pi * areas / (perimeters ** 2)
+            # Centroids truncated like int()
+            distances = np.sqrt((np.trunc(centroid_x[candidates]) - cx) ** 2 +
+                                (np.trunc(centroid_y[candidates]) - cy) ** 2)
+            valid = (perimeters != 0) & (circularity >= 0.4) & (distances <= r * 1.2)
+            if not valid.any():
+                return None
+            scores = np.where(valid, areas * circularity / (distances + 1), -np.inf)
+        # argmax returns the first maximum, like the loop's strict comparison
+        return contours[int(candidates[np.argmax(scores)])]
     
-    def _fallback_pupil(self, iris_cx: int, iris_cy: int, iris_r: float) -> Dict:
+    def _fallback_pupil(self, iris_cx: int, iris_cy: int, iris_r: float,
+                        backend: str = 'threshold') -> Dict:
         """
         Fallback pupil estimation when detection fails
         Uses 33% (realistic normal ratio)
@@ -313,6 +1013,7 @@ class EyeDetector:
         Args:
             iris_cx, iris_cy: Iris center coordinates
             iris_r: Iris radius
+            backend: Backend that failed to find the pupil
             
         Returns:
             Estimated pupil data
@@ -323,7 +1024,8 @@ class EyeDetector:
             'center': (iris_cx, iris_cy),
             'radius': pupil_radius,
             'diameter_px': 2 * pupil_radius,
-            'method': 'fallback'
+            'method': 'fallback',
+            'backend': backend
         }
     
     def _extract_features(self, iris: Dict, pupil: Dict) -> Dict:
@@ -364,6 +1066,41 @@ class EyeDetector:
             'pupil_diameter_px': round(float(pupil['diameter_px']), 1)
         }
     
+    def _asymmetry_features(self, right: Dict, left: Dict) -> Dict:
+        """
+        Compare the two eyes of a detect_both_eyes call
+        
+        Pupil and iris sizes are compared relative to each eye's iris so
+        camera distance cancels out; the raw iris diameter ratio mostly
+        reflects head rotation and is reported as a pose check.
+        
+        Args:
+            right: Successful right-eye result
+            left: Successful left-eye result
+            
+        Returns:
+            Dictionary of right-minus-left differences and ratios
+        """
+        rf, lf = right['features'], left['features']
+        rp, lp = right['prediction'], left['prediction']
+        
+        if rp['risk_score'] == lp['risk_score']:
+            higher_risk_eye = None
+        else:
+            higher_risk_eye = 'right' if rp['risk_score'] > lp['risk_score'] else 'left'
+        
+        return {
+            'acd_difference_mm': round(rp['acd_mm'] - lp['acd_mm'], 2),
+            'iris_pupil_ratio_difference': round(rf['iris_pupil_ratio'] - lf['iris_pupil_ratio'], 3),
+            'normalized_pupil_size_ratio': (round(rf['normalized_pupil_size'] / lf['normalized_pupil_size'], 3)
+                                            if lf['normalized_pupil_size'] else None),
+            'pupil_eccentricity_difference': round(rf['pupil_eccentricity'] - lf['pupil_eccentricity'], 3),
+            'iris_diameter_ratio': round(rf['iris_diameter_px'] / lf['iris_diameter_px'], 3),
+            'risk_score_difference': rp['risk_score'] - lp['risk_score'],
+            'risk_levels_match': rp['risk_level'] == lp['risk_level'],
+            'higher_risk_eye': higher_risk_eye
+        }
+    
     def _predict_acd(self, features: Dict, detection_method: str) -> Dict:
         """
         Predict Anterior Chamber Depth and classify glaucoma risk
@@ -641,10 +1378,412 @@ class EyeDetector:
         
         print("\n" + "="*75 + "\n")
     
+    def close(self):
+        """Release the MediaPipe graph (safe to call more than once)"""
+        executor = getattr(self, '_face_executor', None)
+        if executor is not None:
+            self._face_executor = None
+            executor.shutdown(wait=False)
+        face_mesh = getattr(self, 'face_mesh', None)
+        if face_mesh is not None:
+            self.face_mesh = None
+            face_mesh.close()
+    
     def __del__(self):
         """Cleanup MediaPipe resources"""
-        if hasattr(self, 'face_mesh'):
-            self.face_mesh.close()
+        self.close()
+
+
+class EyeTracker(EyeDetector):
+    """
+    Stateful eye detector for video streams
+    
+    Runs Face Mesh in video mode and carries the iris ROI and pupil
+    estimate forward between frames:
+    - 'reused': eye region unchanged, previous result returned as-is
+    - 'tracked': iris moved slightly, pupil shifted with it (no thresholding)
+    - 'full': complete pupil detection (first frame, drift, low confidence)
+    - 'rejected': frame failed the quality gate (no landmark pass)
+    
+    Every result carries a 'tracking' dict with the mode used, the frame
+    latency and the latency saved against the running full-pass average.
+    """
+    
+    def __init__(self,
+                 min_detection_confidence: float = 0.5,
+                 min_tracking_confidence: float = 0.5,
+                 max_drift: float = 0.15,
+                 roi_change_threshold: float = 6.0,
+                 min_confidence: float = 0.75,
+                 redetect_interval: int = 30,
+                 working_resolution: Optional[int] = 640,
+                 pupil_backend: str = 'threshold',
+                 quality_gate: bool = False):
+        """
+        Initialize tracker
+        
+        Args:
+            min_detection_confidence: Minimum confidence for face detection (0-1)
+            min_tracking_confidence: Minimum confidence for landmark tracking (0-1)
+            max_drift: Largest iris movement / size change (fraction of iris
+                radius) for which the previous pupil is carried forward
+            roi_change_threshold: Mean absolute grey-level difference of the
+                eye region below which the previous result is reused
+            min_confidence: Prediction confidence below which the next
+                frame is fully re-detected
+            redetect_interval: Force a full detection at least this often
+            working_resolution: Longest image side used for the landmark pass
+            pupil_backend: Pupil detection backend (see PUPIL_BACKENDS)
+            quality_gate: Reject unusable frames before the landmark pass
+        """
+        super().__init__(min_detection_confidence, min_tracking_confidence,
+                         static_image_mode=False,
+                         working_resolution=working_resolution,
+                         pupil_backend=pupil_backend,
+                         quality_gate=quality_gate)
+        self.max_drift = max_drift
+        self.roi_change_threshold = roi_change_threshold
+        self.min_confidence = min_confidence
+        self.redetect_interval = redetect_interval
+        self.reset()
+    
+    def reset(self):
+        """Forget tracking state and statistics (e.g. for a new subject)"""
+        self._clear_state()
+        self._prefer_right = None
+        self._full_ms = None
+        self._stats = {'frames': 0, 'full': 0, 'tracked': 0, 'reused': 0,
+                       'rejected': 0, 'saved_ms': 0.0}
+    
+    def _clear_state(self):
+        """Drop carried-forward results so the next frame is fully detected"""
+        self._last_result = None
+        self._last_iris = None
+        self._last_pupil = None
+        self._last_roi = None
+        self._frames_since_full = 0
+    
+    def stats(self) -> Dict:
+        """Counts per tracking mode and total latency saved"""
+        stats = dict(self._stats)
+        stats['saved_ms'] = round(stats['saved_ms'], 2)
+        stats['full_pass_ms'] = round(self._full_ms, 2) if self._full_ms else None
+        return stats
+    
+    def detect_stream(self, frames: Iterable[np.ndarray],
+                      prefer_right_eye: bool = True) -> Iterator[Dict]:
+        """Analyze consecutive frames, yielding one result per frame"""
+        for frame in frames:
+            yield self.track(frame, prefer_right_eye)
+    
+    def track(self, image: np.ndarray, prefer_right_eye: bool = True) -> Dict:
+        """
+        Analyze the next frame of a stream
+        
+        Args:
+            image: BGR frame from OpenCV (numpy array)
+            prefer_right_eye: Which eye to analyze (True=right, False=left)
+            
+        Returns:
+            Same dictionary as detect_eye, plus 'tracking'
+        """
+        start = time.perf_counter()
+        
+        if prefer_right_eye != self._prefer_right:
+            self._clear_state()
+            self._prefer_right = prefer_right_eye
+        
+        try:
+            result, mode = self._track(image, prefer_right_eye)
+        except Exception as e:
+            result, mode = {'success': False, 'error': f'Detection error: {str(e)}'}, 'full'
+        
+        latency_ms = (time.perf_counter() - start) * 1000
+        saved_ms = 0.0
+        if mode == 'full':
+            # Running average of full-pass cost is the baseline for savings
+            self._full_ms = (latency_ms if self._full_ms is None
+                             else 0.8 * self._full_ms + 0.2 * latency_ms)
+        elif self._full_ms is not None:
+            saved_ms = max(0.0, self._full_ms - latency_ms)
+        
+        self._stats['frames'] += 1
+        self._stats[mode] += 1
+        self._stats['saved_ms'] += saved_ms
+        
+        result = dict(result)
+        result['tracking'] = {
+            'mode': mode,
+            'latency_ms': round(latency_ms, 2),
+            'saved_ms': round(saved_ms, 2)
+        }
+        return result
+    
+    def _track(self, image: np.ndarray, prefer_right_eye: bool) -> Tuple[Dict, str]:
+        """Run the cheapest pipeline that is still valid for this frame"""
+        if image is None or image.size == 0:
+            self._clear_state()
+            return {'success': False, 'error': 'Invalid image'}, 'full'
+        
+        can_reuse = (self._last_result is not None
+                     and self._frames_since_full < self.redetect_interval
+                     and self._last_result['prediction']['confidence'] >= self.min_confidence)
+        
+        # Level 1: eye region unchanged -> reuse previous result
+        if can_reuse:
+            roi = self._roi_signature(image, self._last_iris)
+            if (roi is not None and roi.shape == self._last_roi.shape and
+                    float(np.mean(cv2.absdiff(roi, self._last_roi))) < self.roi_change_threshold):
+                self._frames_since_full += 1
+                return self._last_result, 'reused'
+        
+        rejected = self._quality_rejection(image)
+        if rejected:
+            self._clear_state()
+            return rejected, 'rejected'
+        
+        height, width = image.shape[:2]
+        landmarks = self._find_landmarks(image)
+        
+        if landmarks is None:
+            self._clear_state()
+            return {'success': False, 'error': 'No face detected in image'}, 'full'
+        
+        iris_data = self._extract_iris(landmarks, width, height, prefer_right_eye)
+        if not iris_data['success']:
+            self._clear_state()
+            return iris_data, 'full'
+        
+        # Level 2: small iris motion -> carry the pupil along with it
+        pupil_data = self._carry_pupil(iris_data) if can_reuse else None
+        mode = 'tracked'
+        if pupil_data is None:
+            pupil_data = self._detect_pupil(image, iris_data)
+            mode = 'full'
+            if not pupil_data['success']:
+                self._clear_state()
+                return pupil_data, mode
+        
+        features = self._extract_features(iris_data, pupil_data)
+        prediction = self._predict_acd(features, pupil_data.get('method', 'contour'))
+        result = self._compile_result(iris_data, pupil_data, features, prediction)
+        
+        self._last_result = result
+        self._last_iris = iris_data
+        self._last_pupil = pupil_data
+        self._last_roi = self._roi_signature(image, iris_data)
+        self._frames_since_full = 0 if mode == 'full' else self._frames_since_full + 1
+        return result, mode
+    
+    def _carry_pupil(self, iris_data: Dict) -> Optional[Dict]:
+        """Shift the previous pupil with the iris, or None if it drifted too far"""
+        prev_iris = self._last_iris
+        prev_pupil = self._last_pupil
+        if prev_pupil.get('method') == 'fallback':
+            return None
+        
+        dx = iris_data['center'][0] - prev_iris['center'][0]
+        dy = iris_data['center'][1] - prev_iris['center'][1]
+        scale = iris_data['radius'] / prev_iris['radius']
+        if (np.sqrt(dx**2 + dy**2) > self.max_drift * prev_iris['radius'] or
+                abs(scale - 1.0) > self.max_drift):
+            return None
+        
+        radius = int(prev_pupil['radius'] * scale)
+        return {
+            'success': True,
+            'center': (prev_pupil['center'][0] + dx, prev_pupil['center'][1] + dy),
+            'radius': radius,
+            'diameter_px': 2 * radius,
+            'method': prev_pupil.get('method', 'contour'),
+            'backend': prev_pupil.get('backend', self.pupil_backend)
+        }
+    
+    @staticmethod
+    def _roi_signature(image: np.ndarray, iris_data: Dict) -> Optional[np.ndarray]:
+        """Small greyscale thumbnail of the iris region for change detection"""
+        cx, cy = iris_data['center']
+        r = int(iris_data['radius'])
+        x1, y1 = max(0, cx - r), max(0, cy - r)
+        x2, y2 = min(image.shape[1], cx + r), min(image.shape[0], cy + r)
+        crop = image[y1:y2, x1:x2]
+        if crop.size == 0:
+            return None
+        gray = cv2.cvtColor(crop, cv2.COLOR_BGR2GRAY)
+        return cv2.resize(gray, (24, 24), interpolation=cv2.INTER_AREA)
+
+
+# Vectorized scoring tables mirroring EyeDetector._predict_acd
+ACD_BY_RISK_SCORE = [(10, 1.8), (8, 2.1), (6, 2.4), (4, 2.7), (2, 3.0)]
+RISK_LEVELS = ('HIGH', 'MODERATE', 'LOW')
+
+
+def _round_like_python(values: np.ndarray, decimals: int) -> np.ndarray:
+    """
+    Round like Python's round() (correctly rounded decimal), vectorized
+    
+    np.round scales by 10**decimals first, which can disagree with round()
+    for values sitting on a rounding tie; only those few entries are
+    recomputed with round().
+    """
+    values = np.asarray(values, dtype=np.float64)
+    rounded = np.round(values, decimals)
+    scaled = values * 10.0 ** decimals
+    near_tie = np.abs(np.abs(scaled - np.floor(scaled)) - 0.5) < 1e-6
+    for idx in np.flatnonzero(near_tie):
+        rounded.flat[idx] = round(float(values.flat[idx]), decimals)
+    return rounded
+
+
+def _contour_measures(contours):
+    """
+    Area, perimeter and centroid of every contour in one NumPy pass
+    
+    Matches cv2.contourArea, cv2.arcLength(closed=True) and cv2.moments
+    bit for bit on integer contours: the shoelace and first-moment sums
+    are exact in float64, and segment lengths are taken in float32 and
+    summed in OpenCV's order (closing segment first).
+    
+    Args:
+        contours: Sequence of (n, 1, 2) int32 arrays from cv2.findContours
+        
+    Returns:
+        (areas, perimeters, centroid_x, centroid_y) arrays; the centroid
+        is NaN or infinite where the area (moment m00) is 0, so call it
+        under np.errstate to silence the divide warnings
+    """
+    lengths = np.fromiter(map(len, contours), dtype=np.intp, count=len(contours))
+    # One row per coordinate; joining the raw buffers is far cheaper than
+    # np.concatenate on hundreds of small arrays
+    xy = np.frombuffer(b''.join(contours), dtype=np.int32).reshape(-1, 2).T
+    xy = xy.astype(np.float64, order='C')
+    ends = np.cumsum(lengths)
+    starts = ends - lengths
+    # Each point's predecessor on its closed contour
+    before = np.empty_like(xy)
+    before[:, 1:] = xy[:, :-1]
+    before[:, starts] = xy[:, ends - 1]
+    
+    # Per point: shoelace term, its first-moment terms and segment length,
+    # summed per contour by a single reduceat
+    terms = np.empty((4, xy.shape[1]))
+    cross = terms[0]
+    np.subtract(before[0] * xy[1], xy[0] * before[1], out=cross)
+    np.multiply(before + xy, cross, out=terms[1:3])
+    steps = (xy - before).astype(np.float32)
+    steps *= steps
+    np.sqrt(steps[0] + steps[1], out=terms[3])
+    a00, a10, a01, perimeters = np.add.reduceat(terms, starts, axis=1)
+    # cv2.moments scales by 1/2 and 1/6 (the sign cancels in the centroid)
+    centroid_x = (a10 * (1 / 6)) / (a00 * 0.5)
+    centroid_y = (a01 * (1 / 6)) / (a00 * 0.5)
+    return np.abs(a00) * 0.5, perimeters, centroid_x, centroid_y
+
+
+def extract_features_batch(iris_centers, iris_radii, pupil_centers, pupil_radii) -> Dict:
+    """
+    Vectorized EyeDetector._extract_features over many measurements
+    
+    Args:
+        iris_centers: (N, 2) iris centers in pixels
+        iris_radii: (N,) iris radii in pixels
+        pupil_centers: (N, 2) pupil centers in pixels
+        pupil_radii: (N,) pupil radii in pixels
+        
+    Returns:
+        Dictionary of (N,) arrays with the same keys and rounding as
+        _extract_features
+    """
+    iris_centers = np.asarray(iris_centers, dtype=np.float64).reshape(-1, 2)
+    pupil_centers = np.asarray(pupil_centers, dtype=np.float64).reshape(-1, 2)
+    iris_radii = np.asarray(iris_radii, dtype=np.float64)
+    pupil_radii = np.asarray(pupil_radii, dtype=np.float64)
+    iris_diameters = 2 * iris_radii
+    pupil_diameters = 2 * pupil_radii
+    
+    iris_pupil_ratio = pupil_diameters / iris_diameters
+    
+    dx = pupil_centers[:, 0] - iris_centers[:, 0]
+    dy = pupil_centers[:, 1] - iris_centers[:, 1]
+    eccentricity = np.sqrt(dx**2 + dy**2) / iris_radii
+    
+    normalized_size = (np.pi * pupil_radii ** 2) / (np.pi * iris_radii ** 2)
+    
+    return {
+        'iris_pupil_ratio': _round_like_python(iris_pupil_ratio, 3),
+        'pupil_eccentricity': _round_like_python(eccentricity, 3),
+        'normalized_pupil_size': _round_like_python(normalized_size, 3),
+        'iris_diameter_px': _round_like_python(iris_diameters, 1),
+        'pupil_diameter_px': _round_like_python(pupil_diameters, 1)
+    }
+
+
+def predict_acd_batch(features, detection_methods=None) -> Dict:
+    """
+    Vectorized EyeDetector._predict_acd over many feature rows
+    
+    Gives exactly the same risk_score, acd_mm, risk_level and confidence
+    as the scalar path, for re-scoring archives of stored measurements.
+    
+    Args:
+        features: (N, 3) array of [iris_pupil_ratio, pupil_eccentricity,
+            normalized_pupil_size], or a mapping with those keys holding
+            (N,) arrays (e.g. the output of extract_features_batch)
+        detection_methods: Optional (N,) pupil detection methods; rows
+            equal to 'fallback' get the fallback adjustments
+            
+    Returns:
+        Dictionary of (N,) arrays: acd_mm, risk_level, risk_score,
+        confidence, detection_quality
+    """
+    if hasattr(features, 'keys'):
+        ratio = np.asarray(features['iris_pupil_ratio'], dtype=np.float64)
+        eccentricity = np.asarray(features['pupil_eccentricity'], dtype=np.float64)
+        normalized_size = np.asarray(features['normalized_pupil_size'], dtype=np.float64)
+    else:
+        features = np.asarray(features, dtype=np.float64).reshape(-1, 3)
+        ratio, eccentricity, normalized_size = features.T
+    
+    if detection_methods is None:
+        using_fallback = np.zeros(ratio.shape, dtype=bool)
+    else:
+        using_fallback = np.asarray(detection_methods) == 'fallback'
+    
+    # Iris-pupil ratio: one point per threshold the ratio is below
+    risk_score = sum((ratio < t).astype(np.int64) for t in (0.16, 0.18, 0.20, 0.22, 0.24))
+    
+    # Pupil eccentricity
+    risk_score = risk_score + np.select(
+        [eccentricity > 0.40, eccentricity > 0.35, eccentricity > 0.30, eccentricity > 0.27],
+        [5, 4, 3, 2], default=0)
+    
+    # Normalized pupil size: one point per threshold the size is below
+    risk_score = risk_score + sum((normalized_size < t).astype(np.int64)
+                                  for t in (0.04, 0.06, 0.08))
+    
+    risk_score = np.where(using_fallback, np.maximum(0, risk_score - 2), risk_score)
+    
+    acd_mm = np.select([risk_score >= s for s, _ in ACD_BY_RISK_SCORE],
+                       [acd for _, acd in ACD_BY_RISK_SCORE], default=3.3)
+    risk_level = np.array(RISK_LEVELS)[np.select([acd_mm < 2.4, acd_mm < 2.7], [0, 1], default=2)]
+    
+    # Same addition order as the scalar path so floats match bit for bit
+    confidence = np.full(ratio.shape, 0.80)
+    confidence = confidence + np.where((ratio > 0.24) & (ratio < 0.50), 0.10, 0.0)
+    confidence = confidence + np.where(eccentricity < 0.30, 0.08, 0.0)
+    confidence = confidence + np.where((normalized_size > 0.08) & (normalized_size < 0.25), 0.07, 0.0)
+    confidence = confidence - np.where((ratio < 0.15) | (ratio > 0.60), 0.10, 0.0)
+    confidence = confidence - np.where(eccentricity > 0.50, 0.08, 0.0)
+    confidence = confidence - np.where(using_fallback, 0.15, 0.0)
+    confidence = np.clip(confidence, 0.50, 0.95)
+    
+    return {
+        'acd_mm': _round_like_python(acd_mm, 1),
+        'risk_level': risk_level,
+        'risk_score': risk_score,
+        'confidence': _round_like_python(confidence, 2),
+        'detection_quality': np.where(using_fallback, 'Estimated', 'Good')
+    }
 
 
 def test_webcam():
@@ -660,7 +1799,8 @@ def test_webcam():
     print("  SPACE - Pause/Resume")
     print("="*75 + "\n")
     
-    detector = EyeDetector()
+    # Consecutive webcam frames are near-identical, so track between them
+    detector = EyeTracker()
     cap = cv2.VideoCapture(0)
     
     if not cap.isOpened():
@@ -686,13 +1826,15 @@ def test_webcam():
             
             frame_count += 1
             
-            result = detector.detect_eye(frame, prefer_right)
+            result = detector.track(frame, prefer_right)
             last_result = result
             
             if result.get('success'):
                 vis = detector.visualize(frame, result)
                 
-                status_text = f"Frame: {frame_count} | Eye: {'RIGHT' if prefer_right else 'LEFT'}"
+                tracking = result['tracking']
+                status_text = (f"Frame: {frame_count} | Eye: {'RIGHT' if prefer_right else 'LEFT'}"
+                               f" | {tracking['mode']} {tracking['latency_ms']:.0f}ms")
                 cv2.putText(vis, status_text, (10, vis.shape[0] - 10),
                            cv2.FONT_HERSHEY_SIMPLEX, 0.5, (255, 255, 255), 1)
                 
@@ -730,7 +1872,12 @@ def test_webcam():
     
     cap.release()
     cv2.destroyAllWindows()
-    print("\nWebcam test completed")
+    
+    stats = detector.stats()
+    print(f"\nTracking: {stats['frames']} frames, {stats['full']} full, "
+          f"{stats['tracked']} tracked, {stats['reused']} reused, "
+          f"{stats['saved_ms']:.0f} ms saved")
+    print("Webcam test completed")
 
 
 def test_image(image_path: str, output_path: str = None):
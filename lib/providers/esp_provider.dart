@@ -1,9 +1,15 @@
 import 'package:flutter/material.dart';
 import 'dart:async';
+import 'dart:convert';
 import 'package:firebase_database/firebase_database.dart';
+import 'package:http/http.dart' as http;
 
 class ESPProvider extends ChangeNotifier {
+  static const String ingestUrl = 'http://10.0.2.2:5001'; // Android emulator
+  static const int historyPageSize = 50;
+
   final DatabaseReference _dbRef = FirebaseDatabase.instance.ref();
+  String deviceId = 'esp8266_sensor_001';
   
   double _currentIOP = 0.0;
   double _arf = 0.0;
@@ -15,6 +21,9 @@ class ESPProvider extends ChangeNotifier {
   bool _isConnected = false;
   bool _isScanning = false;
   List<IOPReading> _readingHistory = [];
+  int? _historyCursor;
+  bool _hasMoreHistory = true;
+  bool _isLoadingHistory = false;
   StreamSubscription? _subscription;
 
   double get currentIOP => _currentIOP;
@@ -27,6 +36,8 @@ class ESPProvider extends ChangeNotifier {
   bool get isConnected => _isConnected;
   bool get isScanning => _isScanning;
   List<IOPReading> get readingHistory => _readingHistory;
+  bool get hasMoreHistory => _hasMoreHistory;
+  bool get isLoadingHistory => _isLoadingHistory;
 
   ESPProvider() {
     _setupFirebase();
@@ -88,6 +99,52 @@ class ESPProvider extends ChangeNotifier {
     });
   }
 
+  /// Load the next page of history (newest first) from the ingest service.
+  /// Only the page being shown is fetched; pass refresh to start over.
+  Future<void> loadHistory({bool refresh = false}) async {
+    if (_isLoadingHistory || (!refresh && !_hasMoreHistory)) return;
+    _isLoadingHistory = true;
+    if (refresh) {
+      _historyCursor = null;
+      _hasMoreHistory = true;
+    }
+    notifyListeners();
+
+    try {
+      final query = {
+        'device': deviceId,
+        'order': 'desc',
+        'limit': '$historyPageSize',
+        if (_historyCursor != null) 'cursor': '$_historyCursor',
+      };
+      final response = await http
+          .get(Uri.parse('$ingestUrl/readings').replace(queryParameters: query))
+          .timeout(const Duration(seconds: 10));
+
+      if (response.statusCode == 200) {
+        final data = jsonDecode(response.body);
+        final page = (data['readings'] as List)
+            .map((r) => IOPReading(
+                  timestamp: DateTime.fromMillisecondsSinceEpoch(r['timestamp']),
+                  iop: _val(r['current_iop']),
+                  arf: _val(r['arf']),
+                  deformation: _val(r['deformation']),
+                ))
+            .toList();
+        _readingHistory = refresh ? page : [..._readingHistory, ...page];
+        _historyCursor = data['next_cursor'];
+        _hasMoreHistory = _historyCursor != null;
+      } else {
+        print('❌ History request failed: ${response.statusCode}');
+      }
+    } catch (e) {
+      print('❌ History request failed: $e');
+    }
+
+    _isLoadingHistory = false;
+    notifyListeners();
+  }
+
   double _val(dynamic v) {
     if (v is double) return v;
     if (v is int) return v.toDouble();
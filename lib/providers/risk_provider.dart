@@ -16,6 +16,7 @@ class RiskProvider extends ChangeNotifier {
   bool _isDiabetic = false;
   bool _isAnalyzing = false;
   String? _lastError;
+  String? _lastQualityIssue; // quality gate reason, e.g. 'blurry'
 
   // AI Model Results
   ACDPrediction? _lastACDPrediction;
@@ -32,6 +33,7 @@ class RiskProvider extends ChangeNotifier {
   bool get isDiabetic => _isDiabetic;
   bool get isAnalyzing => _isAnalyzing;
   String? get lastError => _lastError;
+  String? get lastQualityIssue => _lastQualityIssue;
   ACDPrediction? get lastACDPrediction => _lastACDPrediction;
   EyeFeatures? get lastEyeFeatures => _lastEyeFeatures;
   RiskAnalysis? get lastAnalysis => _lastAnalysis;
@@ -40,6 +42,7 @@ class RiskProvider extends ChangeNotifier {
       {bool preferRightEye = true}) async {
     _isAnalyzing = true;
     _lastError = null;
+    _lastQualityIssue = null;
     notifyListeners();
 
     try {
@@ -77,6 +80,12 @@ class RiskProvider extends ChangeNotifier {
           _lastError = data['error'] ?? 'Analysis failed';
           notifyListeners();
         }
+      } else if (response.statusCode == 422) {
+        // Frame rejected before analysis: ask for a retake, don't retry
+        final data = jsonDecode(response.body);
+        _lastQualityIssue = data['quality']?['reason'];
+        _lastError = _retakeMessage(_lastQualityIssue) ?? data['error'];
+        notifyListeners();
       } else {
         _lastError = 'Server error: ${response.statusCode}';
         notifyListeners();
@@ -90,6 +99,21 @@ class RiskProvider extends ChangeNotifier {
     }
   }
 
+  String? _retakeMessage(String? reason) {
+    switch (reason) {
+      case 'too_dark':
+        return 'Photo is too dark. Move to better light and retake.';
+      case 'too_bright':
+      case 'overexposed':
+        return 'Photo is overexposed. Avoid direct light or flash and retake.';
+      case 'low_contrast':
+        return 'Eye is not visible. Fill the frame with the eye and retake.';
+      case 'blurry':
+        return 'Photo is blurry. Hold the camera steady and retake.';
+    }
+    return null;
+  }
+
   void _mapACDToGlaucomaRisk() {
     if (_lastACDPrediction == null) return;
 
@@ -4,9 +4,38 @@ import 'package:intl/intl.dart';
 import '../providers/esp_provider.dart';
 import '../theme/app_theme.dart';
 
-class HistoryPage extends StatelessWidget {
+class HistoryPage extends StatefulWidget {
   const HistoryPage({super.key});
 
+  @override
+  State<HistoryPage> createState() => _HistoryPageState();
+}
+
+class _HistoryPageState extends State<HistoryPage> {
+  final ScrollController _scrollController = ScrollController();
+
+  @override
+  void initState() {
+    super.initState();
+    _scrollController.addListener(_onScroll);
+    WidgetsBinding.instance.addPostFrameCallback((_) {
+      Provider.of<ESPProvider>(context, listen: false).loadHistory(refresh: true);
+    });
+  }
+
+  @override
+  void dispose() {
+    _scrollController.dispose();
+    super.dispose();
+  }
+
+  void _onScroll() {
+    // Fetch the next page shortly before the end of the list is reached
+    if (_scrollController.position.extentAfter < 300) {
+      Provider.of<ESPProvider>(context, listen: false).loadHistory();
+    }
+  }
+
   @override
   Widget build(BuildContext context) {
     final espProvider = Provider.of<ESPProvider>(context);
@@ -17,13 +46,24 @@ class HistoryPage extends StatelessWidget {
       ),
       body: espProvider.readingHistory.isEmpty
           ? _buildEmptyState(context)
-          : ListView.builder(
-              padding: const EdgeInsets.all(16),
-              itemCount: espProvider.readingHistory.length,
-              itemBuilder: (context, index) {
-                final reading = espProvider.readingHistory[index];
-                return _buildHistoryCard(context, reading, index);
-              },
+          : RefreshIndicator(
+              onRefresh: () => espProvider.loadHistory(refresh: true),
+              child: ListView.builder(
+                controller: _scrollController,
+                padding: const EdgeInsets.all(16),
+                itemCount: espProvider.readingHistory.length +
+                    (espProvider.hasMoreHistory ? 1 : 0),
+                itemBuilder: (context, index) {
+                  if (index == espProvider.readingHistory.length) {
+                    return const Padding(
+                      padding: EdgeInsets.all(16),
+                      child: Center(child: CircularProgressIndicator()),
+                    );
+                  }
+                  final reading = espProvider.readingHistory[index];
+                  return _buildHistoryCard(context, reading, index);
+                },
+              ),
             ),
     );
   }
@@ -0,0 +1,292 @@
+"""
+SonoSight Batch Analysis
+Offline re-analysis of archived eye captures across a process pool
+
+Usage:
+    python lib/sonosight_batch.py IMAGES... --output results.jsonl [--resume]
+
+IMAGES may be directories (walked recursively), glob patterns or files.
+Results stream to JSONL or CSV as they complete; with --resume, images
+already recorded in the output are skipped so a crashed run can continue.
+"""
+
+import argparse
+import csv
+import glob
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Iterable, Iterator, List, Set
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff', '.webp')
+
+CSV_FIELDS = [
+    'path', 'success', 'error', 'elapsed_ms',
+    'iris_radius', 'pupil_radius', 'detection_method', 'pupil_backend',
+    'iris_pupil_ratio', 'pupil_eccentricity', 'normalized_pupil_size',
+    'acd_mm', 'risk_level', 'risk_score', 'confidence'
+]
+
+# One detector per worker process, built once by the pool initializer
+_detector = None
+
+
+def _init_worker(working_resolution, pupil_backend='threshold'):
+    """Process pool initializer: build this worker's EyeDetector"""
+    global _detector
+    from lib.eye_detector import EyeDetector
+    # Archive images are unrelated, so never track between them
+    _detector = EyeDetector(static_image_mode=True,
+                            working_resolution=working_resolution,
+                            pupil_backend=pupil_backend)
+
+
+def _analyze_path(path: str, prefer_right_eye: bool) -> Dict:
+    """Worker task: load and analyze one image file"""
+    from lib.eye_detector import decode_reduced
+
+    start = time.perf_counter()
+    try:
+        with open(path, 'rb') as f:
+            # Large JPEGs decode at reduced scale, iris regions on demand
+            image = decode_reduced(f.read(), _detector.working_resolution)
+    except OSError:
+        image = None
+    if image is None:
+        result = {'success': False, 'error': 'Could not load image'}
+    else:
+        result = _detector.detect_eye(image, prefer_right_eye)
+    result = {'path': path, **result}
+    result['elapsed_ms'] = round((time.perf_counter() - start) * 1000, 1)
+    return result
+
+
+def find_images(inputs: Iterable[str]) -> Iterator[str]:
+    """Expand directories and glob patterns into image paths, in sorted order"""
+    seen = set()
+    for item in inputs:
+        if os.path.isdir(item):
+            candidates = []
+            for root, _, files in os.walk(item):
+                candidates.extend(os.path.join(root, name) for name in files)
+        elif os.path.isfile(item):
+            candidates = [item]
+        else:
+            candidates = glob.glob(item, recursive=True)
+        for path in sorted(candidates):
+            if path.lower().endswith(IMAGE_EXTENSIONS) and path not in seen:
+                seen.add(path)
+                yield path
+
+
+def flatten_result(result: Dict) -> Dict:
+    """One CSV row per result"""
+    row = {'path': result['path'], 'success': result.get('success', False),
+           'error': result.get('error', ''), 'elapsed_ms': result.get('elapsed_ms')}
+    if result.get('success'):
+        row.update({
+            'iris_radius': round(result['iris']['radius'], 1),
+            'pupil_radius': result['pupil']['radius'],
+            'detection_method': result['pupil']['detection_method'],
+            'pupil_backend': result['pupil'].get('backend'),
+            **{k: result['features'][k] for k in
+               ('iris_pupil_ratio', 'pupil_eccentricity', 'normalized_pupil_size')},
+            **{k: result['prediction'][k] for k in
+               ('acd_mm', 'risk_level', 'risk_score', 'confidence')}
+        })
+    return row
+
+
+class ResultWriter:
+    """Append-only JSONL or CSV writer that can resume a previous run"""
+
+    def __init__(self, path: str, resume: bool):
+        self.path = path
+        self.format = 'csv' if path.lower().endswith('.csv') else 'jsonl'
+        self.done: Set[str] = set()
+        if resume and os.path.exists(path):
+            self._load_done()
+        mode = 'a' if resume else 'w'
+        self._file = open(path, mode, newline='', encoding='utf-8')
+        self._csv = None
+        if self.format == 'csv':
+            self._csv = csv.DictWriter(self._file, fieldnames=CSV_FIELDS,
+                                       extrasaction='ignore')
+            if self._file.tell() == 0:
+                self._csv.writeheader()
+
+    def _load_done(self):
+        """Collect finished paths and drop a partially written last line"""
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        complete = data[:data.rfind(b'\n') + 1]
+        if len(complete) != len(data):
+            with open(self.path, 'r+b') as f:
+                f.truncate(len(complete))
+
+        lines = complete.decode('utf-8').splitlines()
+        if self.format == 'csv':
+            for row in csv.DictReader(lines):
+                self.done.add(row['path'])
+        else:
+            for line in lines:
+                try:
+                    self.done.add(json.loads(line)['path'])
+                except (ValueError, KeyError):
+                    continue
+
+    def write(self, result: Dict):
+        if self._csv is not None:
+            self._csv.writerow(flatten_result(result))
+        else:
+            self._file.write(json.dumps(result) + '\n')
+        # Flush every record so a crash loses at most the in-flight images
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+def run_batch(paths: List[str], writer: ResultWriter, workers: int,
+              prefer_right_eye: bool = True, working_resolution=640,
+              pupil_backend: str = 'threshold') -> Dict:
+    """
+    Analyze paths across a process pool, writing results as they complete
+
+    If a worker process dies (e.g. out of memory on a corrupt image) the
+    pool is rebuilt and the images that were in flight are re-run one at
+    a time, so only an image that kills a worker on its own is recorded
+    as failed and the rest of the batch continues.
+
+    Returns:
+        Summary with counts and throughput
+    """
+    start = time.perf_counter()
+    counts = {'processed': 0, 'succeeded': 0, 'failed': 0, 'worker_crashes': 0}
+    max_in_flight = workers * 4
+    pending = iter(paths)
+    in_flight = {}      # future -> (path, ran alone in the pool)
+    suspects = deque()  # in flight when a worker died, re-run one at a time
+
+    def new_executor():
+        return ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                   initargs=(working_resolution, pupil_backend))
+
+    def record(result):
+        writer.write(result)
+        counts['processed'] += 1
+        counts['succeeded' if result.get('success') else 'failed'] += 1
+        if counts['processed'] % 100 == 0:
+            rate = counts['processed'] / (time.perf_counter() - start)
+            print(f"  {counts['processed']}/{len(paths)} images "
+                  f"({rate:.1f} images/s)")
+
+    executor = new_executor()
+    try:
+        while True:
+            if suspects:
+                if not in_flight:
+                    path = suspects.popleft()
+                    future = executor.submit(_analyze_path, path, prefer_right_eye)
+                    in_flight[future] = (path, True)
+            else:
+                # Keep a bounded number of tasks queued instead of all paths at once
+                for path in pending:
+                    future = executor.submit(_analyze_path, path, prefer_right_eye)
+                    in_flight[future] = (path, False)
+                    if len(in_flight) >= max_in_flight:
+                        break
+            if not in_flight:
+                break
+
+            finished, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            broken, waiting = False, len(suspects)
+            for future in finished:
+                path, alone = in_flight.pop(future)
+                try:
+                    record(future.result())
+                except BrokenProcessPool:
+                    broken = True
+                    if alone:
+                        print(f"  Warning: a worker process died on {path}")
+                        record({'path': path, 'success': False,
+                                'error': 'Worker process died while analyzing this image'})
+                    else:
+                        suspects.append(path)
+            if broken:
+                # Every task still in the dead pool fails too; re-run them
+                for future in wait(in_flight)[0]:
+                    path, _ = in_flight.pop(future)
+                    try:
+                        record(future.result())
+                    except BrokenProcessPool:
+                        suspects.append(path)
+                counts['worker_crashes'] += 1
+                if len(suspects) > waiting:
+                    print(f"  Warning: a worker process died, re-running "
+                          f"{len(suspects) - waiting} image(s) one at a time")
+                executor.shutdown(wait=False, cancel_futures=True)
+                executor = new_executor()
+    finally:
+        executor.shutdown(wait=True, cancel_futures=True)
+
+    elapsed = time.perf_counter() - start
+    counts['elapsed_s'] = round(elapsed, 1)
+    counts['images_per_s'] = round(counts['processed'] / elapsed, 2) if elapsed else 0.0
+    return counts
+
+
+def main(argv=None):
+    """Command-line entry point"""
+    parser = argparse.ArgumentParser(
+        prog='sonosight-batch', description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('inputs', nargs='+', help='Image directories, globs or files')
+    parser.add_argument('-o', '--output', required=True,
+                        help='Results file (.jsonl or .csv)')
+    parser.add_argument('-w', '--workers', type=int, default=os.cpu_count() or 1,
+                        help='Worker processes (default: CPU count)')
+    parser.add_argument('--resume', action='store_true',
+                        help='Skip images already in the output and append')
+    parser.add_argument('--left-eye', action='store_true',
+                        help='Analyze the left eye instead of the right')
+    parser.add_argument('--working-resolution', type=int, default=640,
+                        help='Longest side for the landmark pass (0 = full resolution)')
+    parser.add_argument('--pupil-backend', choices=('threshold', 'ellipse'),
+                        default='threshold', help='Pupil detection backend')
+    args = parser.parse_args(argv)
+
+    writer = ResultWriter(args.output, args.resume)
+    paths = [path for path in find_images(args.inputs) if path not in writer.done]
+
+    print(f"\nSonoSight batch: {len(paths)} images to analyze "
+          f"({len(writer.done)} already done), {args.workers} workers")
+
+    try:
+        summary = run_batch(paths, writer, max(1, args.workers),
+                            prefer_right_eye=not args.left_eye,
+                            working_resolution=args.working_resolution or None,
+                            pupil_backend=args.pupil_backend)
+    finally:
+        writer.close()
+
+    print(f"\n✓ Done: {summary['processed']} images "
+          f"({summary['succeeded']} succeeded, {summary['failed']} failed) "
+          f"in {summary['elapsed_s']} s, {summary['images_per_s']} images/s")
+    if summary['worker_crashes']:
+        print(f"Warning: worker processes died {summary['worker_crashes']} time(s); "
+              f"see the failed rows")
+    print(f"Results: {args.output}")
+
+
+if __name__ == '__main__':
+    try:
+        main()
+    except KeyboardInterrupt:
+        print("\n\nInterrupted by user (rerun with --resume to continue)")